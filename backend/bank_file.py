@@ -0,0 +1,172 @@
+"""On-disk math bank files, opened with ``mmap``.
+
+A bank file holds a compact ``ColumnarMathStore`` exactly as it sits in
+memory, so opening one is a constant-time header read: the columns are NumPy
+views over a read-only mapping and pages are faulted in only when rows are
+served. Every uvicorn worker that opens the same file shares those pages
+through the OS page cache instead of holding its own copy. The bank tag is
+stored in the file, so problem ids stay the same across restarts and deploys
+that ship the same file.
+
+Layout::
+
+    magic (8 bytes) | header length (uint32 LE) | JSON header | padding
+    | a | b | answer | type codes | difficulty codes
+
+Each column starts at a multiple of ``ALIGNMENT``. The header records the row
+count, tag, column dtypes and offsets, the (type, difficulty) row ranges and
+the type and difficulty names the codes refer to.
+
+Build a file offline with::
+
+    python bank_file.py build math_bank.bin --per-combination 100000 --seed 1
+"""
+import argparse
+import fcntl
+import json
+import mmap
+import os
+import struct
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from columnar_store import ColumnarMathStore
+from math_bank import MathBank, generate_bank
+from math_generator import DIFFICULTIES, MATH_TYPES
+
+MAGIC = b"EDUBANK\x00"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+COLUMNS = ("a", "b", "answer", "type_codes", "difficulty_codes")
+
+_LENGTH = struct.Struct("<I")
+
+
+class BankFileError(ValueError):
+    """The file is not a bank file this version can read"""
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _header(store: ColumnarMathStore) -> dict:
+    return {
+        "version": FORMAT_VERSION,
+        "rows": len(store),
+        "tag": store.tag,
+        "types": list(MATH_TYPES),
+        "difficulties": list(DIFFICULTIES),
+        "ranges": [[type, difficulty, start, end] for (type, difficulty), (start, end) in store.ranges.items()],
+        "columns": {},
+    }
+
+
+def save_store(store: ColumnarMathStore, path) -> Path:
+    """Write ``store`` to ``path``, replacing any existing file atomically"""
+    path = Path(path)
+    header = _header(store)
+    columns = [np.ascontiguousarray(column) for column in store.bank.columns()]
+
+    # Column offsets depend on the header length, which depends on the
+    # offsets; lay out with a placeholder and repeat until it is stable
+    data_start = 0
+    while True:
+        offset = data_start
+        for name, column in zip(COLUMNS, columns):
+            header["columns"][name] = {"dtype": column.dtype.str, "offset": offset}
+            offset = _aligned(offset + column.nbytes)
+        encoded = json.dumps(header, sort_keys=True).encode()
+        needed = _aligned(len(MAGIC) + _LENGTH.size + len(encoded))
+        if needed == data_start:
+            break
+        data_start = needed
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            out.write(MAGIC + _LENGTH.pack(len(encoded)) + encoded)
+            for name, column in zip(COLUMNS, columns):
+                out.seek(header["columns"][name]["offset"])
+                out.write(column.tobytes())
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return path
+
+
+def open_store(path) -> ColumnarMathStore:
+    """Map the bank file at ``path`` read-only as a ColumnarMathStore"""
+    with open(path, "rb") as source:
+        if os.fstat(source.fileno()).st_size < len(MAGIC) + _LENGTH.size:
+            raise BankFileError(f"{path} is too short to be a bank file")
+        mapping = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if mapping[:len(MAGIC)] != MAGIC:
+        raise BankFileError(f"{path} is not a bank file")
+    (length,) = _LENGTH.unpack_from(mapping, len(MAGIC))
+    start = len(MAGIC) + _LENGTH.size
+    header = json.loads(mapping[start:start + length])
+    if header.get("version") != FORMAT_VERSION:
+        raise BankFileError(f"{path} has bank format version {header.get('version')}, expected {FORMAT_VERSION}")
+    if tuple(header["types"]) != MATH_TYPES or tuple(header["difficulties"]) != DIFFICULTIES:
+        raise BankFileError(f"{path} was built for different math types or difficulties")
+
+    rows = header["rows"]
+    columns = []
+    for name in COLUMNS:
+        spec = header["columns"][name]
+        dtype = np.dtype(spec["dtype"])
+        if spec["offset"] + rows * dtype.itemsize > len(mapping):
+            raise BankFileError(f"{path} is truncated")
+        columns.append(np.frombuffer(mapping, dtype=dtype, count=rows, offset=spec["offset"]))
+
+    ranges = {(type, difficulty): (start, end) for type, difficulty, start, end in header["ranges"]}
+    return ColumnarMathStore(MathBank(*columns), tag=header["tag"], ranges=ranges)
+
+
+def build(path, per_combination: int, seed=None) -> ColumnarMathStore:
+    """Generate a bank and save it to ``path``"""
+    store = ColumnarMathStore(generate_bank(per_combination, seed=seed))
+    save_store(store, path)
+    return store
+
+
+def open_or_build(path, per_combination: int, seed=None) -> ColumnarMathStore:
+    """Map the bank file at ``path``, building it first if it does not exist
+
+    Workers starting together build under an exclusive lock on
+    ``<path>.lock``: the first builds and saves, the rest wait and map that
+    same file, so every worker serves the same bank and ids.
+    """
+    path = Path(path)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path.with_name(path.name + ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if not path.exists():
+                build(path, per_combination, seed)
+    return open_store(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build math bank files")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", help="generate a bank and write it to a file")
+    build_parser.add_argument("path")
+    build_parser.add_argument("--per-combination", type=int, default=100_000)
+    build_parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    store = build(args.path, args.per_combination, args.seed)
+    print(f"Wrote {len(store)} problems (tag {store.tag}, {store.nbytes} bytes of columns) to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""Whole-bank content catalogs for client-side caching.
+
+The content banks do not change while the server runs, so a client can
+download a filtered bank once, pick items locally and grade offline. A
+``Catalog`` is rendered once per content kind and filter, items ordered by
+id and without ``created_at`` (which differs between processes that
+generated the same bank), and its version is a hash of those bytes: the
+same content always has the same version, across restarts and across
+workers, and serves as a strong ETag.
+
+Rendering a large bank takes a while, so catalogs are built on a worker
+thread, once per filter however many requests ask for it at the same time.
+Only filters whose values occur in the content are cached under their own
+key; every other filter shares one empty catalog, so made-up values cannot
+evict the real ones.
+
+Clients holding an older version can ask for a delta instead: the items
+added since and the ids removed. Deltas need the ids of the old version, so
+they are available for versions this process has built (``history``
+versions are kept); for any other version the full catalog is the answer.
+"""
+import asyncio
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Optional, Tuple
+
+CATALOG_CACHE_SIZE = 8
+CATALOG_HISTORY_SIZE = 64
+CATALOG_MAX_ITEMS = 200_000
+RENDER_CHUNK = 2000
+
+# Response model fields left out of catalog items
+OMITTED_FIELDS = ("id", "created_at")
+
+
+class CatalogUnavailable(LookupError):
+    """The content has no finite catalog (generated on demand)"""
+
+
+class CatalogTooLarge(ValueError):
+    """The filter matches more items than one catalog may hold"""
+
+
+class Catalog:
+    """One rendered catalog: its version, item ids and response body"""
+
+    __slots__ = ("version", "generation", "ids", "body")
+
+    def __init__(self, version: str, generation, ids: FrozenSet[str], body: bytes):
+        self.version = version
+        self.generation = generation
+        self.ids = ids
+        self.body = body
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.version}"'
+
+
+def render_items(content, documents) -> bytes:
+    """JSON array of the documents as the response model's fields, minus OMITTED_FIELDS"""
+    fields = [field for field in content.responses.model.model_fields if field not in OMITTED_FIELDS]
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    chunks = []
+    # One encoder call holds the GIL throughout, so a large catalog is
+    # encoded in chunks to let the event loop thread run in between
+    for start in range(0, len(documents), RENDER_CHUNK):
+        items = [
+            {"id": str(document["_id"]), **{field: document.get(field) for field in fields}}
+            for document in documents[start:start + RENDER_CHUNK]
+        ]
+        chunks.append(encode(items)[1:-1])
+    return ("[" + ",".join(chunks) + "]").encode()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """``If-None-Match`` semantics: weak comparison, ``*`` matches anything"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class CatalogCache:
+    """Catalogs per (kind, filter), rebuilt when their content changes"""
+
+    def __init__(self, size: int = CATALOG_CACHE_SIZE, history: int = CATALOG_HISTORY_SIZE,
+                 max_items: int = CATALOG_MAX_ITEMS):
+        self.size = size
+        self.max_items = max_items
+        self.history_size = history
+        self._catalogs: "OrderedDict[tuple, Catalog]" = OrderedDict()
+        # Builds in progress, keyed like _catalogs plus the content generation
+        self._building: Dict[tuple, asyncio.Task] = {}
+        # Item ids of recently built versions, for deltas
+        self._history: "OrderedDict[str, FrozenSet[str]]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._catalogs)
+
+    @staticmethod
+    def _sorted(documents) -> list:
+        return sorted(documents, key=lambda document: str(document["_id"]))
+
+    def _documents(self, content, match: dict):
+        """Matching documents, unsorted; None for a filter on values the content lacks"""
+        if not content.known_values(match):
+            return None
+        documents = content.catalog(match)
+        if documents is None:
+            raise CatalogUnavailable("This content is generated on demand and has no catalog")
+        if len(documents) > self.max_items:
+            raise CatalogTooLarge(f"{len(documents)} items match; narrow the filter to {self.max_items} or fewer")
+        return documents
+
+    @classmethod
+    def _build(cls, content, documents, generation) -> Catalog:
+        """Render a catalog; runs on a worker thread"""
+        documents = cls._sorted(documents)
+        items = render_items(content, documents)
+        version = hashlib.blake2b(items, digest_size=16).hexdigest()
+        body = b'{"version":"' + version.encode() + b'","items":' + items + b"}"
+        return Catalog(version, generation, frozenset(str(d["_id"]) for d in documents), body)
+
+    async def catalog(self, kind: str, content, match: dict) -> Catalog:
+        """The current catalog of ``content`` items matching ``match``"""
+        generation = (id(content), content.generation)
+        documents = self._documents(content, match)
+        # Filters on unknown values all share the empty catalog
+        key = (kind, frozenset(match.items()) if documents is not None else None)
+        catalog = self._catalogs.get(key)
+        if catalog is not None and catalog.generation == generation:
+            self._catalogs.move_to_end(key)
+            return catalog
+
+        build_key = key + (generation,)
+        task = self._building.get(build_key)
+        if task is None:
+            task = asyncio.ensure_future(asyncio.to_thread(self._build, content, documents or [], generation))
+            self._building[build_key] = task
+            task.add_done_callback(lambda _: self._building.pop(build_key, None))
+        catalog = await asyncio.shield(task)
+
+        self._catalogs[key] = catalog
+        self._catalogs.move_to_end(key)
+        if len(self._catalogs) > self.size:
+            self._catalogs.popitem(last=False)
+        self._history[catalog.version] = catalog.ids
+        self._history.move_to_end(catalog.version)
+        if len(self._history) > self.history_size:
+            self._history.popitem(last=False)
+        return catalog
+
+    async def delta(self, kind: str, content, match: dict, since: str) -> Tuple[Catalog, Optional[bytes]]:
+        """The current catalog and, if ``since`` is a known version, the delta body from it"""
+        catalog = await self.catalog(kind, content, match)
+        old_ids = self._history.get(since)
+        if old_ids is None:
+            return catalog, None
+        removed = sorted(old_ids - catalog.ids)
+        head = json.dumps({"version": catalog.version, "since": since, "removed": removed}, separators=(",", ":"))
+        documents = self._documents(content, match) if since != catalog.version else None
+
+        def render_added():
+            added = [d for d in self._sorted(documents or []) if str(d["_id"]) not in old_ids]
+            return render_items(content, added)
+
+        return catalog, head[:-1].encode() + b',"added":' + await asyncio.to_thread(render_added) + b"}"
+
+    def clear(self):
+        self._catalogs.clear()
+        self._history.clear()
@@ -0,0 +1,227 @@
+"""Read-only columnar storage for large math problem banks.
+
+A stored problem dict with a UUID ``_id``, two formatted strings, a
+datetime and two type/difficulty strings costs hundreds of bytes. The
+columnar store keeps a ``MathBank`` instead: narrow integer operand and
+answer columns plus one-byte type and difficulty codes. Rows are sorted by
+(type, difficulty), so every indexed filter is a handful of contiguous row
+ranges and needs no index arrays at all. Documents, including their
+question and display text, are rendered only when a row is served.
+
+Ids are ``<bank tag>-<row in hex>``. The tag is a hash of the bank's
+contents, so an id from a different bank never resolves to the wrong row.
+"""
+import bisect
+import hashlib
+import random
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from content_index import INDEXED_FIELDS
+from content_service import BaseContentService, RecentItems
+from math_bank import DIFFICULTY_CODES, TYPE_CODES, MathBank
+from math_generator import DIFFICULTIES, FIELD_VALUES, MATH_TYPES
+from response_cache import ResponseCache
+from sampling import sample_sequence
+
+
+def compact_bank(bank: MathBank) -> MathBank:
+    """Same bank with rows sorted by (type, difficulty) and narrowed operand columns"""
+    keys = bank.type_codes.astype(np.int32) * len(DIFFICULTIES) + bank.difficulty_codes
+    if len(keys) and (np.diff(keys) < 0).any():
+        order = np.argsort(keys, kind="stable")
+        bank = MathBank(*(column[order] for column in bank.columns()))
+
+    largest = max((int(np.abs(column).max()) for column in (bank.a, bank.b, bank.answer) if len(column)), default=0)
+    # The smallest signed type holding -largest - 1 also holds +largest
+    dtype = np.min_scalar_type(-largest - 1)
+    return MathBank(
+        *(column.astype(dtype, copy=False) for column in (bank.a, bank.b, bank.answer)),
+        bank.type_codes,
+        bank.difficulty_codes,
+    )
+
+
+def bank_tag(bank: MathBank) -> str:
+    """Short content hash identifying a bank"""
+    digest = hashlib.blake2b(digest_size=4)
+    for column in bank.columns():
+        digest.update(np.ascontiguousarray(column).tobytes())
+    return digest.hexdigest()
+
+
+class RowsView(Sequence):
+    """Documents for a union of row ranges, rendered on access"""
+
+    def __init__(self, store: "ColumnarMathStore", ranges: List[Tuple[int, int]]):
+        self.store = store
+        self.ranges = [(start, end) for start, end in ranges if end > start]
+        self._offsets = []
+        total = 0
+        for start, end in self.ranges:
+            self._offsets.append(total)
+            total += end - start
+        self._length = total
+
+    def __len__(self):
+        return self._length
+
+    def row(self, position: int) -> int:
+        if not 0 <= position < self._length:
+            raise IndexError(position)
+        block = bisect.bisect_right(self._offsets, position) - 1
+        return self.ranges[block][0] + position - self._offsets[block]
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(self._length))]
+        if position < 0:
+            position += self._length
+        return self.store.document(self.row(position))
+
+
+class ColumnarMathStore:
+    """Math problems in a compact MathBank, with the ContentIndex read interface"""
+
+    def __init__(self, bank: MathBank, tag: Optional[str] = None,
+                 ranges: Optional[Dict[Tuple[str, str], Tuple[int, int]]] = None):
+        """``ranges`` marks ``bank`` as already compact, e.g. when it is read
+        back from a bank file, so no column is touched while opening it"""
+        if ranges is not None:
+            self.bank = bank
+            self.tag = tag or bank_tag(bank)
+            self._ranges = dict(ranges)
+            return
+        self.bank = compact_bank(bank)
+        self.tag = tag or bank_tag(self.bank)
+        keys = self.bank.type_codes.astype(np.int32) * len(DIFFICULTIES) + self.bank.difficulty_codes
+        self._ranges: Dict[Tuple[str, str], Tuple[int, int]] = {}
+        for type in MATH_TYPES:
+            for difficulty in DIFFICULTIES:
+                key = TYPE_CODES[type] * len(DIFFICULTIES) + DIFFICULTY_CODES[difficulty]
+                start, end = np.searchsorted(keys, [key, key + 1])
+                self._ranges[(type, difficulty)] = (int(start), int(end))
+
+    def __len__(self):
+        return len(self.bank)
+
+    @property
+    def nbytes(self) -> int:
+        return self.bank.nbytes
+
+    @property
+    def ranges(self) -> Dict[Tuple[str, str], Tuple[int, int]]:
+        """Row range ``(start, end)`` of every (type, difficulty)"""
+        return dict(self._ranges)
+
+    def row_id(self, row: int) -> str:
+        return f"{self.tag}-{row:x}"
+
+    def parse_id(self, doc_id: str) -> Optional[int]:
+        tag, _, row = str(doc_id).partition("-")
+        if tag != self.tag or not row:
+            return None
+        try:
+            position = int(row, 16)
+        except ValueError:
+            return None
+        if not 0 <= position < len(self.bank) or row != f"{position:x}":
+            return None
+        return position
+
+    def document(self, row: int) -> dict:
+        return self.bank.document(row, self.row_id(row))
+
+    def get(self, doc_id: str) -> Optional[dict]:
+        row = self.parse_id(doc_id)
+        return None if row is None else self.document(row)
+
+    def lookup(self, match: dict) -> Optional[RowsView]:
+        """Rows matching an indexed ``$match`` filter, or None if not indexed"""
+        if any(field not in INDEXED_FIELDS for field in match):
+            return None
+        ranges = [
+            self._ranges[(type, difficulty)]
+            for type in MATH_TYPES
+            for difficulty in DIFFICULTIES
+            if match.get("type", type) == type and match.get("difficulty", difficulty) == difficulty
+        ]
+        return RowsView(self, ranges)
+
+    def scan(self, match: dict) -> List[dict]:
+        """Filters on other fields; ``answer`` is matched on the column"""
+        rows = np.arange(len(self.bank))
+        if "answer" in match:
+            rows = np.flatnonzero(self.bank.answer == match["answer"])
+        documents = (self.document(int(row)) for row in rows)
+        return [d for d in documents if all(d.get(field) == value for field, value in match.items())]
+
+    def find(self, match: dict):
+        documents = self.lookup(match)
+        return self.scan(match) if documents is None else documents
+
+    def add(self, document: dict):
+        raise TypeError("The columnar math bank is read-only")
+
+    def remove(self, doc_id: str):
+        raise TypeError("The columnar math bank is read-only")
+
+
+class ColumnarMathContent(BaseContentService):
+    """Content service over a ColumnarMathStore, interchangeable with ContentService
+
+    Bodies are rendered per request from the row: caching them would bring
+    back the per-problem memory the columnar layout avoids.
+    """
+
+    # Problems come from the in-process bank, not the math_problems collection
+    stored = False
+    # Many rows share a question, so sessions remember questions, not ids
+    recent_key = "question"
+    field_values = FIELD_VALUES
+
+    def __init__(self, responses: ResponseCache, rng=random):
+        self.responses = responses
+        self.rng = rng
+        self.store: Optional[ColumnarMathStore] = None
+        self.recent = RecentItems()
+
+    def __len__(self):
+        return len(self.store) if self.store else 0
+
+    @property
+    def loaded(self):
+        return self.store is not None
+
+    @property
+    def generation(self):
+        return self.store.tag if self.store else None
+
+    def attach(self, store: ColumnarMathStore):
+        self.store = store
+
+    def load(self, documents):
+        """The bank is attached whole; stored documents are not used"""
+
+    def get(self, doc_id: str) -> Optional[dict]:
+        return self.store.get(doc_id) if self.store else None
+
+    def catalog(self, match: dict) -> Sequence[dict]:
+        return self.store.find(match) if self.store else []
+
+    def pick(self, match: dict, size: int = 1, session_id: Optional[str] = None) -> List[dict]:
+        """Up to ``size`` random rows with distinct questions matching ``match``
+
+        With a ``session_id``, questions the session was served recently are
+        avoided while enough others match, and the picks are remembered.
+        """
+        if not self.store:
+            return []
+        # Many rows share a question in small operand ranges, so oversample
+        # (by the history length too) and keep one row per question
+        seen = self.recent.seen(session_id)
+        candidates = sample_sequence(self.store.find(match), size * 2 + len(seen), rng=self.rng)
+        documents = self.unseen_first(candidates, size, seen)
+        self.remember(session_id, documents)
+        return documents
@@ -0,0 +1,244 @@
+"""Asyncio-aware locking primitives for the in-memory collections.
+
+A ``threading.Lock`` taken inside ``async def`` code blocks the event loop
+thread whenever it is contended. These primitives suspend the waiting
+coroutine instead, and are fine-grained: one reader/writer lock per
+collection plus one lock per key (e.g. per session) inside it.
+
+Most critical sections never await, so on one event loop the locks are
+almost never contended. Acquiring an uncontended lock is therefore a few
+counter updates, without suspending: the ``asyncio.Condition`` and the
+per-key waiter queues are only used while somebody actually has to wait.
+
+Each lock takes an optional ``observer``, called as
+``observer(mode, waited, held)`` with seconds when an acquisition that had
+to wait is released, so callers can measure contention without wrapping
+every ``async with`` and without timing the acquisitions that did not wait.
+"""
+import asyncio
+import time
+from collections import deque
+
+
+class AsyncRWLock:
+    """Many concurrent readers or one writer, with writer preference
+
+    Writers waiting for the lock stop new readers from entering so a steady
+    stream of readers cannot starve them.
+    """
+
+    def __init__(self, observer=None):
+        self.observer = observer
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+        # Coroutines suspended on the condition, readers and writers alike
+        self._waiting = 0
+        self._condition = asyncio.Condition()
+        self._shared_read = _ReadGuard(self)
+        self._shared_write = _WriteGuard(self)
+
+    @property
+    def readers(self):
+        return self._readers
+
+    @property
+    def locked(self):
+        return self._writer
+
+    def read(self):
+        # Uncontended: nothing can change before ``async with`` enters, so a
+        # shared guard that records nothing will do
+        if not self._writer and not self._writers_waiting:
+            return self._shared_read
+        return _ReadGuard(self, timed=True)
+
+    def write(self):
+        if not self._writer and not self._readers and not self._writers_waiting:
+            return self._shared_write
+        return _WriteGuard(self, timed=True)
+
+    async def _wait(self, predicate, writer=False):
+        async with self._condition:
+            self._waiting += 1
+            self._writers_waiting += writer
+            try:
+                await self._condition.wait_for(predicate)
+            finally:
+                self._waiting -= 1
+                self._writers_waiting -= writer
+
+    async def _wake(self):
+        async with self._condition:
+            self._condition.notify_all()
+
+
+class _ReadGuard:
+    """One ``async with lock.read()``; ``timed`` guards report to the observer"""
+
+    __slots__ = ("lock", "timed", "started", "acquired")
+
+    def __init__(self, lock, timed=False):
+        self.lock = lock
+        self.timed = timed
+
+    async def __aenter__(self):
+        lock = self.lock
+        if lock._writer or lock._writers_waiting:
+            started = time.perf_counter()
+            await lock._wait(lambda: not lock._writer and not lock._writers_waiting)
+            if self.timed:
+                self.started, self.acquired = started, time.perf_counter()
+        else:
+            self.timed = False
+        lock._readers += 1
+
+    async def __aexit__(self, *exc_info):
+        lock = self.lock
+        lock._readers -= 1
+        if not lock._readers and lock._waiting:
+            await lock._wake()
+        if self.timed and lock.observer is not None:
+            lock.observer("read", self.acquired - self.started, time.perf_counter() - self.acquired)
+
+
+class _WriteGuard:
+    """One ``async with lock.write()``; ``timed`` guards report to the observer"""
+
+    __slots__ = ("lock", "timed", "started", "acquired")
+
+    def __init__(self, lock, timed=False):
+        self.lock = lock
+        self.timed = timed
+
+    async def __aenter__(self):
+        lock = self.lock
+        if lock._writer or lock._readers or lock._writers_waiting:
+            started = time.perf_counter()
+            await lock._wait(lambda: not lock._writer and not lock._readers, writer=True)
+            if self.timed:
+                self.started, self.acquired = started, time.perf_counter()
+        else:
+            self.timed = False
+        lock._writer = True
+
+    async def __aexit__(self, *exc_info):
+        lock = self.lock
+        lock._writer = False
+        if lock._waiting:
+            await lock._wake()
+        if self.timed and lock.observer is not None:
+            lock.observer("write", self.acquired - self.started, time.perf_counter() - self.acquired)
+
+
+class KeyedLock:
+    """One lock per key, kept only while somebody holds or waits for it
+
+    A held key maps to the queue of futures waiting for it (usually none);
+    releasing hands the key straight to the first waiter. With ``within``,
+    an ``AsyncRWLock``, each key is held inside a read lock on it, taken by
+    the same guard so the pair costs one ``async with``.
+    """
+
+    def __init__(self, observer=None, within=None):
+        self.observer = observer
+        self.within = within
+        self._held = {}
+
+    def __len__(self):
+        return len(self._held)
+
+    def acquire(self, key):
+        return _KeyGuard(self, key)
+
+    def free(self, key):
+        """Whether ``acquire(key)`` would enter without waiting
+
+        A critical section that never awaits can run directly when this is
+        true: nothing else gets to run before it is done.
+        """
+        if key in self._held:
+            return False
+        within = self.within
+        return within is None or not (within._writer or within._writers_waiting)
+
+    async def _wait(self, key):
+        waiters = self._held[key]
+        if waiters is None:
+            waiters = self._held[key] = deque()
+        waiter = asyncio.get_running_loop().create_future()
+        waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The key was handed over just as we were cancelled: pass it on
+                self._release(key)
+            else:
+                waiters.remove(waiter)
+            raise
+
+    def _release(self, key):
+        waiters = self._held[key]
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        del self._held[key]
+
+
+class _KeyGuard:
+    """One ``async with locks.acquire(key)``; reports to the observer if it waited"""
+
+    __slots__ = ("locks", "key", "outer", "timed", "started", "acquired")
+
+    def __init__(self, locks, key):
+        self.locks = locks
+        self.key = key
+        self.outer = None
+
+    async def __aenter__(self):
+        locks = self.locks
+        within = locks.within
+        if within is not None:
+            if within._writer or within._writers_waiting:
+                self.outer = _ReadGuard(within, timed=True)
+                await self.outer.__aenter__()
+            else:
+                within._readers += 1
+        self.timed = self.key in locks._held
+        if self.timed:
+            self.started = time.perf_counter()
+            try:
+                await locks._wait(self.key)
+            except BaseException:
+                await self._exit_within()
+                raise
+            self.acquired = time.perf_counter()
+        else:
+            locks._held[self.key] = None
+
+    async def __aexit__(self, *exc_info):
+        locks = self.locks
+        if locks._held[self.key] is None:
+            del locks._held[self.key]
+        else:
+            locks._release(self.key)
+        if self.timed and locks.observer is not None:
+            locks.observer("key", self.acquired - self.started, time.perf_counter() - self.acquired)
+        within = locks.within
+        if within is not None:
+            if self.outer is not None or (within._readers == 1 and within._waiting):
+                await self._exit_within()
+            else:
+                within._readers -= 1
+
+    async def _exit_within(self):
+        within = self.locks.within
+        if self.outer is not None:
+            await self.outer.__aexit__(None, None, None)
+        elif within is not None:
+            within._readers -= 1
+            if not within._readers and within._waiting:
+                await within._wake()
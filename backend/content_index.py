@@ -0,0 +1,97 @@
+"""In-memory hash indexes for the learning content collections.
+
+The content banks are read far more often than they are written, so every
+document is filed once at insert time into a primary ``_id`` map and into
+buckets keyed by ``type``, ``difficulty`` and the ``(type, difficulty)`` pair.
+Lookups and filtered sampling then only touch the matching bucket.
+"""
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+# Fields that have secondary indexes, in the order used for bucket keys
+INDEXED_FIELDS = ("type", "difficulty")
+
+
+class ContentIndex:
+    """Primary ``_id`` index plus secondary buckets over a content collection"""
+
+    def __init__(self):
+        self.by_id: Dict[str, dict] = {}
+        # Bucket key is a tuple of (field, value) pairs in INDEXED_FIELDS order;
+        # the empty tuple is the bucket holding every document.
+        self.buckets: Dict[tuple, List[dict]] = defaultdict(list)
+        self._positions: Dict[tuple, Dict[str, int]] = defaultdict(dict)
+
+    def __len__(self):
+        return len(self.by_id)
+
+    @staticmethod
+    def _bucket_keys(document: dict):
+        """All bucket keys a document belongs to"""
+        type_key = ("type", document.get("type"))
+        difficulty_key = ("difficulty", document.get("difficulty"))
+        return ((), (type_key,), (difficulty_key,), (type_key, difficulty_key))
+
+    @staticmethod
+    def bucket_key(match: dict) -> Optional[tuple]:
+        """Bucket key for a ``$match`` filter, or None if it is not indexed"""
+        if any(field not in INDEXED_FIELDS for field in match):
+            return None
+        return tuple((field, match[field]) for field in INDEXED_FIELDS if field in match)
+
+    def add(self, document: dict):
+        """File a document into the primary index and its buckets"""
+        doc_id = document.get("_id")
+        if doc_id in self.by_id:
+            self.remove(doc_id)
+        self.by_id[doc_id] = document
+        for key in self._bucket_keys(document):
+            bucket = self.buckets[key]
+            self._positions[key][doc_id] = len(bucket)
+            bucket.append(document)
+
+    def remove(self, doc_id: str) -> Optional[dict]:
+        """Drop a document from every index it is filed in"""
+        document = self.by_id.pop(doc_id, None)
+        if document is None:
+            return None
+        for key in self._bucket_keys(document):
+            bucket = self.buckets[key]
+            positions = self._positions[key]
+            # Swap-remove keeps bucket deletion O(1)
+            index = positions.pop(doc_id)
+            last = bucket.pop()
+            if index < len(bucket):
+                bucket[index] = last
+                positions[last.get("_id")] = index
+            if not bucket:
+                del self.buckets[key]
+                del self._positions[key]
+        return document
+
+    def get(self, doc_id: str) -> Optional[dict]:
+        return self.by_id.get(doc_id)
+
+    def lookup(self, match: dict) -> Optional[List[dict]]:
+        """Documents matching an indexed ``$match`` filter
+
+        Returns None when the filter uses fields without an index, so callers
+        can fall back to a scan.
+        """
+        key = self.bucket_key(match)
+        if key is None:
+            return None
+        return self.buckets.get(key, [])
+
+    def scan(self, match: dict) -> List[dict]:
+        """Linear scan fallback for filters on unindexed fields"""
+        return [
+            document for document in self.buckets.get((), [])
+            if all(document.get(field) == value for field, value in match.items())
+        ]
+
+    def find(self, match: dict) -> List[dict]:
+        documents = self.lookup(match)
+        if documents is None:
+            documents = self.scan(match)
+        return documents
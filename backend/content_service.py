@@ -0,0 +1,190 @@
+"""Content selection for the learning routes.
+
+Problems and exercises are immutable once loaded, so each content kind keeps
+an in-process replica: a ``ContentIndex`` for lookups and filtered sampling
+plus a ``ResponseCache`` of pre-rendered bodies. Picking the next item for
+an answer response is then a bucket sample and a dict lookup, with no
+storage round-trip, whichever storage backend is configured.
+"""
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from content_index import ContentIndex
+from response_cache import ResponseCache
+from sampling import BucketSampler, sample_sequence
+
+# How many recently served items are remembered per session, and for how
+# many sessions at most (least recently active sessions are forgotten first)
+RECENT_ITEMS_PER_SESSION = 30
+RECENT_SESSIONS_MAX = 50000
+
+# Filters remembered as matching nothing (least recently used dropped first)
+EMPTY_FILTERS_MAX = 256
+
+
+class RecentItems:
+    """Bounded per-session history of recently served item ids (or other item keys)"""
+
+    def __init__(self, per_session: int = RECENT_ITEMS_PER_SESSION, max_sessions: int = RECENT_SESSIONS_MAX):
+        self.per_session = per_session
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, OrderedDict]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def seen(self, session_id: Optional[str]):
+        history = self._sessions.get(session_id) if session_id else None
+        return history.keys() if history else ()
+
+    def record(self, session_id: Optional[str], doc_ids: Iterable[str]):
+        if not session_id:
+            return
+        history = self._sessions.get(session_id)
+        if history is None:
+            history = self._sessions[session_id] = OrderedDict()
+            if len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session_id)
+        for doc_id in doc_ids:
+            history[doc_id] = None
+            history.move_to_end(doc_id)
+        while len(history) > self.per_session:
+            history.popitem(last=False)
+
+
+class BaseContentService:
+    """What the content services share; subclasses provide ``get`` and ``pick``
+
+    The services are interchangeable: ContentService over loaded documents,
+    and the generated and columnar math content.
+    """
+
+    # Field naming an item in a session's recent history
+    recent_key = "_id"
+    # The values each filterable field can take, for content that knows them
+    # without looking; any other field is unknown
+    field_values: Dict[str, Sequence] = {}
+
+    def known_values(self, match: dict) -> bool:
+        """Every field of ``match`` is filterable and each value occurs in the content"""
+        return all(value in self.field_values.get(field, ()) for field, value in match.items())
+
+    def unseen_first(self, candidates: Iterable[dict], size: int, seen) -> List[dict]:
+        """Up to ``size`` candidates with distinct ``recent_key`` values
+
+        Candidates whose key is in ``seen`` only top up a short pick, so a
+        narrow filter repeats recent items rather than run dry.
+        """
+        key = self.recent_key
+        documents, repeats, keys = [], [], set()
+        for document in candidates:
+            if document[key] in keys:
+                continue
+            keys.add(document[key])
+            (repeats if document[key] in seen else documents).append(document)
+            if len(documents) == size:
+                break
+        return documents + repeats[:size - len(documents)]
+
+    def remember(self, session_id: Optional[str], documents: List[dict]):
+        self.recent.record(session_id, (document[self.recent_key] for document in documents))
+
+    def body(self, document: dict) -> bytes:
+        """Rendered per request; ContentService serves cached bodies instead"""
+        return self.responses.render(document)
+
+    def next_item(self, match: dict, session_id: Optional[str] = None) -> Optional[Tuple[dict, bytes]]:
+        """A random matching document and its pre-rendered body, if any"""
+        documents = self.pick(match, 1, session_id)
+        if not documents:
+            return None
+        return documents[0], self.body(documents[0])
+
+    def batch_body(self, documents: List[dict]) -> bytes:
+        """JSON array of the documents' pre-rendered bodies"""
+        return b"[" + b",".join(self.body(document) for document in documents) + b"]"
+
+
+class ContentService(BaseContentService):
+    """Selects items of one content kind and serves their cached bodies"""
+
+    # Items live in a storage collection and are loaded from it
+    stored = True
+
+    def __init__(self, responses: ResponseCache):
+        self.responses = responses
+        self.index = ContentIndex()
+        self.sampler = BucketSampler(self.index)
+        self.recent = RecentItems()
+        # Filters known to match nothing in the loaded content; only filters
+        # whose every value occurs in the content are remembered, so values
+        # made up by clients cannot grow it
+        self.empty_filters: "OrderedDict[frozenset, None]" = OrderedDict()
+        # Bumped whenever the content changes, so derived caches can tell
+        self.generation = 0
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def loaded(self):
+        return len(self.index) > 0
+
+    def load(self, documents: Iterable[dict]):
+        """Add stored documents to the replica and render their bodies"""
+        documents = list(documents)
+        for document in documents:
+            self.index.add(document)
+        self.responses.add_many(documents)
+        self.empty_filters.clear()
+        self.generation += 1
+
+    def clear(self):
+        self.index = ContentIndex()
+        self.sampler = BucketSampler(self.index)
+        self.recent = RecentItems()
+        self.empty_filters.clear()
+        self.responses.clear()
+        self.generation += 1
+
+    def get(self, doc_id: str) -> Optional[dict]:
+        return self.index.get(doc_id)
+
+    def catalog(self, match: dict) -> Sequence[dict]:
+        """Every loaded document matching ``match``, copied so it can be read off the loop"""
+        return list(self.index.find(match))
+
+    def pick(self, match: dict, size: int = 1, session_id: Optional[str] = None) -> List[dict]:
+        """Up to ``size`` distinct random documents matching ``match``
+
+        With a ``session_id``, items the session was served recently are
+        avoided while enough others match, and the picks are remembered.
+        Filters that matched nothing are remembered until content changes.
+        """
+        key = frozenset(match.items())
+        if key in self.empty_filters:
+            self.empty_filters.move_to_end(key)
+            return []
+        seen = self.recent.seen(session_id)
+        if not seen:
+            documents = self.sampler.sample(match, size)
+        else:
+            bucket = self.index.find(match)
+            # Oversample by the history length so excluded picks can be dropped
+            documents = self.unseen_first(sample_sequence(bucket, size + len(seen), rng=self.sampler.rng), size, seen)
+        if not documents and self.loaded and self.known_values(match):
+            self.empty_filters[key] = None
+            if len(self.empty_filters) > EMPTY_FILTERS_MAX:
+                self.empty_filters.popitem(last=False)
+        self.remember(session_id, documents)
+        return documents
+
+    def known_values(self, match: dict) -> bool:
+        """Every field is indexed and each value has its own non-empty bucket"""
+        key = ContentIndex.bucket_key(match)
+        return key is not None and all((pair,) in self.index.buckets for pair in key)
+
+    def body(self, document: dict) -> bytes:
+        return self.responses.body_for(document)
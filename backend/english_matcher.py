@@ -0,0 +1,278 @@
+"""Answer matching for English exercises.
+
+The old check lowercased the transcript and tested whether any accepted
+answer was a substring of it, which is wrong both ways: "is" matched
+"this", and "c a t" transcribed as "see a tee" failed. Here each exercise's
+accepted answers are normalized once and compiled into an ``AnswerMatcher``;
+a transcript is normalized and tokenized once per answer and then scanned:
+
+* whole tokens: the accepted token sequences are merged into a trie and
+  emitted as one regular expression anchored on token boundaries, so "is"
+  only matches the word "is" and the scan is a single pass in the regex
+  engine, linear in the transcript;
+* letter sequences: single words (and answers like "c a t") also match when
+  spelled out with letters or spoken letter names ("see a tee", "a double
+  p l e"), as long as the spelled run is the whole word;
+* fuzzy words: where the exercise type allows it, a transcript token one
+  edit from a long accepted word, starting with the same letter, also
+  matches. Shorter words have too many real-word neighbours ("bandana" for
+  banana), and two edits reach them even on long words ("elegant" for
+  elephant). Only distinct tokens of a compatible length are compared, with
+  a banded edit distance.
+"""
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Iterable, List, Sequence
+
+# Exercise types where near-misses of long words are accepted. Spelling and
+# grammar are about the exact form, so they always match exactly.
+FUZZY_TYPES = ("vocabulary",)
+
+# Exercise types whose transcripts keep contractions as spoken. A grammar
+# blank asks for the verb itself, and an expanded "I'm not sure" would
+# answer "I ___ a student" with the "am" nobody said in its place.
+LITERAL_TYPES = ("grammar",)
+
+# Contractions expanded before tokenizing, so "I'm" answers "am"
+CONTRACTIONS = (
+    (re.compile(r"\b(he|she|it|that|what|there|who)'s\b"), r"\1 is"),
+    (re.compile(r"'m\b"), " am"),
+    (re.compile(r"'re\b"), " are"),
+    (re.compile(r"n't\b"), " not"),
+)
+
+# How speech-to-text writes spoken letter names
+LETTER_NAMES = {
+    "ay": "a", "eh": "a",
+    "be": "b", "bee": "b",
+    "see": "c", "sea": "c", "cee": "c",
+    "dee": "d",
+    "ee": "e",
+    "ef": "f", "eff": "f",
+    "gee": "g", "jee": "g",
+    "aitch": "h", "haitch": "h",
+    "eye": "i",
+    "jay": "j",
+    "kay": "k",
+    "el": "l", "ell": "l",
+    "em": "m",
+    "en": "n",
+    "oh": "o",
+    "pee": "p", "pea": "p",
+    "cue": "q", "queue": "q",
+    "ar": "r", "are": "r",
+    "es": "s", "ess": "s",
+    "tee": "t", "tea": "t",
+    "you": "u",
+    "vee": "v",
+    "ex": "x",
+    "why": "y",
+    "zed": "z", "zee": "z",
+}
+
+# Every ASCII character that is not a letter or digit separates tokens
+_SEPARATORS = str.maketrans({chr(code): " " for code in range(128) if not chr(code).isalnum()})
+
+
+def _letter_atoms() -> Dict[str, str]:
+    """Regex alternatives for each letter: itself and its spoken names"""
+    names = defaultdict(list)
+    for name, letter in LETTER_NAMES.items():
+        names[letter].append(name)
+    atoms = {}
+    for letter in "abcdefghijklmnopqrstuvwxyz":
+        spoken = [letter] + sorted(names[letter], key=len, reverse=True)
+        if letter == "w":
+            spoken.append("double (?:you|u)")
+        atoms[letter] = "(?:" + "|".join(spoken) + ")"
+    return atoms
+
+
+LETTER_ATOMS = _letter_atoms()
+
+
+def normalize_text(text: str, expand_contractions: bool = True) -> str:
+    """Lowercase ASCII tokens joined by single spaces, with a space at each end
+
+    Accents, punctuation and contractions are resolved; without
+    ``expand_contractions`` a contraction's apostrophe only splits it, so
+    "I'm" is "i m". The padding lets patterns anchor on token boundaries
+    with plain spaces.
+    """
+    text = text.lower()
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text.replace("\u2019", "'")).encode("ascii", "ignore").decode()
+    if expand_contractions and "'" in text:
+        for pattern, replacement in CONTRACTIONS:
+            text = pattern.sub(replacement, text)
+    return " " + " ".join(text.translate(_SEPARATORS).split()) + " "
+
+
+def normalize(text: str, expand_contractions: bool = True) -> List[str]:
+    """Lowercase ASCII tokens, with accents, punctuation and contractions resolved"""
+    return normalize_text(text, expand_contractions).split()
+
+
+def is_letter_token(token: str) -> bool:
+    return (len(token) == 1 and token.isalpha()) or token in LETTER_NAMES or token == "double"
+
+
+def spelled_pattern(word: str) -> str:
+    """Regex for ``word`` spelled letter by letter, e.g. "a double p l e" for apple"""
+    parts = []
+    position = 0
+    while position < len(word):
+        atom = LETTER_ATOMS[word[position]]
+        if position + 1 < len(word) and word[position + 1] == word[position]:
+            parts.append(f"(?:{atom} {atom}|double {atom})")
+            position += 2
+        else:
+            parts.append(atom)
+            position += 1
+    return " ".join(parts)
+
+
+def trie_pattern(phrases: Iterable[Sequence[str]]) -> str:
+    """One regex alternation for token sequences, factored through a trie"""
+    root: dict = {}
+    for phrase in phrases:
+        node = root
+        for token in phrase:
+            node = node.setdefault(token, {})
+        node[""] = {}
+    return _emit(root)
+
+
+def _emit(node: dict) -> str:
+    branches = []
+    for token in sorted(key for key in node if key):
+        child = node[token]
+        branch = re.escape(token)
+        if any(key for key in child):
+            rest = _emit(child)
+            branch += f"(?: {rest})?" if "" in child else f" {rest}"
+        branches.append(branch)
+    return branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+
+
+def within_distance(a: str, b: str, max_edits: int) -> bool:
+    """Levenshtein distance of ``a`` and ``b`` is at most ``max_edits``
+
+    Only the diagonal band of width ``2 * max_edits + 1`` is computed.
+    """
+    if abs(len(a) - len(b)) > max_edits:
+        return False
+    if max_edits == 0:
+        return a == b
+    previous = {j: j for j in range(0, min(len(b), max_edits) + 1)}
+    for i in range(1, len(a) + 1):
+        current = {}
+        low, high = max(0, i - max_edits), min(len(b), i + max_edits)
+        if low == 0:
+            current[0] = i
+        for j in range(max(1, low), high + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(
+                previous.get(j, max_edits + 1) + 1,
+                current.get(j - 1, max_edits + 1) + 1,
+                previous.get(j - 1, max_edits + 1) + cost,
+            )
+        if min(current.values()) > max_edits:
+            return False
+        previous = current
+    return previous.get(len(b), max_edits + 1) <= max_edits
+
+
+def allowed_edits(word: str) -> int:
+    """Typos tolerated in a word: one from eight letters, none below"""
+    return 1 if len(word) >= 8 else 0
+
+
+class AnswerMatcher:
+    """Precompiled check of transcripts against one exercise's accepted answers"""
+
+    def __init__(self, accepted_answers: Iterable[str], fuzzy: bool = False, expand_contractions: bool = True):
+        self.expand_contractions = expand_contractions
+        phrases = {tuple(normalize(answer, expand_contractions)) for answer in accepted_answers}
+        phrases.discard(())
+        # Answers written as separate letters ("c a t") are spellings, which
+        # must be the whole spelled run, rather than token sequences
+        spelled = {phrase for phrase in phrases if len(phrase) > 1 and all(len(t) == 1 for t in phrase)}
+        words = phrases - spelled
+        self.spellings = {"".join(phrase) for phrase in spelled}
+        self.spellings |= {phrase[0] for phrase in words if len(phrase) == 1 and phrase[0].isalpha()}
+
+        # Patterns run over normalize_text output, where every token has a
+        # space on both sides
+        self.pattern = None
+        if words:
+            self.pattern = re.compile(rf" {trie_pattern(words)}(?= )")
+        self.spelled_pattern = None
+        if self.spellings:
+            alternatives = "|".join(spelled_pattern(word) for word in sorted(self.spellings))
+            self.spelled_pattern = re.compile(rf" (?:{alternatives})(?= )")
+        self.fuzzy_words = {}
+        if fuzzy:
+            self.fuzzy_words = {
+                phrase[0]: allowed_edits(phrase[0]) for phrase in words
+                if len(phrase) == 1 and allowed_edits(phrase[0])
+            }
+
+    def matches(self, transcript: str) -> bool:
+        text = normalize_text(transcript, self.expand_contractions)
+        if self.pattern is not None and self.pattern.search(text):
+            return True
+        if self.spelled_pattern is not None:
+            for match in self.spelled_pattern.finditer(text):
+                if self._whole_run(text, match.start(), match.end()):
+                    return True
+        if self.fuzzy_words:
+            for token in set(text.split()):
+                for word, edits in self.fuzzy_words.items():
+                    # A different first letter is another word: fountain, mountain
+                    if token[0] == word[0] and within_distance(token, word, edits):
+                        return True
+        return False
+
+    @staticmethod
+    def _whole_run(text: str, start: int, end: int) -> bool:
+        """No letter token directly before or after, so "c a t s" does not spell cat"""
+        before = text[text.rfind(" ", 0, start) + 1:start]
+        after_end = text.find(" ", end + 1)
+        after = text[end + 1:after_end] if after_end != -1 else ""
+        return not (before and is_letter_token(before)) and not (after and is_letter_token(after))
+
+
+class AnswerMatchers:
+    """AnswerMatchers keyed by exercise ``_id``, compiled once per exercise"""
+
+    def __init__(self):
+        self._matchers: Dict[str, AnswerMatcher] = {}
+
+    def __len__(self):
+        return len(self._matchers)
+
+    @staticmethod
+    def compile(exercise: dict) -> AnswerMatcher:
+        exercise_type = exercise.get("type")
+        return AnswerMatcher(
+            exercise["accepted_answers"],
+            fuzzy=exercise_type in FUZZY_TYPES,
+            expand_contractions=exercise_type not in LITERAL_TYPES,
+        )
+
+    def add_many(self, exercises: Iterable[dict]):
+        for exercise in exercises:
+            self._matchers[str(exercise["_id"])] = self.compile(exercise)
+
+    def matcher_for(self, exercise: dict) -> AnswerMatcher:
+        """Compiled matcher for an exercise, compiling it on first use"""
+        doc_id = str(exercise.get("_id"))
+        matcher = self._matchers.get(doc_id)
+        if matcher is None:
+            matcher = self._matchers[doc_id] = self.compile(exercise)
+        return matcher
+
+    def clear(self):
+        self._matchers.clear()
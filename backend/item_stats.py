@@ -0,0 +1,211 @@
+"""Per-item answer statistics, maintained as answers are graded.
+
+Each item gets a slot the first time it is answered; the counters are
+parallel ``array`` columns indexed by slot (attempts, correct answers,
+summed latency and how many answers had a latency), so recording an answer
+is a dict lookup and a few in-place additions on the event loop. Items are
+grouped by (type, difficulty) through a one-byte-per-item group code.
+Answers that find no free slot still count towards their group.
+
+An item is its ``_id`` unless a ``key`` function says otherwise: generated
+problems get a fresh id every time they are served, so they are counted by
+``question_key`` instead, or every answer would take a slot of its own.
+
+Latency-to-answer is measured on the server: when an item is served to a
+session (as the next item of an answer, or over the session socket) the
+time is noted, and an answer from that session to that item records the
+elapsed time. Answers to items served any other way count without one.
+
+Reads copy the columns (a memcpy) and aggregate the copy on a worker
+thread in O(items), so a stats request never holds up answer handling.
+"""
+import heapq
+import time
+from array import array
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+ITEM_STATS_MAX_ITEMS = 1_000_000
+SERVED_SESSIONS_MAX = 50_000
+
+
+def item_id(document: dict) -> str:
+    return str(document.get("_id"))
+
+
+def question_key(document: dict) -> Tuple[str, str, str]:
+    """The same question at another difficulty is another item"""
+    return (document.get("type"), document.get("difficulty"), document.get("question"))
+
+
+class StatsSnapshot:
+    """Copies of the counter columns, safe to aggregate off the event loop"""
+
+    def __init__(self, stats: "ItemStats"):
+        self.count = len(stats.attempts)
+        self.ids = stats.ids
+        self.group_names = list(stats.group_names)
+        self.attempts = array(stats.attempts.typecode, stats.attempts)
+        self.correct = array(stats.correct.typecode, stats.correct)
+        self.latency_total = array(stats.latency_total.typecode, stats.latency_total)
+        self.timed = array(stats.timed.typecode, stats.timed)
+        self.groups = array(stats.groups.typecode, stats.groups)
+        self.untracked = stats.untracked
+        self.untracked_by_group = [list(counters) for counters in stats.untracked_by_group]
+
+
+def _rates(attempts: int, correct: int, latency_total: float, timed: int) -> dict:
+    return {
+        "attempts": attempts,
+        "correct": correct,
+        "accuracy": round(correct / attempts, 4) if attempts else None,
+        "mean_latency_ms": round(latency_total / timed * 1000, 1) if timed else None,
+    }
+
+
+class ItemStats:
+    """Attempt, correct and latency counters per item of one content kind"""
+
+    def __init__(self, max_items: int = ITEM_STATS_MAX_ITEMS, max_sessions: int = SERVED_SESSIONS_MAX,
+                 key: Callable[[dict], Hashable] = item_id):
+        self.max_items = max_items
+        self.max_sessions = max_sessions
+        self.key = key
+        self.slots: Dict[Hashable, int] = {}
+        # The first id answered for each slot's item. Append-only, so a
+        # snapshot can share it and read the first ``count``
+        self.ids: List[str] = []
+        self.attempts = array("L")
+        self.correct = array("L")
+        self.latency_total = array("d")
+        self.timed = array("L")
+        self.groups = array("B")
+        self.group_names: List[Tuple[str, str]] = []
+        self._group_codes: Dict[Tuple[str, str], int] = {}
+        # Answers to items that arrived after max_items slots were taken, and
+        # their [attempts, correct, latency total, timed] per group code
+        self.untracked = 0
+        self.untracked_by_group: List[list] = []
+        # session_id -> (item id, monotonic time it was served)
+        self._served: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _group(self, document: dict) -> Optional[int]:
+        group = (document.get("type"), document.get("difficulty"))
+        code = self._group_codes.get(group)
+        if code is None:
+            # Group codes are one byte
+            if len(self.group_names) == 256:
+                return None
+            code = self._group_codes[group] = len(self.group_names)
+            self.group_names.append(group)
+            self.untracked_by_group.append([0, 0, 0.0, 0])
+        return code
+
+    def _slot(self, key: Hashable, doc_id: str, document: dict) -> Optional[int]:
+        slot = self.slots.get(key)
+        if slot is not None:
+            return slot
+        if len(self.ids) >= self.max_items:
+            return None
+        code = self._group(document)
+        if code is None:
+            return None
+        slot = self.slots[key] = len(self.ids)
+        self.ids.append(doc_id)
+        self.attempts.append(0)
+        self.correct.append(0)
+        self.latency_total.append(0.0)
+        self.timed.append(0)
+        self.groups.append(code)
+        return slot
+
+    def served(self, session_id: Optional[str], doc_id: str, now: Optional[float] = None):
+        """Note that ``doc_id`` was just served to a session"""
+        if not session_id:
+            return
+        self._served[session_id] = (str(doc_id), time.monotonic() if now is None else now)
+        self._served.move_to_end(session_id)
+        if len(self._served) > self.max_sessions:
+            self._served.popitem(last=False)
+
+    def record(self, document: dict, correct: bool, session_id: Optional[str] = None,
+               now: Optional[float] = None) -> Optional[float]:
+        """Count an answer to ``document``; returns its latency in seconds if known"""
+        doc_id = str(document.get("_id"))
+        served = self._served.pop(session_id, None) if session_id else None
+        latency = None
+        if served is not None and served[0] == doc_id:
+            latency = (time.monotonic() if now is None else now) - served[1]
+        slot = self._slot(self.key(document), doc_id, document)
+        if slot is None:
+            self._record_untracked(document, correct, latency)
+            return latency
+        self.attempts[slot] += 1
+        if correct:
+            self.correct[slot] += 1
+        if latency is not None:
+            self.latency_total[slot] += latency
+            self.timed[slot] += 1
+        return latency
+
+    def _record_untracked(self, document: dict, correct: bool, latency: Optional[float]):
+        self.untracked += 1
+        code = self._group(document)
+        if code is None:
+            return
+        counters = self.untracked_by_group[code]
+        counters[0] += 1
+        counters[1] += correct
+        if latency is not None:
+            counters[2] += latency
+            counters[3] += 1
+
+    def snapshot(self) -> StatsSnapshot:
+        return StatsSnapshot(self)
+
+
+def summarize(snapshot: StatsSnapshot, top: int = 10, min_attempts: int = 5) -> dict:
+    """Totals, per (type, difficulty) aggregates and the least accurate items"""
+    items = [0] * len(snapshot.group_names)
+    # Per-group totals start from the answers that found no free slot
+    attempts = [counters[0] for counters in snapshot.untracked_by_group]
+    correct = [counters[1] for counters in snapshot.untracked_by_group]
+    latency_total = [counters[2] for counters in snapshot.untracked_by_group]
+    timed = [counters[3] for counters in snapshot.untracked_by_group]
+    candidates = []
+    for slot in range(snapshot.count):
+        group = snapshot.groups[slot]
+        tries = snapshot.attempts[slot]
+        items[group] += 1
+        attempts[group] += tries
+        correct[group] += snapshot.correct[slot]
+        latency_total[group] += snapshot.latency_total[slot]
+        timed[group] += snapshot.timed[slot]
+        if tries >= min_attempts:
+            candidates.append(slot)
+
+    hardest = heapq.nsmallest(
+        top, candidates, key=lambda slot: (snapshot.correct[slot] / snapshot.attempts[slot], -snapshot.attempts[slot])
+    )
+    by_group = [
+        {"type": type, "difficulty": difficulty, "items": items[code],
+         **_rates(attempts[code], correct[code], latency_total[code], timed[code])}
+        for code, (type, difficulty) in enumerate(snapshot.group_names)
+    ]
+    by_group.sort(key=lambda group: (str(group["type"]), str(group["difficulty"])))
+    return {
+        "items": snapshot.count,
+        "untracked_answers": snapshot.untracked,
+        **_rates(sum(attempts), sum(correct), sum(latency_total), sum(timed)),
+        "by_type_difficulty": by_group,
+        "hardest": [
+            {"id": snapshot.ids[slot], "type": snapshot.group_names[snapshot.groups[slot]][0],
+             "difficulty": snapshot.group_names[snapshot.groups[slot]][1],
+             **_rates(snapshot.attempts[slot], snapshot.correct[slot],
+                      snapshot.latency_total[slot], snapshot.timed[slot])}
+            for slot in hardest
+        ],
+    }
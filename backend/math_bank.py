@@ -0,0 +1,120 @@
+"""Columnar math problem banks generated in bulk with NumPy.
+
+Building problems one at a time with ``random.randint`` and a pydantic
+model costs microseconds per item, which is far too slow for banks of
+hundreds of thousands of problems. Here every (type, difficulty) block is
+drawn as whole operand arrays, with the constraints applied vectorized, and
+the bank keeps only integer columns: operands, answer and small-int codes
+for type and difficulty. Text is rendered from a row when it is needed.
+"""
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+
+from math_generator import DIFFICULTIES, MATH_TYPES, OPERAND_RANGES, render_text
+
+TYPE_CODES = {type: code for code, type in enumerate(MATH_TYPES)}
+DIFFICULTY_CODES = {difficulty: code for code, difficulty in enumerate(DIFFICULTIES)}
+
+OPERAND_DTYPE = np.int32
+CODE_DTYPE = np.uint8
+
+
+class MathBank:
+    """Math problems stored as parallel integer columns"""
+
+    def __init__(self, a, b, answer, type_codes, difficulty_codes):
+        self.a = a
+        self.b = b
+        self.answer = answer
+        self.type_codes = type_codes
+        self.difficulty_codes = difficulty_codes
+
+    def __len__(self):
+        return len(self.answer)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self.columns())
+
+    def columns(self):
+        return self.a, self.b, self.answer, self.type_codes, self.difficulty_codes
+
+    @classmethod
+    def empty(cls) -> "MathBank":
+        operands = np.empty(0, dtype=OPERAND_DTYPE)
+        codes = np.empty(0, dtype=CODE_DTYPE)
+        return cls(operands, operands.copy(), operands.copy(), codes, codes.copy())
+
+    @classmethod
+    def concatenate(cls, banks: Sequence["MathBank"]) -> "MathBank":
+        if not banks:
+            return cls.empty()
+        return cls(*(np.concatenate(parts) for parts in zip(*(bank.columns() for bank in banks))))
+
+    def type_of(self, row: int) -> str:
+        return MATH_TYPES[self.type_codes[row]]
+
+    def difficulty_of(self, row: int) -> str:
+        return DIFFICULTIES[self.difficulty_codes[row]]
+
+    def document(self, row: int, doc_id: str) -> dict:
+        """Render one row as a problem document"""
+        type = self.type_of(row)
+        a, b = int(self.a[row]), int(self.b[row])
+        question, display = render_text(type, a, b)
+        return {
+            "_id": doc_id,
+            "question": question,
+            "display": display,
+            "answer": int(self.answer[row]),
+            "type": type,
+            "difficulty": self.difficulty_of(row),
+        }
+
+
+def generate_block(type: str, difficulty: str, count: int, rng: np.random.Generator) -> MathBank:
+    """``count`` problems of one type and difficulty, drawn as whole arrays"""
+    (a_low, a_high), (b_low, b_high) = OPERAND_RANGES[(type, difficulty)]
+    a = rng.integers(a_low, a_high, size=count, endpoint=True, dtype=OPERAND_DTYPE)
+    if type == "subtraction":
+        # Cap each second operand at its first so no result is negative
+        b = rng.integers(b_low, np.minimum(b_high, a), endpoint=True, dtype=OPERAND_DTYPE)
+    else:
+        b = rng.integers(b_low, b_high, size=count, endpoint=True, dtype=OPERAND_DTYPE)
+
+    if type == "addition":
+        answer = a + b
+    elif type == "subtraction":
+        answer = a - b
+    elif type == "multiplication":
+        answer = a * b
+    else:
+        # Division draws (divisor, quotient); the dividend is their product
+        a, b, answer = a * b, a, b
+
+    invalid = answer < 0
+    if type == "division":
+        invalid |= (b == 0) | (a % np.maximum(b, 1) != 0)
+    if invalid.any():
+        raise ValueError(f"{int(invalid.sum())} invalid {difficulty} {type} problems generated")
+
+    return MathBank(
+        a.astype(OPERAND_DTYPE, copy=False),
+        b.astype(OPERAND_DTYPE, copy=False),
+        answer.astype(OPERAND_DTYPE, copy=False),
+        np.full(count, TYPE_CODES[type], dtype=CODE_DTYPE),
+        np.full(count, DIFFICULTY_CODES[difficulty], dtype=CODE_DTYPE),
+    )
+
+
+def generate_bank(per_combination: int, types: Iterable[str] = MATH_TYPES,
+                  difficulties: Iterable[str] = DIFFICULTIES, seed: Optional[int] = None) -> MathBank:
+    """Bank with ``per_combination`` problems for every type and difficulty"""
+    rng = np.random.default_rng(seed)
+    difficulties = tuple(difficulties)
+    return MathBank.concatenate([
+        generate_block(type, difficulty, per_combination, rng)
+        for type in types
+        for difficulty in difficulties
+    ])
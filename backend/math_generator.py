@@ -0,0 +1,172 @@
+"""Stateless, deterministic math problem generation.
+
+A generated problem's id encodes ``(type, difficulty, seed)``, for example
+``gen:addition:easy:5f3a9c``. The operands are drawn from a splitmix64
+stream seeded by ``seed``, so any process can rebuild the same problem from
+its id in O(1): nothing is stored, the variety is effectively unlimited, and
+checking an answer is a pure computation.
+"""
+import random
+from typing import List, Optional, Tuple
+
+from content_service import BaseContentService, RecentItems
+from response_cache import ResponseCache
+
+MATH_TYPES = ("addition", "subtraction", "multiplication", "division")
+DIFFICULTIES = ("easy", "medium", "hard")
+
+# Operand ranges (inclusive) per type and difficulty. Subtraction caps the
+# second operand at the first so results are never negative; division draws
+# (divisor, quotient) and multiplies them so it always divides exactly.
+OPERAND_RANGES = {
+    ("addition", "easy"): ((1, 10), (1, 10)),
+    ("addition", "medium"): ((10, 50), (1, 20)),
+    ("addition", "hard"): ((50, 500), (50, 500)),
+    ("subtraction", "easy"): ((5, 20), (1, 20)),
+    ("subtraction", "medium"): ((20, 100), (1, 50)),
+    ("subtraction", "hard"): ((100, 999), (10, 999)),
+    ("multiplication", "easy"): ((1, 5), (1, 10)),
+    ("multiplication", "medium"): ((2, 12), (2, 12)),
+    ("multiplication", "hard"): ((11, 25), (3, 12)),
+    ("division", "easy"): ((2, 5), (1, 10)),
+    ("division", "medium"): ((2, 10), (11, 20)),
+    ("division", "hard"): ((11, 25), (11, 40)),
+}
+
+# Spoken and displayed operators per type
+OPERATORS = {
+    "addition": ("plus", "+"),
+    "subtraction": ("minus", "-"),
+    "multiplication": ("times", "×"),
+    "division": ("divided by", "÷"),
+}
+
+# Every value the filterable fields of math content can take
+FIELD_VALUES = {"type": MATH_TYPES, "difficulty": DIFFICULTIES}
+
+ID_PREFIX = "gen"
+SEED_BITS = 48
+_MASK64 = (1 << 64) - 1
+
+
+def _splitmix64(state: int) -> Tuple[int, int]:
+    """Next state and 64-bit output of the splitmix64 generator"""
+    state = (state + 0x9E3779B97F4A7C15) & _MASK64
+    z = state
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return state, z ^ (z >> 31)
+
+
+def _draw(state: int, low: int, high: int) -> Tuple[int, int]:
+    state, value = _splitmix64(state)
+    return state, low + value % (high - low + 1)
+
+
+def operands(type: str, difficulty: str, seed: int) -> Tuple[int, int, int]:
+    """``(a, b, answer)`` for a problem, the same for the same arguments"""
+    (a_low, a_high), (b_low, b_high) = OPERAND_RANGES[(type, difficulty)]
+    state, a = _draw(seed, a_low, a_high)
+    if type == "subtraction":
+        _, b = _draw(state, b_low, min(b_high, a))
+        return a, b, a - b
+    _, b = _draw(state, b_low, b_high)
+    if type == "addition":
+        return a, b, a + b
+    if type == "multiplication":
+        return a, b, a * b
+    # Division: a is the divisor and b the quotient
+    return a * b, a, b
+
+
+def render_text(type: str, a: int, b: int) -> Tuple[str, str]:
+    """Spoken question and display string for ``a <op> b``"""
+    word, symbol = OPERATORS[type]
+    return f"What is {a} {word} {b}?", f"{a} {symbol} {b} = ?"
+
+
+def problem_id(type: str, difficulty: str, seed: int) -> str:
+    return f"{ID_PREFIX}:{type}:{difficulty}:{seed:x}"
+
+
+def parse_problem_id(doc_id: str) -> Optional[Tuple[str, str, int]]:
+    """``(type, difficulty, seed)`` encoded in a generated id, or None"""
+    parts = doc_id.split(":")
+    if len(parts) != 4 or parts[0] != ID_PREFIX or (parts[1], parts[2]) not in OPERAND_RANGES:
+        return None
+    try:
+        seed = int(parts[3], 16)
+    except ValueError:
+        return None
+    # Only the canonical spelling is accepted, so each problem has one id
+    if not 0 <= seed < (1 << SEED_BITS) or parts[3] != f"{seed:x}":
+        return None
+    return parts[1], parts[2], seed
+
+
+def generate_problem(type: str, difficulty: str, seed: int) -> dict:
+    """Problem document for ``(type, difficulty, seed)``"""
+    a, b, answer = operands(type, difficulty, seed)
+    question, display = render_text(type, a, b)
+    return {
+        "_id": problem_id(type, difficulty, seed),
+        "question": question,
+        "display": display,
+        "answer": answer,
+        "type": type,
+        "difficulty": difficulty,
+    }
+
+
+class GeneratedMathContent(BaseContentService):
+    """Content service for generated problems, interchangeable with ContentService
+
+    Nothing is loaded or stored: picks synthesize fresh seeds and lookups
+    regenerate the problem from its id. Bodies are rendered per request, as
+    caching them would keep every generated problem alive.
+    """
+
+    # Problems are never written to the math_problems collection
+    stored = False
+    loaded = True
+    generation = 0
+    # Ids are fresh seeds and never repeat, so sessions remember questions
+    recent_key = "question"
+    field_values = FIELD_VALUES
+
+    def __init__(self, responses: ResponseCache, rng=random):
+        self.responses = responses
+        self.rng = rng
+        self.recent = RecentItems()
+
+    def load(self, documents):
+        """Generated content has nothing to load"""
+
+    def get(self, doc_id: str) -> Optional[dict]:
+        parsed = parse_problem_id(doc_id)
+        return generate_problem(*parsed) if parsed else None
+
+    def catalog(self, match: dict) -> None:
+        """Generated problems are unbounded, so there is no catalog"""
+        return None
+
+    def pick(self, match: dict, size: int = 1, session_id: Optional[str] = None) -> List[dict]:
+        """Up to ``size`` generated problems with distinct questions
+
+        With a ``session_id``, questions the session was served recently are
+        avoided while other draws turn up, and the picks are remembered.
+        """
+        types = (match["type"],) if "type" in match else MATH_TYPES
+        difficulties = (match["difficulty"],) if "difficulty" in match else DIFFICULTIES
+        if any((t, d) not in OPERAND_RANGES for t in types for d in difficulties):
+            return []
+        # Distinct seeds can still yield the same question in small ranges
+        # (there are only 100 easy additions), so batches skip repeats
+        seen = self.recent.seen(session_id)
+        draws = (
+            generate_problem(self.rng.choice(types), self.rng.choice(difficulties), self.rng.getrandbits(SEED_BITS))
+            for _ in range(size * 4 + len(seen))
+        )
+        documents = self.unseen_first(draws, size, seen)
+        self.remember(session_id, documents)
+        return documents
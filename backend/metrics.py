@@ -0,0 +1,238 @@
+"""Process-local metrics, exposed in the Prometheus text format.
+
+Everything that records a metric runs on the event loop thread, so the
+counters are plain integers and floats updated without any lock: recording
+a histogram observation is a ``bisect`` and three additions. Labelled series
+are created on first use and cached, and hot paths hold on to the series
+object (see ``lock_observer``) so they skip even the label lookup.
+
+Each worker process keeps its own metrics; a scraper sees the worker that
+answered the scrape, as with any multi-process Prometheus target.
+"""
+import bisect
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+LOCK_BUCKETS = (0.00001, 0.0001, 0.001, 0.01, 0.1, 1.0)
+SCAN_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(names: Sequence[str], values: Sequence[str]) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+class HistogramSeries:
+    """Bucket counts, sum and count for one label combination"""
+
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        # One slot per bound plus the +Inf overflow; not cumulative
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class GaugeSeries:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Metric:
+    """A named metric family with its labelled series"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[tuple, object] = {}
+
+    def _new_series(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """Series for these label values, created on first use"""
+        key = tuple(str(value) for value in values)
+        series = self._series.get(key)
+        if series is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}, got {key}")
+            series = self._series[key] = self._new_series()
+        return series
+
+    def clear(self):
+        self._series.clear()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key in sorted(self._series):
+            lines.extend(self._render_series(key, self._series[key]))
+        return lines
+
+    def _render_series(self, key, series) -> List[str]:
+        raise NotImplementedError
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_series(self):
+        return HistogramSeries(self.buckets)
+
+    def observe(self, value: float, *labels):
+        self.labels(*labels).observe(value)
+
+    def _render_series(self, key, series):
+        labels = _label_text(self.labelnames, key)
+        prefix = labels + "," if labels else ""
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), series.counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{{prefix}le="{_number(bound)}"}} {cumulative}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{self.name}_sum{suffix} {_number(series.sum)}")
+        lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _new_series(self):
+        return GaugeSeries()
+
+    def set(self, value: float, *labels):
+        self.labels(*labels).set(value)
+
+    def _render_series(self, key, series):
+        labels = _label_text(self.labelnames, key)
+        suffix = f"{{{labels}}}" if labels else ""
+        return [f"{self.name}{suffix} {_number(series.value)}"]
+
+
+class Registry:
+    """Metric families rendered together for a scrape"""
+
+    def __init__(self):
+        self.metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        for metric in self.metrics:
+            metric.clear()
+
+
+REGISTRY = Registry()
+
+request_latency = REGISTRY.register(Histogram(
+    "eduassist_request_duration_seconds", "Time from request to the end of the response body, per route",
+    ("method", "route", "status"),
+))
+lock_wait = REGISTRY.register(Histogram(
+    "eduassist_lock_wait_seconds", "Time spent waiting to acquire a collection lock",
+    ("collection", "lock"), LOCK_BUCKETS,
+))
+lock_hold = REGISTRY.register(Histogram(
+    "eduassist_lock_hold_seconds", "Time a collection lock was held",
+    ("collection", "lock"), LOCK_BUCKETS,
+))
+scan_length = REGISTRY.register(Histogram(
+    "eduassist_scan_documents", "Documents a collection query had to examine, by query plan",
+    ("collection", "plan"), SCAN_BUCKETS,
+))
+sessions = REGISTRY.register(Gauge("eduassist_sessions", "Live session progress documents"))
+content_items = REGISTRY.register(Gauge("eduassist_content_items", "Items in each loaded content bank", ("kind",)))
+
+
+def lock_observer(collection: str, lock: Optional[str] = None):
+    """Observer for AsyncRWLock/KeyedLock recording into lock_wait/lock_hold
+
+    Series are labelled ``lock`` if given, else with the lock's mode. The
+    locks only report acquisitions that had to wait.
+    """
+    series = {}
+
+    def observe(mode: str, waited: float, held: float):
+        pair = series.get(mode)
+        if pair is None:
+            name = lock or mode
+            pair = series[mode] = (lock_wait.labels(collection, name), lock_hold.labels(collection, name))
+        pair[0].observe(waited)
+        pair[1].observe(held)
+
+    return observe
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware recording request_latency per route template
+
+    The route is labelled with its path template (``/api/progress/{session_id}``)
+    so the series stay bounded; requests no route matched share "unmatched".
+    """
+
+    def __init__(self, app, histogram: Histogram = request_latency):
+        self.app = app
+        self.histogram = histogram
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            self.histogram.observe(time.perf_counter() - started, scope["method"], route, status)
@@ -0,0 +1,102 @@
+"""MongoDB storage backend with the same collection interface as MockDB.
+
+Route handlers await ``aggregate`` and get a list back, and get plain dicts
+from the write methods. Motor returns cursors and result objects instead,
+so this module adapts them. One pooled client is shared by every collection.
+"""
+import copy
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+
+class MongoCollection:
+    """Adapts a Motor collection to the MockCollection call conventions"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.name = collection.name
+
+    async def aggregate(self, pipeline):
+        # Callers may reuse a pipeline, and mongomock consumes stage options
+        pipeline = copy.deepcopy(pipeline)
+        return await self.collection.aggregate(pipeline).to_list(length=None)
+
+    async def find_one(self, query):
+        return await self.collection.find_one(query)
+
+    async def insert_many(self, documents):
+        if documents:
+            await self.collection.insert_many(documents, ordered=False)
+
+    async def insert_one(self, document):
+        result = await self.collection.insert_one(document)
+        return {"inserted_id": result.inserted_id}
+
+    async def replace_one(self, query, document, upsert=False):
+        await self.collection.replace_one(query, document, upsert=upsert)
+
+    async def update_one(self, query, update, upsert=False):
+        result = await self.collection.update_one(query, update, upsert=upsert)
+        return {
+            "matched_count": result.matched_count,
+            "modified_count": result.modified_count,
+            "upserted_id": result.upserted_id,
+        }
+
+    async def count_documents(self, query):
+        return await self.collection.count_documents(query)
+
+    async def create_index(self, keys, **kwargs):
+        return await self.collection.create_index(keys, **kwargs)
+
+    async def delete_expired(self, now=None):
+        """mongod's own TTL monitor removes expired documents"""
+        return 0
+
+    async def expiry_stats(self):
+        return {
+            "live": await self.collection.estimated_document_count(),
+            "expired_evictions": None,
+            "lru_evictions": None,
+            "max_entries": None,
+        }
+
+
+class MongoDB:
+    """Database handle handing out cached MongoCollection adapters"""
+
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        self.database = client[name]
+        self._collections = {}
+
+    def __getattr__(self, collection_name):
+        if collection_name.startswith('_'):
+            raise AttributeError(collection_name)
+        collection = self._collections.get(collection_name)
+        if collection is None:
+            collection = self._collections[collection_name] = MongoCollection(self.database[collection_name])
+        return collection
+
+    def close(self):
+        self.client.close()
+
+
+def connect(url, name, max_pool_size=100, min_pool_size=0, server_selection_timeout_ms=5000,
+            connect_timeout_ms=5000, socket_timeout_ms=10000):
+    """Create a pooled client; ``mongomock://`` URLs use an in-process stand-in"""
+    if url.startswith("mongomock://"):
+        from mongomock_motor import AsyncMongoMockClient
+        return MongoDB(AsyncMongoMockClient(), name)
+
+    client = AsyncIOMotorClient(
+        url,
+        maxPoolSize=max_pool_size,
+        minPoolSize=min_pool_size,
+        serverSelectionTimeoutMS=server_selection_timeout_ms,
+        connectTimeoutMS=connect_timeout_ms,
+        socketTimeoutMS=socket_timeout_ms,
+        tz_aware=False,
+    )
+    return MongoDB(client, name)
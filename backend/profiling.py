@@ -0,0 +1,74 @@
+"""Opt-in sampled profiling of whole requests.
+
+``SampledProfilerMiddleware`` runs ``cProfile`` over one in every ``every``
+requests, and over any request whose ``X-Profile`` header carries the
+configured token, and writes the stats to ``directory`` as
+``<ms timestamp>-<method>-<path>.prof``. Open them offline with
+``python -m pstats``, ``snakeviz`` or ``flameprof`` for a flame graph.
+
+cProfile traces the event loop thread, so a profile also contains whatever
+other requests ran while the sampled one was awaiting; only one request is
+profiled at a time, and samples due meanwhile are skipped.
+"""
+import asyncio
+import cProfile
+import hmac
+import logging
+import re
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+
+
+def profile_name(method: str, path: str) -> str:
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_") or "root"
+    return f"{int(time.time() * 1000)}-{method}-{slug[:80]}.prof"
+
+
+class SampledProfilerMiddleware:
+    """ASGI middleware profiling sampled or explicitly requested requests"""
+
+    def __init__(self, app, directory, every: int = 0, token: str = ""):
+        self.app = app
+        self.directory = Path(directory)
+        self.every = every
+        self.token = token.encode()
+        self.requests = 0
+        self.written = 0
+        self._active = False
+
+    def _selected(self, scope) -> bool:
+        if self.token:
+            for name, value in scope.get("headers", ()):
+                if name == PROFILE_HEADER and hmac.compare_digest(value, self.token):
+                    return True
+        if not self.every:
+            return False
+        self.requests += 1
+        return self.requests % self.every == 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._selected(scope) or self._active:
+            await self.app(scope, receive, send)
+            return
+        self._active = True
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profile.disable()
+            self._active = False
+            path = self.directory / profile_name(scope["method"], scope["path"])
+            try:
+                await asyncio.to_thread(self._write, profile, path)
+            except OSError as e:
+                logger.error(f"Error writing profile {path}: {e}")
+
+    def _write(self, profile: cProfile.Profile, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        profile.dump_stats(path)
+        self.written += 1
@@ -0,0 +1,47 @@
+"""Pre-serialized JSON bodies for the immutable learning content.
+
+Problems and exercises never change once loaded, so each one is validated
+and rendered through its response model a single time. Handlers return the
+cached bytes in a raw ``Response`` instead of building a model per request
+and letting FastAPI validate and serialize it again.
+"""
+from typing import Dict, Iterable, Optional, Type
+
+from pydantic import BaseModel
+
+
+class ResponseCache:
+    """JSON bodies keyed by document ``_id``, rendered through ``model``"""
+
+    media_type = "application/json"
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self._bodies: Dict[str, bytes] = {}
+
+    def __len__(self):
+        return len(self._bodies)
+
+    def render(self, document: dict) -> bytes:
+        """Body exactly as the response model would serialize the document"""
+        data = {key: value for key, value in document.items() if key != "_id"}
+        data["id"] = str(document.get("_id", document.get("id", "unknown")))
+        return self.model(**data).model_dump_json().encode()
+
+    def add_many(self, documents: Iterable[dict]):
+        for document in documents:
+            self._bodies[str(document["_id"])] = self.render(document)
+
+    def get(self, doc_id: str) -> Optional[bytes]:
+        return self._bodies.get(doc_id)
+
+    def body_for(self, document: dict) -> bytes:
+        """Cached body for a stored document, rendering it on first use"""
+        doc_id = str(document.get("_id"))
+        body = self._bodies.get(doc_id)
+        if body is None:
+            body = self._bodies[doc_id] = self.render(document)
+        return body
+
+    def clear(self):
+        self._bodies.clear()
@@ -0,0 +1,60 @@
+"""Random sampling over the pre-bucketed content indexes.
+
+``$sample`` used to copy the filtered documents into a fresh list and pick
+one. The buckets in ``ContentIndex`` already hold every filter combination
+as an array, so sampling only draws positions into the matching bucket:
+O(size) per call, whatever the bucket length.
+"""
+import random
+from typing import List, Sequence
+
+from content_index import ContentIndex
+
+
+def sample_positions(population_size: int, size: int, replace: bool = False, rng=random) -> List[int]:
+    """Draw ``size`` positions in ``range(population_size)``
+
+    With replacement every draw is independent. Without replacement at most
+    ``population_size`` distinct positions are returned, chosen with Floyd's
+    algorithm so only the chosen positions are ever materialised.
+    """
+    if population_size <= 0 or size <= 0:
+        return []
+    if replace:
+        return [rng.randrange(population_size) for _ in range(size)]
+
+    size = min(size, population_size)
+    if size == 1:
+        return [rng.randrange(population_size)]
+
+    chosen = set()
+    positions = []
+    for upper in range(population_size - size, population_size):
+        position = rng.randrange(upper + 1)
+        if position in chosen:
+            position = upper
+        chosen.add(position)
+        positions.append(position)
+    # Floyd's algorithm picks a uniform set, not a uniform order
+    rng.shuffle(positions)
+    return positions
+
+
+def sample_sequence(population: Sequence, size: int, replace: bool = False, rng=random) -> list:
+    """Sample items from an indexable sequence without copying it"""
+    return [population[i] for i in sample_positions(len(population), size, replace, rng)]
+
+
+class BucketSampler:
+    """Samples documents from the bucket matching a ``$match`` filter"""
+
+    def __init__(self, index: ContentIndex, rng=random):
+        self.index = index
+        self.rng = rng
+
+    def sample(self, match: dict, size: int = 1, replace: bool = False) -> List[dict]:
+        bucket = self.index.lookup(match)
+        if bucket is None:
+            # Unindexed filter: the scan result is the only bucket available
+            bucket = self.index.scan(match)
+        return sample_sequence(bucket, size, replace, self.rng)
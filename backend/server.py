@@ -1,129 +1,362 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Query
+from fastapi import FastAPI, APIRouter, Header, HTTPException, Query, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import asyncio
+import json
 import logging
 import uuid
 import random
+from collections import defaultdict
 from datetime import datetime, timedelta
 from pathlib import Path
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
 from typing import List, Optional
 from dotenv import load_dotenv
 
+# Optional backends (motor, NumPy for columnar banks, SQLite session stores)
+# are imported where they are selected, so startup only pays for what is used
+import metrics
+from catalog import CatalogCache, CatalogTooLarge, CatalogUnavailable, etag_matches
+from concurrency import AsyncRWLock, KeyedLock
+from content_index import ContentIndex
+from content_service import ContentService
+from english_matcher import AnswerMatchers
+from item_stats import ItemStats, question_key, summarize
+from math_generator import GeneratedMathContent
+from metrics import RequestMetricsMiddleware, lock_observer
+from request_timing import ServerTimingMiddleware, span
+from response_cache import ResponseCache
+from sampling import sample_sequence
+from ttl import ExpiryIndex
+from update_operators import apply_update_operators, new_upsert_document
+
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection - using in-memory storage for demo
-# For production, replace with actual MongoDB connection
-import json
-import threading
-from collections import defaultdict
+# Session expiry: how often the TTL sweeper runs and the cap on live sessions
+SESSION_SWEEP_INTERVAL_SECONDS = float(os.environ.get('SESSION_SWEEP_INTERVAL_SECONDS', '60'))
+SESSION_MAX_COUNT = int(os.environ.get('SESSION_MAX_COUNT', '100000'))
+
+# Durable sessions for in-memory storage: SQLite file (relative to this
+# directory, empty to keep sessions in memory only) and write-behind batching
+SESSION_STORE_PATH = os.environ.get('SESSION_STORE_PATH', '')
+SESSION_FLUSH_INTERVAL_SECONDS = float(os.environ.get('SESSION_FLUSH_INTERVAL_SECONDS', '1'))
+SESSION_FLUSH_SIZE = int(os.environ.get('SESSION_FLUSH_SIZE', '500'))
 
-# In-memory storage for demo purposes
+# Seed for generated content. Workers sharing state (STORAGE_BACKEND=shared)
+# must generate identical content, so that mode falls back to a fixed seed
+CONTENT_SEED = os.environ.get('CONTENT_SEED', '')
+
+# Math content: 'bank' stores a fixed bank generated at startup, 'generated'
+# synthesizes problems on demand from ids encoding (type, difficulty, seed),
+# 'columnar' keeps a large NumPy-generated bank in compact integer columns
+MATH_CONTENT_MODE = os.environ.get('MATH_CONTENT_MODE', 'bank').lower()
+MATH_BANK_PER_COMBINATION = int(os.environ.get('MATH_BANK_PER_COMBINATION', '10000'))
+# Columnar bank file (relative to this directory), mapped instead of generating
+# the bank at startup; it is built and written here on first start if missing
+MATH_BANK_PATH = os.environ.get('MATH_BANK_PATH', '')
+
+# 'blocking' loads content before the app reports ready; 'background' starts
+# serving (the /api/ health route answers) while content loads
+CONTENT_LOADING = os.environ.get('CONTENT_LOADING', 'blocking').lower()
+
+# Server-Timing header with per-request spans, and sampled cProfile output:
+# one in every PROFILE_SAMPLE_EVERY requests (0 disables) plus requests with
+# an X-Profile header equal to PROFILE_TOKEN (empty disables) are profiled
+# into PROFILE_DIR (relative to this directory)
+SERVER_TIMING = os.environ.get('SERVER_TIMING', 'true').lower() == 'true'
+PROFILE_SAMPLE_EVERY = int(os.environ.get('PROFILE_SAMPLE_EVERY', '0'))
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+
+# In-memory storage behind MockDB: everything with STORAGE_BACKEND=memory,
+# the content with 'shared' (see create_database)
 memory_storage = {
-    'math_problems': [],
-    'english_exercises': [],
+    'math_problems': ContentIndex(),
+    'english_exercises': ContentIndex(),
     'session_progress': {}
 }
-storage_lock = threading.Lock()
 
 # Mock database class to simulate MongoDB operations
 class MockDB:
-    def __init__(self, name):
+    def __init__(self, name, collections=None):
         self.name = name
+        # Collections given here (e.g. shared sessions) replace in-memory ones
+        self._collections = dict(collections or {})
     
     def __getattr__(self, collection_name):
-        return MockCollection(collection_name)
+        if collection_name.startswith('_'):
+            raise AttributeError(collection_name)
+        # Collections are cached so each one keeps a single set of locks, and
+        # set as attributes so later lookups skip __getattr__ altogether
+        collection = self._collections.get(collection_name)
+        if collection is None:
+            collection = self._collections[collection_name] = MockCollection(collection_name)
+        setattr(self, collection_name, collection)
+        return collection
+    
+    def close(self):
+        for collection in self._collections.values():
+            collection.close()
 
 class MockCollection:
+    """In-memory collection with per-collection concurrency control.
+    
+    Every mutation runs without awaiting once its locks are held, so readers
+    on the event loop always see a consistent index and content reads take
+    no lock at all. Writers to a content collection serialise on the
+    collection's write lock. Session writes take the shared side of that
+    lock plus a lock for their own session, so they only contend with other
+    writes to the same session (and with whole-collection writes). When
+    both are free, taking them could not make anyone wait, so session
+    writes just run.
+    """
     def __init__(self, name):
         self.name = name
+        self.rwlock = AsyncRWLock(lock_observer(name))
+        self.session_locks = KeyedLock(lock_observer(name, 'session'), within=self.rwlock)
+        # TTL index state (see create_index) and the session LRU cap
+        self.expiry = ExpiryIndex()
+        self.ttl_field = None
+        self.ttl_seconds = None
+        self.ttl_delta = None
+        # Write-behind SessionStore mirroring session documents, if any
+        self.persistence = None
+    
+    @property
+    def index(self):
+        """Content index or columnar bank backing this collection, if it is a content collection"""
+        storage = memory_storage.get(self.name)
+        # Sessions are a plain dict; content is a ContentIndex or a ColumnarMathStore
+        return None if storage is None or isinstance(storage, dict) else storage
+    
+    def _track_session(self, session_id, document, written=True):
+        """Refresh a session's TTL deadline and LRU position after a write
+
+        With ``written=False`` the document is already persisted (restored
+        sessions being indexed), so only evictions are mirrored.
+        """
+        deadline = None
+        if self.ttl_field and isinstance(document.get(self.ttl_field), datetime):
+            deadline = document[self.ttl_field] + self.ttl_delta
+        evicted_sessions = self.expiry.touch(session_id, deadline)
+        for evicted in evicted_sessions:
+            memory_storage['session_progress'].pop(evicted, None)
+        if self.persistence is not None:
+            if written:
+                self.persistence.put(session_id, document)
+            for evicted in evicted_sessions:
+                self.persistence.delete(evicted)
+    
+    async def create_index(self, keys, expireAfterSeconds=None, **kwargs):
+        """Content fields are always indexed; a TTL index enables session expiry"""
+        fields = [keys] if isinstance(keys, str) else [field for field, _ in keys]
+        if expireAfterSeconds is not None and len(fields) == 1:
+            self.ttl_field = fields[0]
+            self.ttl_seconds = expireAfterSeconds
+            self.ttl_delta = timedelta(seconds=expireAfterSeconds)
+            if self.name == 'session_progress':
+                def deadline(item):
+                    value = item[1].get(self.ttl_field)
+                    return value if isinstance(value, datetime) else datetime.min
+                # Oldest deadline first, so the LRU cap evicts the stalest sessions
+                for session_id, document in sorted(memory_storage['session_progress'].items(), key=deadline):
+                    self._track_session(session_id, document, written=False)
+        return "_".join(f"{field}_1" for field in fields)
+    
+    async def delete_expired(self, now=None):
+        """Remove documents whose TTL deadline has passed; returns how many"""
+        if self.name != 'session_progress':
+            return 0
+        async with self.rwlock.write():
+            expired = self.expiry.pop_expired(now or datetime.utcnow())
+            sessions = memory_storage['session_progress']
+            for session_id in expired:
+                sessions.pop(session_id, None)
+                if self.persistence is not None:
+                    self.persistence.delete(session_id)
+        return len(expired)
+    
+    def close(self):
+        """Nothing to release for in-process storage"""
+    
+    async def expiry_stats(self):
+        stats = self.expiry.stats()
+        if self.persistence is not None:
+            stats["persistence"] = self.persistence.stats()
+        return stats
+    
+    def _candidates(self, index, match):
+        """Documents matching ``match``, recording how many the query examines"""
+        documents = index.lookup(match)
+        if documents is None:
+            metrics.scan_length.observe(len(index), self.name, 'scan')
+            return index.scan(match)
+        metrics.scan_length.observe(len(documents), self.name, 'index')
+        return documents
     
     async def aggregate(self, pipeline):
-        with storage_lock:
-            if self.name == 'math_problems':
-                data = memory_storage['math_problems']
-            elif self.name == 'english_exercises':
-                data = memory_storage['english_exercises']
-            else:
-                data = []
-            
-            # Simple aggregation simulation
-            if pipeline and len(pipeline) > 0 and pipeline[0].get('$match'):
-                match_filter = pipeline[0]['$match']
-                filtered_data = []
-                for item in data:
-                    match = True
-                    for key, value in match_filter.items():
-                        if item.get(key) != value:
-                            match = False
-                            break
-                    if match:
-                        filtered_data.append(item)
-                data = filtered_data
-            
-            # Sample operation
-            if pipeline and len(pipeline) > 1 and pipeline[1].get('$sample'):
-                import random
-                size = pipeline[1]['$sample']['size']
-                if len(data) > 0:
-                    return [random.choice(data)]
-                return []
-            
-            return data
+        index = self.index
+        if index is None:
+            return []
+        
+        # Simple aggregation simulation: $match stages narrow the filter,
+        # $sample draws from the matching index bucket
+        match_filter = {}
+        for stage in pipeline or []:
+            if '$match' in stage:
+                match_filter = {**match_filter, **stage['$match']}
+            elif '$sample' in stage:
+                size = stage['$sample'].get('size', 1)
+                return sample_sequence(self._candidates(index, match_filter), size)
+        
+        return list(self._candidates(index, match_filter))
     
     async def find_one(self, query):
-        with storage_lock:
-            if self.name == 'math_problems':
-                data = memory_storage['math_problems']
-            elif self.name == 'english_exercises':
-                data = memory_storage['english_exercises']
-            elif self.name == 'session_progress':
-                session_id = query.get('session_id')
-                return memory_storage['session_progress'].get(session_id)
-            else:
-                return None
-            
-            for item in data:
-                if item.get('_id') == query.get('_id'):
-                    return item
+        if self.name == 'session_progress':
+            session_id = query.get('session_id')
+            return memory_storage['session_progress'].get(session_id)
+        
+        index = self.index
+        if index is None:
             return None
+        if '_id' in query:
+            document = index.get(query['_id'])
+            if document is None or len(query) == 1:
+                return document
+            other = {key: value for key, value in query.items() if key != '_id'}
+            return document if all(document.get(k) == v for k, v in other.items()) else None
+        
+        documents = self._candidates(index, query)
+        return documents[0] if documents else None
     
     async def insert_many(self, documents):
-        with storage_lock:
-            if self.name == 'math_problems':
-                memory_storage['math_problems'].extend(documents)
-            elif self.name == 'english_exercises':
-                memory_storage['english_exercises'].extend(documents)
+        index = self.index
+        if index is None:
+            return
+        async with self.rwlock.write():
+            for document in documents:
+                index.add(document)
     
     async def insert_one(self, document):
         """Minimal insert_one to support creating session_progress documents."""
-        with storage_lock:
-            if self.name == 'session_progress':
-                session_id = document.get('session_id')
-                if not session_id:
-                    return None
-                memory_storage['session_progress'][session_id] = document
-                return {"inserted_id": session_id}
+        if self.name == 'session_progress':
+            session_id = document.get('session_id')
+            if not session_id:
+                return None
+            await self._put_session(session_id, document)
+            return {"inserted_id": session_id}
+        
+        index = self.index
+        if index is not None:
+            async with self.rwlock.write():
+                index.add(document)
+            return {"inserted_id": document.get('_id')}
     
     async def replace_one(self, query, document, upsert=False):
-        with storage_lock:
-            if self.name == 'session_progress':
-                session_id = query.get('session_id')
-                if session_id:
-                    memory_storage['session_progress'][session_id] = document
+        if self.name == 'session_progress':
+            session_id = query.get('session_id')
+            if session_id:
+                await self._put_session(session_id, document)
+            return
+        
+        index = self.index
+        if index is None or '_id' not in query:
+            return
+        async with self.rwlock.write():
+            if index.get(query['_id']) is not None or upsert:
+                index.add(dict(document, _id=query['_id']))
+    
+    async def update_one(self, query, update, upsert=False):
+        """Apply $set/$inc/$setOnInsert to one document in a single locked step"""
+        result = {"matched_count": 0, "modified_count": 0, "upserted_id": None}
+        if self.name == 'session_progress':
+            session_id = query.get('session_id')
+            if not session_id:
+                return result
+            if self.session_locks.free(session_id):
+                return self._update_session(session_id, query, update, upsert)
+            async with self.session_locks.acquire(session_id):
+                return self._update_session(session_id, query, update, upsert)
+        
+        index = self.index
+        if index is None or '_id' not in query:
+            return result
+        async with self.rwlock.write():
+            document = index.get(query['_id'])
+            if document is None:
+                if not upsert:
+                    return result
+                document = new_upsert_document(query, update)
+                result["upserted_id"] = document["_id"]
+            else:
+                result["matched_count"] = 1
+                result["modified_count"] = 1
+                document = dict(document)
+            apply_update_operators(document, update)
+            # Re-file the copy so indexed fields that changed move buckets
+            index.add(document)
+        return result
+    
+    async def _put_session(self, session_id, document):
+        if self.session_locks.free(session_id):
+            memory_storage['session_progress'][session_id] = document
+            self._track_session(session_id, document)
+            return
+        async with self.session_locks.acquire(session_id):
+            memory_storage['session_progress'][session_id] = document
+            self._track_session(session_id, document)
+    
+    def _update_session(self, session_id, query, update, upsert):
+        """update_one on a session whose locks are free or held by the caller"""
+        sessions = memory_storage['session_progress']
+        document = sessions.get(session_id)
+        if document is None:
+            if not upsert:
+                return {"matched_count": 0, "modified_count": 0, "upserted_id": None}
+            document = sessions[session_id] = new_upsert_document(query, update)
+            result = {"matched_count": 0, "modified_count": 0, "upserted_id": document["_id"]}
+        else:
+            result = {"matched_count": 1, "modified_count": 1, "upserted_id": None}
+        apply_update_operators(document, update)
+        self._track_session(session_id, document)
+        return result
     
     async def count_documents(self, query):
-        with storage_lock:
-            if self.name == 'math_problems':
-                return len(memory_storage['math_problems'])
-            elif self.name == 'english_exercises':
-                return len(memory_storage['english_exercises'])
+        if self.name == 'session_progress':
+            return len(memory_storage['session_progress'])
+        index = self.index
+        if index is None:
             return 0
+        return len(index.find(query)) if query else len(index)
 
-# Use mock database
-db = MockDB('eduassist')
+def create_database():
+    """Storage backend selected by STORAGE_BACKEND: 'memory' (default), 'shared' or 'mongo'
+    
+    'shared' is for several workers on one host: content stays in memory in
+    every worker (generated identically, see CONTENT_SEED) while sessions
+    live in one SQLite file at SHARED_STATE_PATH that all workers open.
+    """
+    backend = os.environ.get('STORAGE_BACKEND', 'memory').lower()
+    name = os.environ.get('DB_NAME', 'eduassist')
+    if backend == 'shared':
+        from shared_sessions import SharedSessionCollection
+        path = ROOT_DIR / os.environ.get('SHARED_STATE_PATH', 'shared_state.db')
+        return MockDB(name, {'session_progress': SharedSessionCollection(path)})
+    if backend == 'mongo':
+        from mongo_backend import connect
+        return connect(
+            os.environ.get('MONGO_URL', 'mongodb://localhost:27017'),
+            name,
+            max_pool_size=int(os.environ.get('MONGO_MAX_POOL_SIZE', '100')),
+            min_pool_size=int(os.environ.get('MONGO_MIN_POOL_SIZE', '0')),
+            server_selection_timeout_ms=int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000')),
+            connect_timeout_ms=int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', '5000')),
+            socket_timeout_ms=int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', '10000')),
+        )
+    return MockDB(name)
+
+db = create_database()
 
 # Create the main app
 app = FastAPI(title="EduAssist API", description="Voice-powered learning for primary school students")
@@ -163,6 +396,32 @@ class SessionProgress(BaseModel):
     last_activity: datetime = Field(default_factory=datetime.utcnow)
     expires_at: datetime = Field(default_factory=lambda: datetime.utcnow() + timedelta(days=1))
 
+# Pre-rendered response bodies for the immutable content, keyed by _id
+math_responses = ResponseCache(MathProblem)
+english_responses = ResponseCache(EnglishExercise)
+
+# In-process selection over the loaded content (see initialize_data)
+def create_math_content():
+    if MATH_CONTENT_MODE == 'generated':
+        return GeneratedMathContent(math_responses)
+    if MATH_CONTENT_MODE == 'columnar':
+        from columnar_store import ColumnarMathContent
+        return ColumnarMathContent(math_responses)
+    return ContentService(math_responses)
+
+math_content = create_math_content()
+english_content = ContentService(english_responses)
+
+# English answer matchers, compiled once per exercise as content loads
+english_matchers = AnswerMatchers()
+
+# Attempts, correct answers and latency per item, by content kind.
+# Generated problems have a new id every time, so they count by question.
+item_stats = {
+    "math": ItemStats(key=question_key) if MATH_CONTENT_MODE == 'generated' else ItemStats(),
+    "english": ItemStats(),
+}
+
 # Request Models
 class MathAnswerRequest(BaseModel):
     problem_id: str
@@ -174,18 +433,29 @@ class EnglishAnswerRequest(BaseModel):
     user_answer: str
     session_id: str
 
+# Upper bound on answers accepted in one batch submission
+MAX_BATCH_ANSWERS = 500
+
+# Upper bound on items served by one prefetch request
+MAX_PREFETCH_ITEMS = 50
+
+class BatchAnswerRequest(BaseModel):
+    """Answers queued by an offline client, replayed in submission order"""
+    math: List[MathAnswerRequest] = Field(default_factory=list, max_length=MAX_BATCH_ANSWERS)
+    english: List[EnglishAnswerRequest] = Field(default_factory=list, max_length=MAX_BATCH_ANSWERS)
+
 # Enhanced Math Problem Generation
-def generate_math_problems():
+def generate_math_problems(rng=random):
     """Generate comprehensive math problems"""
     problems = []
     
     # Addition problems (easy to medium)
     for i in range(20):
         if i < 10:  # Easy
-            a, b = random.randint(1, 10), random.randint(1, 10)
+            a, b = rng.randint(1, 10), rng.randint(1, 10)
             difficulty = "easy"
         else:  # Medium
-            a, b = random.randint(10, 50), random.randint(1, 20)
+            a, b = rng.randint(10, 50), rng.randint(1, 20)
             difficulty = "medium"
         
         answer = a + b
@@ -200,12 +470,12 @@ def generate_math_problems():
     # Subtraction problems
     for i in range(15):
         if i < 8:  # Easy
-            a = random.randint(5, 20)
-            b = random.randint(1, a)  # Ensure positive result
+            a = rng.randint(5, 20)
+            b = rng.randint(1, a)  # Ensure positive result
             difficulty = "easy"
         else:  # Medium
-            a = random.randint(20, 100)
-            b = random.randint(1, 50)
+            a = rng.randint(20, 100)
+            b = rng.randint(1, 50)
             difficulty = "medium"
         
         answer = a - b
@@ -220,10 +490,10 @@ def generate_math_problems():
     # Multiplication problems
     for i in range(15):
         if i < 8:  # Easy
-            a, b = random.randint(1, 5), random.randint(1, 10)
+            a, b = rng.randint(1, 5), rng.randint(1, 10)
             difficulty = "easy"
         else:  # Medium
-            a, b = random.randint(2, 12), random.randint(2, 12)
+            a, b = rng.randint(2, 12), rng.randint(2, 12)
             difficulty = "medium"
         
         answer = a * b
@@ -328,6 +598,59 @@ def generate_english_exercises():
     
     return exercises
 
+# Content selection helpers
+def math_problem_query(type: Optional[str], difficulty: Optional[str]) -> dict:
+    query = {}
+    if type and type != "all":
+        query["type"] = type
+    if difficulty:
+        query["difficulty"] = difficulty
+    return query
+
+def english_exercise_query(type: Optional[str], difficulty: Optional[str]) -> dict:
+    query = {"type": type}
+    if difficulty:
+        query["difficulty"] = difficulty
+    return query
+
+async def find_content(content: ContentService, collection, doc_id: str):
+    """Loaded content first; storage only for items loaded after startup"""
+    if not content.loaded:
+        await wait_for_content()
+    document = content.get(doc_id)
+    if document is None:
+        document = await collection.find_one({"_id": doc_id})
+    return document
+
+# Grading helpers shared by the single and batch answer endpoints
+def grade_math_answer(problem: dict, user_answer: int) -> bool:
+    return user_answer == problem["answer"]
+
+def math_feedback(problem: dict, user_answer: int, correct: bool) -> str:
+    if correct:
+        return f"Excellent! {user_answer} is correct! Let's try another one."
+    return f"Not quite right. The correct answer is {problem['answer']}. Let's try another problem."
+
+def grade_english_answer(exercise: dict, user_answer: str) -> bool:
+    return english_matchers.matcher_for(exercise).matches(user_answer)
+
+def english_feedback(exercise: dict, correct: bool) -> str:
+    if correct:
+        explanation = exercise.get("explanation", "")
+        return f"Excellent! That's correct! {explanation} Let's try another one."
+    return f"{exercise['correct_answer']} Let's try another one."
+
+def splice_body(head: dict, key: str, item) -> bytes:
+    """``head`` as JSON with a ``next_item`` pair's pre-rendered body added under ``key``"""
+    encoded = json.dumps(head, ensure_ascii=False, separators=(",", ":"), default=str)
+    body = item[1] if item else b"null"
+    return encoded[:-1].encode() + b',"' + key.encode() + b'":' + body + b"}"
+
+def answer_response(correct: bool, feedback: str, next_key: str, next_item) -> Response:
+    """Answer payload with the next item's pre-rendered body spliced in"""
+    content = splice_body({"correct": correct, "feedback": feedback}, next_key, next_item)
+    return Response(content=content, media_type=ResponseCache.media_type)
+
 # API Endpoints
 @api_router.get("/")
 async def root():
@@ -340,65 +663,75 @@ async def get_math_problem(
 ):
     """Get a random math problem based on type and difficulty"""
     try:
-        # Build query
-        query = {}
-        if type and type != "all":
-            query["type"] = type
-        if difficulty:
-            query["difficulty"] = difficulty
-        
-        # Get random problem from database
-        pipeline = [{"$match": query}, {"$sample": {"size": 1}}]
-        problems = await db.math_problems.aggregate(pipeline)
-        
-        if not problems:
-            # If no problems in DB, generate some
+        query = math_problem_query(type, difficulty)
+        
+        # Get random problem from the loaded content
+        problems = math_content.pick(query)
+        
+        if not problems and not math_content.loaded:
+            # If no problems loaded yet, generate some
             await initialize_data()
-            problems = await db.math_problems.aggregate(pipeline)
+            problems = math_content.pick(query)
         
         if problems:
-            problem = problems[0]
-            problem["id"] = str(problem.get("_id", problem.get("id", "unknown")))
-            return MathProblem(**problem)
+            return Response(content=math_content.body(problems[0]), media_type=ResponseCache.media_type)
         
         raise HTTPException(status_code=404, detail="No problems found")
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting math problem: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@api_router.get("/math/problems/batch", response_model=List[MathProblem])
+async def get_math_problem_batch(
+    type: Optional[str] = Query(None, description="Problem type: addition, subtraction, multiplication, division"),
+    difficulty: Optional[str] = Query(None, description="Difficulty: easy, medium, hard"),
+    count: int = Query(10, ge=1, le=MAX_PREFETCH_ITEMS, description="Number of distinct problems"),
+    session_id: Optional[str] = Query(None, description="Avoid problems this session saw recently")
+):
+    """Get a batch of distinct math problems for client-side prefetching"""
+    try:
+        query = math_problem_query(type, difficulty)
+        if not math_content.loaded:
+            await initialize_data()
+        problems = math_content.pick(query, count, session_id)
+        return Response(content=math_content.batch_body(problems), media_type=ResponseCache.media_type)
+    
+    except Exception as e:
+        logger.error(f"Error getting math problem batch: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 @api_router.post("/math/answer")
 async def submit_math_answer(request: MathAnswerRequest):
     """Submit math answer and get feedback"""
     try:
         # Get the problem
-        problem = await db.math_problems.find_one({"_id": request.problem_id})
+        with span("lookup"):
+            problem = await find_content(math_content, db.math_problems, request.problem_id)
         if not problem:
             raise HTTPException(status_code=404, detail="Problem not found")
         
-        correct = request.user_answer == problem["answer"]
+        correct = grade_math_answer(problem, request.user_answer)
+        item_stats["math"].record(problem, correct, request.session_id)
         
         # Update session progress
-        await update_session_progress(request.session_id, "math", correct)
-        
-        # Generate feedback
-        if correct:
-            feedback = f"Excellent! {request.user_answer} is correct! Let's try another one."
-        else:
-            feedback = f"Not quite right. The correct answer is {problem['answer']}. Let's try another problem."
+        with span("progress"):
+            await update_session_progress(request.session_id, "math", correct)
         
-        # Get next problem - call the endpoint function directly
-        try:
-            next_problem_response = await get_math_problem(type=problem.get("type"), difficulty=problem.get("difficulty"))
-            next_problem = next_problem_response.dict()
-        except:
-            next_problem = None
+        feedback = math_feedback(problem, request.user_answer, correct)
         
-        return {
-            "correct": correct,
-            "feedback": feedback,
-            "next_problem": next_problem
-        }
+        # Next problem of the same kind, straight from the content cache
+        with span("next"):
+            next_problem = math_content.next_item(
+                math_problem_query(problem.get("type"), problem.get("difficulty")),
+                request.session_id
+            )
+        if next_problem:
+            item_stats["math"].served(request.session_id, next_problem[0]["_id"])
+        with span("serialize"):
+            return answer_response(correct, feedback, "next_problem", next_problem)
     
     except HTTPException:
         raise
@@ -413,145 +746,516 @@ async def get_english_exercise(
 ):
     """Get a random English exercise based on type and difficulty"""
     try:
-        # Build query
-        query = {"type": type}
-        if difficulty:
-            query["difficulty"] = difficulty
+        query = english_exercise_query(type, difficulty)
         
-        # Get random exercise from database
-        pipeline = [{"$match": query}, {"$sample": {"size": 1}}]
-        exercises = await db.english_exercises.aggregate(pipeline)
+        # Get random exercise from the loaded content
+        exercises = english_content.pick(query)
         
-        if not exercises:
-            # If no exercises in DB, generate some
+        if not exercises and not english_content.loaded:
+            # If no exercises loaded yet, generate some
             await initialize_data()
-            exercises = await db.english_exercises.aggregate(pipeline)
+            exercises = english_content.pick(query)
         
         if exercises:
-            exercise = exercises[0]
-            exercise["id"] = str(exercise.get("_id", exercise.get("id", "unknown")))
-            return EnglishExercise(**exercise)
+            return Response(content=english_content.body(exercises[0]), media_type=ResponseCache.media_type)
         
         raise HTTPException(status_code=404, detail="No exercises found")
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting English exercise: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@api_router.get("/english/exercises/batch", response_model=List[EnglishExercise])
+async def get_english_exercise_batch(
+    type: Optional[str] = Query("spelling", description="Exercise type: spelling, vocabulary, grammar"),
+    difficulty: Optional[str] = Query(None, description="Difficulty: easy, medium, hard"),
+    count: int = Query(10, ge=1, le=MAX_PREFETCH_ITEMS, description="Number of distinct exercises"),
+    session_id: Optional[str] = Query(None, description="Avoid exercises this session saw recently")
+):
+    """Get a batch of distinct English exercises for client-side prefetching"""
+    try:
+        query = english_exercise_query(type, difficulty)
+        if not english_content.loaded:
+            await initialize_data()
+        exercises = english_content.pick(query, count, session_id)
+        return Response(content=english_content.batch_body(exercises), media_type=ResponseCache.media_type)
+    
+    except Exception as e:
+        logger.error(f"Error getting English exercise batch: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 @api_router.post("/english/answer")
 async def submit_english_answer(request: EnglishAnswerRequest):
     """Submit English answer and get feedback"""
     try:
         # Get the exercise
-        exercise = await db.english_exercises.find_one({"_id": request.exercise_id})
+        with span("lookup"):
+            exercise = await find_content(english_content, db.english_exercises, request.exercise_id)
         if not exercise:
             raise HTTPException(status_code=404, detail="Exercise not found")
         
         # Check if answer is correct
-        correct = any(
-            accepted.lower() in request.user_answer.lower() 
-            for accepted in exercise["accepted_answers"]
-        )
+        with span("grade"):
+            correct = grade_english_answer(exercise, request.user_answer)
+        item_stats["english"].record(exercise, correct, request.session_id)
         
         # Update session progress
-        await update_session_progress(request.session_id, "english", correct)
+        with span("progress"):
+            await update_session_progress(request.session_id, "english", correct)
         
-        # Generate feedback
-        if correct:
-            explanation = exercise.get("explanation", "")
-            feedback = f"Excellent! That's correct! {explanation} Let's try another one."
-        else:
-            feedback = f"{exercise['correct_answer']} Let's try another one."
+        feedback = english_feedback(exercise, correct)
         
-        # Get next exercise - call the endpoint function directly
-        try:
-            next_exercise_response = await get_english_exercise(type=exercise["type"])
-            next_exercise = next_exercise_response.dict()
-        except:
-            next_exercise = None
+        # Next exercise of the same type, straight from the content cache
+        with span("next"):
+            next_exercise = english_content.next_item(
+                english_exercise_query(exercise.get("type"), None),
+                request.session_id
+            )
+        if next_exercise:
+            item_stats["english"].served(request.session_id, next_exercise[0]["_id"])
+        with span("serialize"):
+            return answer_response(correct, feedback, "next_exercise", next_exercise)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error submitting English answer: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@api_router.post("/answers/batch")
+async def submit_answer_batch(request: BatchAnswerRequest):
+    """Grade queued answers in one pass and apply one progress update per session"""
+    try:
+        # session_id -> subject -> results in submission order
+        outcomes = defaultdict(lambda: defaultdict(list))
+        
+        math_results = []
+        for answer in request.math:
+            problem = await find_content(math_content, db.math_problems, answer.problem_id)
+            if not problem:
+                math_results.append({"problem_id": answer.problem_id, "correct": None, "error": "Problem not found"})
+                continue
+            correct = grade_math_answer(problem, answer.user_answer)
+            # Replayed offline answers have no meaningful latency
+            item_stats["math"].record(problem, correct)
+            outcomes[answer.session_id]["math"].append(correct)
+            math_results.append({
+                "problem_id": answer.problem_id,
+                "correct": correct,
+                "feedback": math_feedback(problem, answer.user_answer, correct)
+            })
+        
+        english_results = []
+        for answer in request.english:
+            exercise = await find_content(english_content, db.english_exercises, answer.exercise_id)
+            if not exercise:
+                english_results.append({"exercise_id": answer.exercise_id, "correct": None, "error": "Exercise not found"})
+                continue
+            correct = grade_english_answer(exercise, answer.user_answer)
+            item_stats["english"].record(exercise, correct)
+            outcomes[answer.session_id]["english"].append(correct)
+            english_results.append({
+                "exercise_id": answer.exercise_id,
+                "correct": correct,
+                "feedback": english_feedback(exercise, correct)
+            })
+        
+        await asyncio.gather(*(
+            apply_session_results(session_id, results) for session_id, results in outcomes.items()
+        ))
         
         return {
-            "correct": correct,
-            "feedback": feedback,
-            "next_exercise": next_exercise
+            "math": math_results,
+            "english": english_results,
+            "sessions_updated": len(outcomes)
         }
     
+    except Exception as e:
+        logger.error(f"Error submitting answer batch: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+# Rendered whole-bank catalogs, see catalog.py
+catalogs = CatalogCache()
+
+@api_router.get("/catalog/{kind}")
+async def get_catalog(
+    kind: str,
+    type: Optional[str] = Query(None, description="Only items of this type"),
+    difficulty: Optional[str] = Query(None, description="Difficulty: easy, medium, hard"),
+    since: Optional[str] = Query(None, description="Catalog version the client holds, for a delta"),
+    if_none_match: Optional[str] = Header(None),
+):
+    """Every item of a content kind matching the filter, versioned for client caching"""
+    try:
+        if kind == "math":
+            content = math_content
+        elif kind == "english":
+            content = english_content
+        else:
+            raise HTTPException(status_code=404, detail="Catalogs exist for 'math' and 'english'")
+        if not content.loaded:
+            await initialize_data()
+        
+        match = math_problem_query(type, difficulty)
+        if since:
+            catalog, body = await catalogs.delta(kind, content, match, since)
+        else:
+            catalog, body = await catalogs.catalog(kind, content, match), None
+        headers = {"ETag": catalog.etag, "Cache-Control": "no-cache"}
+        if etag_matches(if_none_match, catalog.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body or catalog.body, media_type=ResponseCache.media_type, headers=headers)
+    
     except HTTPException:
         raise
+    except CatalogUnavailable as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except CatalogTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
-        logger.error(f"Error submitting English answer: {e}")
+        logger.error(f"Error building catalog: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @api_router.get("/progress/{session_id}", response_model=SessionProgress)
 async def get_progress(session_id: str):
     """Get learning progress for a session"""
     try:
-        progress = await db.session_progress.find_one({"session_id": session_id})
-        if not progress:
-            # Create new session
-            new_progress = SessionProgress(session_id=session_id)
-            await db.session_progress.insert_one(new_progress.model_dump())
-            return new_progress
-        
-        progress["id"] = str(progress["_id"])
-        return SessionProgress(**progress)
+        progress = await load_progress(session_id)
+        return SessionProgress(**{**progress, "id": str(progress["_id"])})
     
     except Exception as e:
         logger.error(f"Error getting progress: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
-# Helper Functions
-async def update_session_progress(session_id: str, subject: str, correct: bool):
-    """Update session progress"""
+@api_router.get("/sessions/stats")
+async def get_session_stats():
+    """Live session count and expiry/eviction counters"""
+    return await db.session_progress.expiry_stats()
+
+@api_router.get("/stats/items")
+async def get_item_stats(
+    kind: Optional[str] = Query(None, description="Content kind: math or english (default both)"),
+    top: int = Query(10, ge=0, le=100, description="How many of the least accurate items to list"),
+    min_attempts: int = Query(5, ge=1, description="Attempts an item needs before it is ranked"),
+):
+    """Answer accuracy and latency per (type, difficulty), plus the hardest items"""
     try:
-        progress = await db.session_progress.find_one({"session_id": session_id})
-        
-        if not progress:
-            progress = SessionProgress(session_id=session_id).model_dump()
-            progress.pop("id")  # Remove id for insertion
-        
-        # Update scores and streaks
-        if subject == "math":
-            if correct:
-                progress["math_score"] = progress.get("math_score", 0) + 1
-                progress["math_streak"] = progress.get("math_streak", 0) + 1
-            else:
-                progress["math_streak"] = 0
-        else:  # english
-            if correct:
-                progress["english_score"] = progress.get("english_score", 0) + 1
-                progress["english_streak"] = progress.get("english_streak", 0) + 1
+        if kind is not None and kind not in item_stats:
+            raise HTTPException(status_code=404, detail="Stats exist for 'math' and 'english'")
+        result = {}
+        for name in ([kind] if kind else list(item_stats)):
+            # Aggregate a copy off the event loop; answers keep being counted meanwhile
+            summary = await asyncio.to_thread(summarize, item_stats[name].snapshot(), top, min_attempts)
+            content = math_content if name == "math" else english_content
+            for entry in summary["hardest"]:
+                document = content.get(entry["id"])
+                entry["question"] = document.get("question") if document else None
+            result[name] = summary
+        return result
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting item stats: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@api_router.get("/metrics")
+async def get_metrics():
+    """Request, lock and scan metrics plus session and content counts, for Prometheus"""
+    try:
+        metrics.sessions.set(await db.session_progress.count_documents({}))
+        for kind, content in (("math", math_content), ("english", english_content)):
+            # Generated math content has no fixed size
+            if hasattr(content, '__len__'):
+                metrics.content_items.set(len(content), kind)
+        return Response(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+    except Exception as e:
+        logger.error(f"Error rendering metrics: {e}")
+        raise HTTPException(status_code=500, detail="Failed to render metrics")
+
+# Fields of a session's progress pushed to live session sockets
+PROGRESS_FIELDS = ("math_score", "english_score", "math_streak", "english_streak", "problems_solved")
+
+@api_router.websocket("/sessions/{session_id}/ws")
+async def session_socket(websocket: WebSocket, session_id: str):
+    """One connection per voice session: answers in, grade + next item + progress out
+    
+    The session's progress is read once on connect and kept for the
+    connection; each answer is one atomic update with no read back, and the
+    totals pushed to the client come from the resident copy.
+    """
+    await websocket.accept()
+    try:
+        # A copy: in-memory storage hands out the live document
+        progress = dict(await load_progress(session_id))
+        await websocket.send_text(json.dumps(
+            {"event": "progress", "progress": {field: progress.get(field, 0) for field in PROGRESS_FIELDS}}
+        ))
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+            except (ValueError, KeyError):
+                # KeyError: a binary frame has no text
+                await websocket.send_text(socket_error("Invalid JSON").decode())
+                continue
+            action = message.get("action") if isinstance(message, dict) else None
+            if action == "answer":
+                frame = await socket_answer(session_id, progress, message)
+            elif action == "next":
+                frame = await socket_next(session_id, message)
             else:
-                progress["english_streak"] = 0
-        
-        progress["problems_solved"] = progress.get("problems_solved", 0) + 1
-        progress["last_activity"] = datetime.utcnow()
-        progress["expires_at"] = datetime.utcnow() + timedelta(days=1)
-        
+                frame = socket_error(f"Unknown action: {action}")
+            await websocket.send_text(frame.decode())
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"Error in session socket: {e}")
+        await websocket.close(code=1011)
+
+def socket_error(detail: str) -> bytes:
+    return json.dumps({"event": "error", "detail": detail}).encode()
+
+def socket_subject(subject):
+    """(content, collection, query builder, answer model, id field) of a subject"""
+    if subject == "math":
+        return math_content, db.math_problems, math_problem_query, MathAnswerRequest, "problem_id"
+    if subject == "english":
+        return english_content, db.english_exercises, english_exercise_query, EnglishAnswerRequest, "exercise_id"
+    return None
+
+async def socket_next(session_id: str, message: dict) -> bytes:
+    """An item frame for the filter in ``message``"""
+    subject = socket_subject(message.get("subject"))
+    if subject is None:
+        return socket_error("subject must be 'math' or 'english'")
+    content, _, build_query, _, _ = subject
+    default_type = "spelling" if content is english_content else None
+    query = build_query(message.get("type", default_type), message.get("difficulty"))
+    if not content.loaded:
+        await initialize_data()
+    item = content.next_item(query, session_id)
+    if item is None:
+        return socket_error("No items found")
+    item_stats[message["subject"]].served(session_id, item[0]["_id"])
+    return splice_body({"event": "item", "subject": message["subject"]}, "item", item)
+
+async def socket_answer(session_id: str, progress: dict, message: dict) -> bytes:
+    """Grade an answer, record it, and build the result frame
+    
+    The frame carries the grade, the next item of the same kind and the
+    progress delta plus new totals, so a voice turn needs no other request.
+    """
+    subject = socket_subject(message.get("subject"))
+    if subject is None:
+        return socket_error("subject must be 'math' or 'english'")
+    content, collection, build_query, answer_model, id_field = subject
+    try:
+        request = answer_model(**{id_field: message.get("id"), "user_answer": message.get("user_answer"),
+                                  "session_id": session_id})
+    except ValidationError as e:
+        return socket_error(f"Invalid answer: {e.errors()[0]['msg']}")
+    
+    item = await find_content(content, collection, getattr(request, id_field))
+    if not item:
+        return socket_error("Item not found")
+    if message["subject"] == "math":
+        correct = grade_math_answer(item, request.user_answer)
+        feedback = math_feedback(item, request.user_answer, correct)
+        query = build_query(item.get("type"), item.get("difficulty"))
+    else:
+        correct = grade_english_answer(item, request.user_answer)
+        feedback = english_feedback(item, correct)
+        query = build_query(item.get("type"), None)
+    
+    stats = item_stats[message["subject"]]
+    stats.record(item, correct, session_id)
+    
+    update = progress_update({message["subject"]: [correct]}, datetime.utcnow())
+    await db.session_progress.update_one({"session_id": session_id}, update, upsert=True)
+    apply_update_operators(progress, update)
+    delta = dict(update["$inc"])
+    delta.update({field: value for field, value in update["$set"].items() if field in PROGRESS_FIELDS})
+    
+    head = {
+        "event": "result",
+        "subject": message["subject"],
+        "id": str(item["_id"]),
+        "correct": correct,
+        "feedback": feedback,
+        "delta": delta,
+        "progress": {field: progress.get(field, 0) for field in PROGRESS_FIELDS},
+    }
+    next_item = content.next_item(query, session_id)
+    if next_item:
+        stats.served(session_id, next_item[0]["_id"])
+    return splice_body(head, "next", next_item)
+
+# Helper Functions
+async def load_progress(session_id: str) -> dict:
+    """A session's progress document, created with defaults if it is new"""
+    progress = await db.session_progress.find_one({"session_id": session_id})
+    if not progress:
+        # Create new session; an answer racing with us may have created it first
+        defaults = SessionProgress(session_id=session_id).model_dump()
+        defaults["_id"] = defaults.pop("id")
+        await db.session_progress.update_one(
+            {"session_id": session_id},
+            {"$setOnInsert": defaults},
+            upsert=True
+        )
+        progress = await db.session_progress.find_one({"session_id": session_id})
+    return progress
+
+def update_session_progress(session_id: str, subject: str, correct: bool):
+    """Update session progress with one atomic update per answer
+
+    Returns the awaitable update itself rather than wrapping it in another
+    coroutine, since this runs on every answer.
+    """
+    return apply_session_results(session_id, {subject: [correct]})
+
+# Score and streak fields per subject; any other subject counts as English
+SUBJECT_FIELDS = {"math": ("math_score", "math_streak"), "english": ("english_score", "english_streak")}
+SESSION_LIFETIME = timedelta(days=1)
+
+def progress_update(outcomes: dict, now: datetime) -> dict:
+    """$inc/$set update for a session's answer results, per subject in order"""
+    solved = 0
+    increments = {}
+    fields = {"last_activity": now, "expires_at": now + SESSION_LIFETIME}
+    
+    # Update scores and streaks
+    for subject, results in outcomes.items():
+        if not results:
+            continue
+        score_field, streak_field = SUBJECT_FIELDS.get(subject, SUBJECT_FIELDS["english"])
+        count = len(results)
+        solved += count
+        correct_count = sum(results)
+        if correct_count:
+            increments[score_field] = correct_count
+        if correct_count == count:
+            increments[streak_field] = count
+        else:
+            # A wrong answer resets the streak; only the answers after it count
+            trailing = count - 1 - max(i for i, correct in enumerate(results) if not correct)
+            fields[streak_field] = trailing
+    increments["problems_solved"] = solved
+    return {"$inc": increments, "$set": fields}
+
+async def apply_session_results(session_id: str, outcomes: dict):
+    """Apply one or more answer results to a session in a single atomic update"""
+    try:
         # Upsert progress
-        await db.session_progress.replace_one(
-            {"session_id": session_id}, 
-            progress, 
+        await db.session_progress.update_one(
+            {"session_id": session_id},
+            progress_update(outcomes, datetime.utcnow()),
             upsert=True
         )
     
     except Exception as e:
         logger.error(f"Error updating session progress: {e}")
 
-async def initialize_data():
+async def ensure_indexes():
+    """Create the content and session indexes the queries rely on"""
+    for collection in (db.math_problems, db.english_exercises):
+        await collection.create_index("type")
+        await collection.create_index("difficulty")
+        await collection.create_index([("type", 1), ("difficulty", 1)])
+    await db.session_progress.create_index("session_id", unique=True)
+    await setup_session_expiry()
+
+async def setup_session_expiry():
+    """TTL index on expires_at plus, in memory, the LRU cap on live sessions"""
+    # The cap is set first so it also applies to sessions the index restores
+    if isinstance(db, MockDB):
+        sessions = db.session_progress
+        if isinstance(sessions, MockCollection):
+            sessions.expiry.max_entries = SESSION_MAX_COUNT or None
+        else:
+            sessions.max_entries = SESSION_MAX_COUNT or None
+    await db.session_progress.create_index("expires_at", expireAfterSeconds=0)
+
+def open_session_store():
+    """Restore persisted sessions into memory and mirror the collection to their SessionStore
+
+    Persistence is attached before ensure_indexes tracks the restored
+    sessions, so the ones it evicts are deleted from the store too.
+    """
+    if not SESSION_STORE_PATH or not isinstance(db, MockDB):
+        return None
+    if not isinstance(db.session_progress, MockCollection):
+        # Shared sessions are already durable
+        return None
+    from session_store import SessionStore
+    store = SessionStore(ROOT_DIR / SESSION_STORE_PATH, SESSION_FLUSH_INTERVAL_SECONDS, SESSION_FLUSH_SIZE)
+    sessions = store.open()
+    memory_storage['session_progress'].update(sessions)
+    db.session_progress.persistence = store
+    logger.info(f"Restored {len(sessions)} sessions from {store.path}")
+    return store
+
+async def sweep_expired_sessions():
+    """Background task evicting sessions whose expires_at has passed"""
+    while True:
+        await asyncio.sleep(SESSION_SWEEP_INTERVAL_SECONDS)
+        try:
+            evicted = await db.session_progress.delete_expired()
+            if evicted:
+                logger.info(f"Evicted {evicted} expired sessions")
+        except Exception as e:
+            logger.error(f"Error sweeping expired sessions: {e}")
+
+CONTENT_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, 'eduassist/content')
+
+def content_seed():
+    """Seed for generated content, or None for a fresh random one"""
+    if CONTENT_SEED:
+        return int(CONTENT_SEED)
+    shared = isinstance(db, MockDB) and not isinstance(db.session_progress, MockCollection)
+    return 0 if shared else None
+
+def assign_content_ids(kind, documents):
+    """Ids derived from each item's position and question instead of random
+    UUIDs, so workers that generate the same content agree on every id"""
+    for position, document in enumerate(documents):
+        name = f"{kind}:{position}:{document['question']}"
+        document["_id"] = str(uuid.uuid5(CONTENT_ID_NAMESPACE, name))
+
+def load_math_bank():
+    """Columnar math bank: mapped from MATH_BANK_PATH, which is built on first start if missing"""
+    from columnar_store import ColumnarMathStore
+    from math_bank import generate_bank
+    
+    if MATH_BANK_PATH:
+        from bank_file import open_or_build
+        path = ROOT_DIR / MATH_BANK_PATH
+        store = open_or_build(path, MATH_BANK_PER_COMBINATION, seed=content_seed())
+        logger.info(f"Mapped math bank {store.tag} of {len(store)} problems from {path}")
+        return store
+    
+    store = ColumnarMathStore(generate_bank(MATH_BANK_PER_COMBINATION, seed=content_seed()))
+    logger.info(f"Generated columnar bank of {len(store)} math problems ({store.nbytes} bytes)")
+    return store
+
+async def populate_content():
     """Initialize database with learning content"""
     try:
         # Check if data already exists
         math_count = await db.math_problems.count_documents({})
         english_count = await db.english_exercises.count_documents({})
         
-        if math_count == 0:
+        if math_content.stored and math_count == 0:
             # Generate and insert math problems
-            problems = generate_math_problems()
+            problems = generate_math_problems(random.Random(content_seed()))
             problem_dicts = [p.dict() for p in problems]
             for p in problem_dicts:
-                p["_id"] = p.pop("id")
+                p.pop("id")
+            assign_content_ids("math", problem_dicts)
             await db.math_problems.insert_many(problem_dicts)
+            math_content.load(problem_dicts)
             logger.info(f"Inserted {len(problems)} math problems")
         
         if english_count == 0:
@@ -559,13 +1263,51 @@ async def initialize_data():
             exercises = generate_english_exercises()
             exercise_dicts = [e.dict() for e in exercises]
             for e in exercise_dicts:
-                e["_id"] = e.pop("id")
+                e.pop("id")
+            assign_content_ids("english", exercise_dicts)
             await db.english_exercises.insert_many(exercise_dicts)
+            english_content.load(exercise_dicts)
+            english_matchers.add_many(exercise_dicts)
             logger.info(f"Inserted {len(exercises)} English exercises")
+        
+        # Columnar content is attached whole rather than loaded from storage
+        if hasattr(math_content, 'attach') and not math_content.loaded:
+            store = load_math_bank()
+            math_content.attach(store)
+            if isinstance(db, MockDB):
+                # The mock collection reads the same columns instead of holding documents
+                memory_storage['math_problems'] = store
+        
+        # Content stored by an earlier run (e.g. in MongoDB) still needs loading
+        if not math_content.loaded:
+            math_content.load(await db.math_problems.aggregate([]))
+        if not english_content.loaded:
+            exercise_dicts = await db.english_exercises.aggregate([])
+            english_content.load(exercise_dicts)
+            english_matchers.add_many(exercise_dicts)
     
     except Exception as e:
         logger.error(f"Error initializing data: {e}")
 
+# Content initialization in flight, shared by every caller (see initialize_data)
+content_loading = None
+
+def start_content_loading():
+    """Task populating content, started only if none is already running"""
+    global content_loading
+    if content_loading is None or content_loading.done():
+        content_loading = asyncio.create_task(populate_content())
+    return content_loading
+
+async def initialize_data():
+    """Single-flight content initialization: concurrent callers await one run"""
+    await asyncio.shield(start_content_loading())
+
+async def wait_for_content():
+    """Wait for a content initialization that is still running"""
+    if content_loading is not None and not content_loading.done():
+        await asyncio.shield(content_loading)
+
 # Include the router
 app.include_router(api_router)
 
@@ -577,6 +1319,17 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(RequestMetricsMiddleware)
+if SERVER_TIMING:
+    app.add_middleware(ServerTimingMiddleware)
+if PROFILE_SAMPLE_EVERY or PROFILE_TOKEN:
+    from profiling import SampledProfilerMiddleware
+    app.add_middleware(
+        SampledProfilerMiddleware,
+        directory=ROOT_DIR / PROFILE_DIR,
+        every=PROFILE_SAMPLE_EVERY,
+        token=PROFILE_TOKEN,
+    )
 
 # Configure logging
 logging.basicConfig(
@@ -585,16 +1338,35 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Long-running tasks started at startup and cancelled at shutdown
+background_tasks = []
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize data on startup"""
     logger.info("EduAssist API starting up...")
-    await initialize_data()
+    session_store = open_session_store()
+    await ensure_indexes()
+    if CONTENT_LOADING == 'background':
+        background_tasks.append(start_content_loading())
+    else:
+        await initialize_data()
+    background_tasks.append(asyncio.create_task(sweep_expired_sessions()))
+    if session_store is not None:
+        background_tasks.append(asyncio.create_task(session_store.run()))
     logger.info("EduAssist API ready!")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Clean shutdown"""
+    for task in background_tasks:
+        task.cancel()
+    background_tasks.clear()
+    sessions = db.session_progress if isinstance(db, MockDB) else None
+    if isinstance(sessions, MockCollection) and sessions.persistence is not None:
+        await sessions.persistence.close()
+        sessions.persistence = None
+    db.close()
     logger.info("EduAssist API shutdown complete.")
 
 if __name__ == "__main__":
@@ -0,0 +1,148 @@
+"""Durable session progress for the in-memory storage backend.
+
+Session documents stay in process memory and are served from there. A
+``SessionStore`` mirrors them to a SQLite database in WAL mode with
+write-behind batching: writes only mark a session dirty, and a background
+task writes every dirty session in one transaction when ``flush_interval``
+seconds have passed or ``flush_size`` sessions are waiting. Repeated writes
+to a session between flushes are coalesced into one row write, and the
+commit and its disk sync run on a worker thread, so no request waits on an
+fsync.
+
+Recovery after a crash is SQLite's own WAL replay when the database is
+opened: every flushed batch is restored, and at most the last unflushed
+interval of updates is lost.
+"""
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL_SECONDS = 1.0
+FLUSH_SIZE = 500
+
+_SCHEMA = "CREATE TABLE IF NOT EXISTS sessions (session_id TEXT PRIMARY KEY, document TEXT NOT NULL)"
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    raise TypeError(f"Cannot store {type(value).__name__} in a session document")
+
+
+def _decode_object(obj):
+    if obj.keys() == {"$date"}:
+        return datetime.fromisoformat(obj["$date"])
+    return obj
+
+
+def encode_document(document: dict) -> str:
+    return json.dumps(document, default=_encode_value, separators=(",", ":"))
+
+
+def decode_document(text: str) -> dict:
+    return json.loads(text, object_hook=_decode_object)
+
+
+class SessionStore:
+    """Write-behind SQLite mirror of the session_progress documents"""
+
+    def __init__(self, path, flush_interval: float = FLUSH_INTERVAL_SECONDS, flush_size: int = FLUSH_SIZE):
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        # Dirty sessions: the live document to write, or None to delete
+        self._pending: Dict[str, Optional[dict]] = {}
+        self._connection: Optional[sqlite3.Connection] = None
+        self._flush_lock = asyncio.Lock()
+        # A cancelled flush can leave its thread writing while the next starts
+        self._write_lock = threading.Lock()
+        self._full = asyncio.Event()
+        self.flushes = 0
+        self.rows_written = 0
+
+    def __len__(self):
+        return len(self._pending)
+
+    def open(self) -> Dict[str, dict]:
+        """Open (and recover) the database; returns the stored sessions"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Flushes run on worker threads, one at a time under _write_lock
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(_SCHEMA)
+        connection.commit()
+        self._connection = connection
+        rows = connection.execute("SELECT session_id, document FROM sessions").fetchall()
+        return {session_id: decode_document(document) for session_id, document in rows}
+
+    def put(self, session_id: str, document: dict):
+        """Mark a session dirty; its state at the next flush is what is written"""
+        self._pending[session_id] = document
+        if len(self._pending) >= self.flush_size:
+            self._full.set()
+
+    def delete(self, session_id: str):
+        self._pending[session_id] = None
+        if len(self._pending) >= self.flush_size:
+            self._full.set()
+
+    async def flush(self) -> int:
+        """Write every dirty session in one transaction; returns how many"""
+        async with self._flush_lock:
+            pending, self._pending = self._pending, {}
+            self._full.clear()
+            if not pending or self._connection is None:
+                return 0
+            # Encode on the event loop, where no handler is mutating documents
+            upserts = [(sid, encode_document(doc)) for sid, doc in pending.items() if doc is not None]
+            deletes = [(sid,) for sid, doc in pending.items() if doc is None]
+            try:
+                await asyncio.to_thread(self._write, upserts, deletes)
+            except Exception:
+                # Keep the batch unless a newer write superseded it meanwhile
+                for session_id, document in pending.items():
+                    self._pending.setdefault(session_id, document)
+                raise
+            self.flushes += 1
+            self.rows_written += len(pending)
+            return len(pending)
+
+    def _write(self, upserts, deletes):
+        with self._write_lock, self._connection:
+            self._connection.executemany(
+                "INSERT INTO sessions (session_id, document) VALUES (?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET document = excluded.document",
+                upserts,
+            )
+            self._connection.executemany("DELETE FROM sessions WHERE session_id = ?", deletes)
+
+    async def run(self):
+        """Flush on the interval, or sooner when a batch fills up"""
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing sessions: {e}")
+
+    async def close(self):
+        """Flush what is pending and close the database"""
+        await self.flush()
+        with self._write_lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def stats(self) -> dict:
+        return {"pending": len(self._pending), "flushes": self.flushes, "rows_written": self.rows_written}
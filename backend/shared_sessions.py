@@ -0,0 +1,193 @@
+"""Session progress shared by every worker process on a host.
+
+With several uvicorn or gunicorn workers, each process has its own
+``memory_storage``, so in-memory sessions diverge depending on which worker
+answers. ``SharedSessionCollection`` stands in for the ``session_progress``
+collection and keeps the documents in one SQLite database in WAL mode
+instead. Every worker opens that file; readers never block, and each update
+is a read-modify-write inside ``BEGIN IMMEDIATE``, so concurrent ``$inc``
+updates from different processes are serialised by SQLite's write lock and
+none is lost. Calls run on a worker thread so waiting for that lock never
+blocks the event loop.
+
+Expiry mirrors the in-memory TTL index: each row stores its deadline, and
+``delete_expired`` removes rows past it and then trims the oldest rows past
+``max_entries``.
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+from session_store import decode_document, encode_document
+from update_operators import apply_update_operators, new_upsert_document
+
+BUSY_TIMEOUT_MS = 5000
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS sessions ("
+    "session_id TEXT PRIMARY KEY, document TEXT NOT NULL, deadline REAL)",
+    "CREATE INDEX IF NOT EXISTS sessions_deadline ON sessions (deadline)",
+)
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _timestamp(moment: datetime) -> float:
+    return (moment - _EPOCH).total_seconds()
+
+
+class SharedSessionCollection:
+    """session_progress collection stored in a SQLite file shared by workers"""
+
+    def __init__(self, path, busy_timeout_ms: int = BUSY_TIMEOUT_MS):
+        self.path = Path(path)
+        self.busy_timeout_ms = busy_timeout_ms
+        self.ttl_field = None
+        self.ttl_seconds = None
+        self.max_entries: Optional[int] = None
+        self.expired_evictions = 0
+        self.lru_evictions = 0
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened lazily and per process: a connection must not cross a fork
+        if self._connection is None or self._pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(
+                self.path, timeout=self.busy_timeout_ms / 1000, isolation_level=None, check_same_thread=False
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            for statement in _SCHEMA:
+                connection.execute(statement)
+            self._connection, self._pid = connection, os.getpid()
+        return self._connection
+
+    async def _run(self, operation, *args):
+        def locked():
+            with self._lock:
+                return operation(self._connect(), *args)
+        return await asyncio.to_thread(locked)
+
+    def _deadline(self, document: dict) -> Optional[float]:
+        value = document.get(self.ttl_field) if self.ttl_field else None
+        if not isinstance(value, datetime):
+            return None
+        return _timestamp(value + timedelta(seconds=self.ttl_seconds))
+
+    def _read(self, connection, session_id):
+        row = connection.execute("SELECT document FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return decode_document(row[0]) if row else None
+
+    def _write(self, connection, session_id, document):
+        connection.execute(
+            "INSERT INTO sessions (session_id, document, deadline) VALUES (?, ?, ?) "
+            "ON CONFLICT(session_id) DO UPDATE SET document = excluded.document, deadline = excluded.deadline",
+            (session_id, encode_document(document), self._deadline(document)),
+        )
+
+    async def create_index(self, keys, expireAfterSeconds=None, **kwargs):
+        """session_id is the primary key; a TTL index enables expiry"""
+        fields = [keys] if isinstance(keys, str) else [field for field, _ in keys]
+        if expireAfterSeconds is not None and len(fields) == 1:
+            self.ttl_field = fields[0]
+            self.ttl_seconds = expireAfterSeconds
+        return "_".join(f"{field}_1" for field in fields)
+
+    async def find_one(self, query):
+        session_id = query.get('session_id')
+        if not session_id:
+            return None
+        return await self._run(self._read, session_id)
+
+    async def insert_one(self, document):
+        session_id = document.get('session_id')
+        if not session_id:
+            return None
+        await self._run(self._write, session_id, document)
+        return {"inserted_id": session_id}
+
+    async def replace_one(self, query, document, upsert=False):
+        session_id = query.get('session_id')
+        if session_id:
+            await self._run(self._write, session_id, document)
+
+    async def update_one(self, query, update, upsert=False):
+        """Apply $set/$inc/$setOnInsert in one transaction across all workers"""
+        session_id = query.get('session_id')
+
+        def apply(connection):
+            result = {"matched_count": 0, "modified_count": 0, "upserted_id": None}
+            if not session_id:
+                return result
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                document = self._read(connection, session_id)
+                if document is None:
+                    if not upsert:
+                        connection.execute("ROLLBACK")
+                        return result
+                    document = new_upsert_document(query, update)
+                    result["upserted_id"] = document["_id"]
+                else:
+                    result["matched_count"] = 1
+                    result["modified_count"] = 1
+                apply_update_operators(document, update)
+                self._write(connection, session_id, document)
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            return result
+
+        return await self._run(apply)
+
+    async def count_documents(self, query):
+        def count(connection):
+            return connection.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        return await self._run(count)
+
+    async def aggregate(self, pipeline):
+        return []
+
+    async def delete_expired(self, now=None):
+        """Remove rows past their deadline, then the oldest past max_entries"""
+        cutoff = _timestamp(now or datetime.utcnow())
+
+        def delete(connection):
+            expired = connection.execute("DELETE FROM sessions WHERE deadline <= ?", (cutoff,)).rowcount
+            trimmed = 0
+            if self.max_entries:
+                trimmed = connection.execute(
+                    "DELETE FROM sessions WHERE session_id IN ("
+                    "SELECT session_id FROM sessions ORDER BY deadline LIMIT max(0, "
+                    "(SELECT COUNT(*) FROM sessions) - ?))",
+                    (self.max_entries,),
+                ).rowcount
+            return expired, trimmed
+
+        expired, trimmed = await self._run(delete)
+        self.expired_evictions += expired
+        self.lru_evictions += trimmed
+        return expired + trimmed
+
+    async def expiry_stats(self):
+        return {
+            "live": await self.count_documents({}),
+            "expired_evictions": self.expired_evictions,
+            "lru_evictions": self.lru_evictions,
+            "max_entries": self.max_entries,
+            "shared_path": str(self.path),
+        }
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+            self._connection = None
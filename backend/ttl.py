@@ -0,0 +1,104 @@
+"""Expiry bookkeeping for the in-memory session collection.
+
+Works like a MongoDB TTL index: every document has a deadline and a sweeper
+periodically removes the ones that have passed. Deadlines live in a min-heap
+with lazy invalidation, so a sweep pops only the entries that are due.
+Refreshing a session usually moves its deadline later, which only records
+the new deadline: the sweep reschedules an entry it finds was extended. Recency is tracked as well, so a
+size cap can fall back to evicting the least recently used documents.
+"""
+import heapq
+import itertools
+from collections import OrderedDict
+from datetime import datetime
+from typing import Hashable, List, Optional
+
+
+class ExpiryIndex:
+    """Deadline heap plus LRU order over a set of keys"""
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries
+        self._heap = []
+        self._deadlines = {}
+        # The (deadline, sequence) of each key's live heap entry, which is
+        # never later than its deadline
+        self._scheduled = {}
+        self._recency = OrderedDict()
+        self._sequence = itertools.count()
+        self.expired_evictions = 0
+        self.lru_evictions = 0
+
+    def __len__(self):
+        return len(self._recency)
+
+    def __contains__(self, key):
+        return key in self._recency
+
+    def touch(self, key: Hashable, deadline: Optional[datetime] = None) -> List[Hashable]:
+        """Record a write to ``key``; returns keys evicted to respect the cap"""
+        self._recency[key] = None
+        self._recency.move_to_end(key)
+        if deadline is None:
+            self._deadlines.pop(key, None)
+            self._scheduled.pop(key, None)
+        else:
+            self._deadlines[key] = deadline
+            scheduled = self._scheduled.get(key)
+            if scheduled is None or deadline < scheduled[0]:
+                self._schedule(key, deadline)
+                self._maybe_compact()
+
+        if self.max_entries is None or len(self._recency) <= self.max_entries:
+            return []
+        evicted = []
+        while len(self._recency) > self.max_entries:
+            oldest, _ = self._recency.popitem(last=False)
+            self._deadlines.pop(oldest, None)
+            self._scheduled.pop(oldest, None)
+            evicted.append(oldest)
+        self.lru_evictions += len(evicted)
+        return evicted
+
+    def discard(self, key: Hashable):
+        self._recency.pop(key, None)
+        self._deadlines.pop(key, None)
+        self._scheduled.pop(key, None)
+
+    def pop_expired(self, now: datetime) -> List[Hashable]:
+        """Remove and return every key whose deadline is at or before ``now``"""
+        expired = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, sequence, key = heapq.heappop(self._heap)
+            # Entries superseded by an earlier deadline or a discard are skipped
+            if self._scheduled.get(key) != (deadline, sequence):
+                continue
+            if self._deadlines[key] > now:
+                self._schedule(key, self._deadlines[key])
+                continue
+            del self._deadlines[key]
+            del self._scheduled[key]
+            self._recency.pop(key, None)
+            expired.append(key)
+        self.expired_evictions += len(expired)
+        return expired
+
+    def _schedule(self, key, deadline):
+        entry = (deadline, next(self._sequence))
+        self._scheduled[key] = entry
+        heapq.heappush(self._heap, (*entry, key))
+
+    def _maybe_compact(self):
+        """Rebuild the heap once stale entries outnumber live ones"""
+        if len(self._heap) > 64 and len(self._heap) > 2 * len(self._scheduled):
+            self._heap = [(deadline, sequence, key) for key, (deadline, sequence) in self._scheduled.items()]
+            heapq.heapify(self._heap)
+
+    def stats(self) -> dict:
+        return {
+            "live": len(self._recency),
+            "scheduled": len(self._deadlines),
+            "expired_evictions": self.expired_evictions,
+            "lru_evictions": self.lru_evictions,
+            "max_entries": self.max_entries,
+        }
@@ -0,0 +1,21 @@
+"""MongoDB-style update operators for the storage backends that apply them
+themselves (the in-memory collections and the shared session store)."""
+import uuid
+
+
+def new_upsert_document(query, update):
+    """Document created by an upsert: equality fields from the query plus $setOnInsert"""
+    document = {key: value for key, value in query.items() if not key.startswith('$')}
+    document.update(update.get('$setOnInsert', {}))
+    document.setdefault('_id', str(uuid.uuid4()))
+    return document
+
+
+def apply_update_operators(document, update):
+    """Apply $set and $inc in place; missing $inc fields start from 0"""
+    if '$set' in update:
+        document.update(update['$set'])
+    if '$inc' in update:
+        for key, amount in update['$inc'].items():
+            document[key] = document.get(key, 0) + amount
+    return document
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Lock contention benchmark for the in-memory collections
+
+Simulates many concurrent voice sessions each submitting answers: every
+answer looks up a math problem and then updates that session's progress.
+Two implementations of that path are driven with the same load:
+
+  storage_lock  a faithful copy of the code before per-collection locking:
+                one threading.Lock taken by every MockCollection method,
+                and update_session_progress as find_one + replace_one
+  current       the real server.db.math_problems.find_one and
+                server.update_session_progress (one atomic update_one under
+                the collection read lock and the session's lock, which it
+                skips taking when both are free, plus TTL/LRU bookkeeping)
+
+Neither path awaits while it holds a lock, so on one event loop the old
+threading.Lock was never contended; the comparison shows what the two
+implementations cost per answer, not a contention collapse. current should
+be at least as fast as storage_lock.
+
+Usage: python benchmarks/contention_benchmark.py [--sessions 200] [--answers 20] [--rounds 3]
+"""
+
+import argparse
+import asyncio
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server  # noqa: E402
+
+
+class LegacyCollection:
+    """The answer path's MockCollection methods as they were under storage_lock"""
+
+    def __init__(self, name, storage, storage_lock):
+        self.name = name
+        self.storage = storage
+        self.storage_lock = storage_lock
+
+    async def find_one(self, query):
+        with self.storage_lock:
+            if self.name == 'session_progress':
+                return self.storage['session_progress'].get(query.get('session_id'))
+            index = self.storage.get(self.name)
+            if index is None:
+                return None
+            if '_id' in query:
+                document = index.get(query['_id'])
+                if document is None:
+                    return None
+                other = {key: value for key, value in query.items() if key != '_id'}
+                return document if all(document.get(k) == v for k, v in other.items()) else None
+            documents = index.find(query)
+            return documents[0] if documents else None
+
+    async def replace_one(self, query, document, upsert=False):
+        with self.storage_lock:
+            if self.name == 'session_progress':
+                session_id = query.get('session_id')
+                if session_id:
+                    self.storage['session_progress'][session_id] = document
+
+
+async def legacy_update_session_progress(session_progress, session_id, subject, correct):
+    """update_session_progress before atomic updates: read, modify, replace"""
+    progress = await session_progress.find_one({"session_id": session_id})
+    if not progress:
+        progress = server.SessionProgress(session_id=session_id).model_dump()
+        progress.pop("id")
+    if correct:
+        progress[f"{subject}_score"] = progress.get(f"{subject}_score", 0) + 1
+        progress[f"{subject}_streak"] = progress.get(f"{subject}_streak", 0) + 1
+    else:
+        progress[f"{subject}_streak"] = 0
+    progress["problems_solved"] = progress.get("problems_solved", 0) + 1
+    progress["last_activity"] = datetime.utcnow()
+    progress["expires_at"] = datetime.utcnow() + timedelta(days=1)
+    await session_progress.replace_one({"session_id": session_id}, progress, upsert=True)
+
+
+async def run_storage_lock(problem_ids, sessions, answers):
+    storage = {'math_problems': server.memory_storage['math_problems'], 'session_progress': {}}
+    storage_lock = threading.Lock()
+    math_problems = LegacyCollection('math_problems', storage, storage_lock)
+    session_progress = LegacyCollection('session_progress', storage, storage_lock)
+
+    async def session(session_id):
+        for i in range(answers):
+            problem = await math_problems.find_one({"_id": problem_ids[i % len(problem_ids)]})
+            await legacy_update_session_progress(session_progress, session_id, "math", problem is not None)
+
+    await asyncio.gather(*(session(f"session-{n}") for n in range(sessions)))
+    return storage['session_progress']
+
+
+async def run_current(problem_ids, sessions, answers):
+    server.memory_storage['session_progress'].clear()
+
+    async def session(session_id):
+        for i in range(answers):
+            problem = await server.db.math_problems.find_one({"_id": problem_ids[i % len(problem_ids)]})
+            await server.update_session_progress(session_id, "math", problem is not None)
+
+    await asyncio.gather(*(session(f"session-{n}") for n in range(sessions)))
+    return server.memory_storage['session_progress']
+
+
+async def main(args):
+    await server.initialize_data()
+    problem_ids = list(server.memory_storage["math_problems"].by_id)
+    total = args.sessions * args.answers
+
+    print(f"{args.sessions} sessions x {args.answers} answers, best of {args.rounds}")
+    print(f"{'implementation':<16}{'seconds':>10}{'answers/s':>14}")
+    results = {}
+    for name, runner in (("storage_lock", run_storage_lock), ("current", run_current)):
+        best = None
+        for _ in range(args.rounds):
+            start = time.perf_counter()
+            progress = await runner(problem_ids, args.sessions, args.answers)
+            elapsed = time.perf_counter() - start
+            solved = sum(document["problems_solved"] for document in progress.values())
+            assert solved == total, f"{name} lost updates: {solved} of {total}"
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = total / best
+        print(f"{name:<16}{best:>10.3f}{results[name]:>14.0f}")
+    print(f"current / storage_lock: {results['current'] / results['storage_lock']:.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--answers", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=3)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Math problem generation benchmark
+
+Compares three ways of producing N math problems:
+  legacy      generate_math_problems() from server.py, called repeatedly
+              (random.randint plus one pydantic MathProblem per item)
+  per-item    math_generator.generate_problem(), one dict per item
+  numpy       math_bank.generate_bank(), whole operand arrays per
+              (type, difficulty) block into columnar storage
+
+Usage: python benchmarks/generation_benchmark.py [--sizes 10000 100000 1000000] [--legacy-max 1000000]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server  # noqa: E402
+from math_bank import generate_bank  # noqa: E402
+from math_generator import DIFFICULTIES, MATH_TYPES, generate_problem  # noqa: E402
+
+
+def run_legacy(size):
+    problems = []
+    while len(problems) < size:
+        problems.extend(server.generate_math_problems())
+    return problems[:size]
+
+
+def run_per_item(size):
+    rng = random.Random(0)
+    return [
+        generate_problem(rng.choice(MATH_TYPES), rng.choice(DIFFICULTIES), rng.getrandbits(48))
+        for _ in range(size)
+    ]
+
+
+def run_numpy(size):
+    combinations = len(MATH_TYPES) * len(DIFFICULTIES)
+    return generate_bank(-(-size // combinations), seed=0)
+
+
+def timed(function, size):
+    start = time.perf_counter()
+    result = function(size)
+    return time.perf_counter() - start, result
+
+
+def main(args):
+    print(f"{'items':>10}{'generator':>12}{'seconds':>10}{'items/s':>14}{'speedup':>10}")
+    for size in args.sizes:
+        runs = [("per-item", run_per_item), ("numpy", run_numpy)]
+        if size <= args.legacy_max:
+            runs.insert(0, ("legacy", run_legacy))
+        baseline = None
+        for name, function in runs:
+            elapsed, result = timed(function, size)
+            assert len(result) >= size
+            baseline = baseline or elapsed
+            print(f"{size:>10}{name:>12}{elapsed:>10.3f}{size / elapsed:>14,.0f}{baseline / elapsed:>9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--legacy-max", type=int, default=1_000_000,
+                        help="largest size to run the slow legacy generator at")
+    main(parser.parse_args())
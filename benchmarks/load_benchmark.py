@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+In-process load and latency benchmark for the API
+
+Drives the FastAPI app directly through httpx's ASGI transport (no server,
+no network) with the request mix of backend_test.py: thousands of concurrent
+sessions each fetch math problems and English exercises with the filters
+that suite uses, submit right or wrong answers (70% right) and check their
+progress every few steps. Reports p50/p95/p99 latency and requests per
+second per endpoint.
+
+Results are compared with the stored baseline: the run fails if any
+endpoint's p95 latency, or the overall throughput, is worse than the
+baseline by more than ``--tolerance``, or if any request failed. Baselines
+are machine-specific; record one with --update-baseline.
+
+Usage: python benchmarks/load_benchmark.py [--sessions 2000] [--steps 10] [--tolerance 0.5] [--update-baseline]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server  # noqa: E402
+
+BASELINE = Path(__file__).resolve().parent / "load_baseline.json"
+
+# Filters exercised by backend_test.py
+MATH_FILTERS = [
+    {}, {"type": "addition"}, {"type": "subtraction"}, {"type": "multiplication"}, {"type": "division"},
+    {"difficulty": "easy"}, {"difficulty": "medium"}, {"type": "addition", "difficulty": "easy"},
+]
+ENGLISH_FILTERS = [
+    {"type": "spelling"}, {"type": "vocabulary"}, {"type": "grammar"}, {"type": "spelling", "difficulty": "easy"},
+]
+ENGLISH_SHARE = 0.3
+CORRECT_SHARE = 0.7
+PROGRESS_EVERY = 5
+
+
+class Recorder:
+    """Latencies and failures per endpoint label"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.failures = defaultdict(int)
+
+    async def request(self, client, label, method, url, **kwargs):
+        start = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        self.latencies[label].append(time.perf_counter() - start)
+        if response.status_code != 200:
+            self.failures[label] += 1
+            return None
+        return response.json()
+
+
+async def session(client, recorder, session_id, steps, rng):
+    for step in range(steps):
+        if rng.random() < ENGLISH_SHARE:
+            exercise = await recorder.request(
+                client, "GET /api/english/exercises", "GET", "/api/english/exercises", params=rng.choice(ENGLISH_FILTERS)
+            )
+            if exercise:
+                answer = exercise["accepted_answers"][0] if rng.random() < CORRECT_SHARE else "not the answer"
+                await recorder.request(client, "POST /api/english/answer", "POST", "/api/english/answer", json={
+                    "exercise_id": exercise["id"], "user_answer": answer, "session_id": session_id,
+                })
+        else:
+            problem = await recorder.request(
+                client, "GET /api/math/problems", "GET", "/api/math/problems", params=rng.choice(MATH_FILTERS)
+            )
+            if problem:
+                answer = problem["answer"] if rng.random() < CORRECT_SHARE else problem["answer"] + 1
+                await recorder.request(client, "POST /api/math/answer", "POST", "/api/math/answer", json={
+                    "problem_id": problem["id"], "user_answer": answer, "session_id": session_id,
+                })
+        if step % PROGRESS_EVERY == PROGRESS_EVERY - 1:
+            await recorder.request(client, "GET /api/progress/{session_id}", "GET", f"/api/progress/{session_id}")
+
+
+async def run(sessions, steps, seed):
+    recorder = Recorder()
+    rng = random.Random(seed)
+    await server.startup_event()
+    try:
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            start = time.perf_counter()
+            await asyncio.gather(*(
+                session(client, recorder, f"load-{n}", steps, random.Random(rng.random()))
+                for n in range(sessions)
+            ))
+            elapsed = time.perf_counter() - start
+    finally:
+        await server.shutdown_event()
+    return recorder, elapsed
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def summarize(recorder, elapsed):
+    results = {}
+    for label, latencies in sorted(recorder.latencies.items()):
+        latencies = sorted(latencies)
+        results[label] = {
+            "count": len(latencies),
+            "p50_ms": round(statistics.median(latencies) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+            "rps": round(len(latencies) / elapsed, 1),
+            "failures": recorder.failures[label],
+        }
+    total = sum(len(latencies) for latencies in recorder.latencies.values())
+    return {"endpoints": results, "total_rps": round(total / elapsed, 1), "elapsed_s": round(elapsed, 3)}
+
+
+def compare(summary, baseline, tolerance):
+    """Regression messages against the baseline"""
+    regressions = []
+    for label, result in summary["endpoints"].items():
+        if result["failures"]:
+            regressions.append(f"{label}: {result['failures']} failed requests")
+        reference = baseline["endpoints"].get(label)
+        if reference and result["p95_ms"] > reference["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{label}: p95 {result['p95_ms']} ms vs baseline {reference['p95_ms']} ms")
+    if summary["total_rps"] < baseline["total_rps"] / (1 + tolerance):
+        regressions.append(f"throughput {summary['total_rps']} req/s vs baseline {baseline['total_rps']} req/s")
+    return regressions
+
+
+def main(args):
+    for name in ("server", "httpx"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    recorder, elapsed = asyncio.run(run(args.sessions, args.steps, args.seed))
+    summary = summarize(recorder, elapsed)
+    summary["workload"] = {"sessions": args.sessions, "steps": args.steps}
+
+    print(f"{'endpoint':<34}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}")
+    for label, result in summary["endpoints"].items():
+        print(f"{label:<34}{result['count']:>8}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}"
+              f"{result['p99_ms']:>10.2f}{result['rps']:>10.1f}")
+    print(f"total {summary['total_rps']} req/s over {summary['elapsed_s']} s")
+
+    if args.update_baseline or not BASELINE.exists():
+        BASELINE.write_text(json.dumps(summary, indent=2) + "\n")
+        print(f"Baseline written to {BASELINE}")
+        return 0
+    baseline = json.loads(BASELINE.read_text())
+    if baseline.get("workload") != summary["workload"]:
+        print(f"Baseline workload {baseline.get('workload')} differs; comparing anyway")
+    regressions = compare(summary, baseline, args.tolerance)
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--steps", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown over the baseline (0.5 = 50%%)")
+    parser.add_argument("--update-baseline", action="store_true")
+    sys.exit(main(parser.parse_args()))
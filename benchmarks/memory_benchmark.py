@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Math problem bank memory benchmark
+
+Measures the Python heap used per million math problems when they are held
+the way bank mode holds them (one dict per problem with a UUID _id, text
+fields and a datetime, filed in a ContentIndex, plus a pre-rendered
+response body) against the columnar store used by MATH_CONTENT_MODE=columnar.
+
+Dict-based layouts are measured at --sample problems and scaled to a
+million; the columnar store is measured at a full million.
+
+Usage: python benchmarks/memory_benchmark.py [--sample 100000]
+"""
+
+import argparse
+import gc
+import sys
+import tracemalloc
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from columnar_store import ColumnarMathStore  # noqa: E402
+from content_index import ContentIndex  # noqa: E402
+from math_bank import generate_bank  # noqa: E402
+from math_generator import DIFFICULTIES, MATH_TYPES  # noqa: E402
+from response_cache import ResponseCache  # noqa: E402
+from server import MathProblem  # noqa: E402
+
+MILLION = 1_000_000
+COMBINATIONS = len(MATH_TYPES) * len(DIFFICULTIES)
+
+
+def measure(build):
+    """Heap bytes still allocated by build()'s result"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, result
+
+
+def main(args):
+    bank = generate_bank(-(-args.sample // COMBINATIONS), seed=0)
+    rows = range(len(bank))
+    sample = len(bank)
+
+    def documents():
+        return [
+            dict(bank.document(row, str(uuid.uuid4())), created_at=datetime.utcnow())
+            for row in rows
+        ]
+
+    documents_bytes, docs = measure(documents)
+
+    def indexed():
+        index = ContentIndex()
+        for document in docs:
+            index.add(document)
+        return index
+
+    index_bytes, _ = measure(indexed)
+
+    def bodies():
+        cache = ResponseCache(MathProblem)
+        cache.add_many(docs)
+        return cache
+
+    bodies_bytes, _ = measure(bodies)
+    del docs
+
+    million_bank = generate_bank(-(-MILLION // COMBINATIONS), seed=0)
+    traced_bytes, store = measure(lambda: ColumnarMathStore(million_bank))
+    # The type/difficulty code arrays are shared with the generated bank, so
+    # they are not in the traced delta; count the store's arrays in full
+    columnar_bytes = max(traced_bytes, store.nbytes)
+    scale = MILLION / sample
+
+    print(f"{'layout':<36}{'bytes/problem':>14}{'MB per million':>16}")
+    for name, per_problem in (
+        ("dict documents", documents_bytes / sample),
+        ("  + ContentIndex", index_bytes / sample),
+        ("  + pre-rendered bodies", bodies_bytes / sample),
+        ("bank mode total", (documents_bytes + index_bytes + bodies_bytes) / sample),
+        ("columnar store", columnar_bytes / len(store)),
+    ):
+        print(f"{name:<36}{per_problem:>14.1f}{per_problem * MILLION / 2**20:>16.1f}")
+    print(f"(dict layouts measured at {sample} problems, x{scale:.0f})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sample", type=int, default=100_000)
+    main(parser.parse_args())
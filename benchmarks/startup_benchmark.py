@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Time-to-first-request regression benchmark
+
+Starts the API under uvicorn in a fresh process and measures, from process
+launch, how long it takes until the /api/ health route answers and until
+the first math problem is served. Each measurement is the median of
+``--runs`` launches and is compared with the stored baseline; the script
+exits non-zero if either exceeds its baseline by more than ``--tolerance``.
+
+The server's environment variables apply, e.g. CONTENT_LOADING=background
+answers the health route before content has loaded.
+
+Usage: python benchmarks/startup_benchmark.py [--runs 5] [--tolerance 0.5] [--update-baseline]
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent / "backend"
+BASELINE = Path(__file__).resolve().parent / "startup_baseline.json"
+TIMEOUT_SECONDS = 30
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(url, deadline):
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter()
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(0.002)
+    raise TimeoutError(f"{url} did not answer within {TIMEOUT_SECONDS}s")
+
+
+def launch():
+    """Seconds from launch until the health route, then a math problem, answers"""
+    port = free_port()
+    base = f"http://127.0.0.1:{port}/api"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND, env=dict(os.environ), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = start + TIMEOUT_SECONDS
+        health = wait_for(f"{base}/", deadline)
+        problem = wait_for(f"{base}/math/problems", deadline)
+        return health - start, problem - start
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main(args):
+    runs = [launch() for _ in range(args.runs)]
+    result = {
+        "health_ms": round(statistics.median(health for health, _ in runs) * 1000, 1),
+        "first_problem_ms": round(statistics.median(problem for _, problem in runs) * 1000, 1),
+    }
+
+    if args.update_baseline or not BASELINE.exists():
+        BASELINE.write_text(json.dumps(result, indent=2) + "\n")
+        print(f"Baseline written to {BASELINE}: {result}")
+        return 0
+
+    baseline = json.loads(BASELINE.read_text())
+    failed = False
+    print(f"{'measurement':<20}{'baseline ms':>14}{'median ms':>12}")
+    for key, value in result.items():
+        limit = baseline[key] * (1 + args.tolerance)
+        regressed = value > limit
+        failed |= regressed
+        print(f"{key:<20}{baseline[key]:>14.1f}{value:>12.1f}{'  REGRESSION' if regressed else ''}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown over the baseline (0.5 = 50%%)")
+    parser.add_argument("--update-baseline", action="store_true")
+    sys.exit(main(parser.parse_args()))
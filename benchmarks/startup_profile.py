@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Startup profile for the API server
+
+Reports where cold start goes: import time of server.py broken down by
+top-level module (from ``python -X importtime`` in a fresh interpreter), then
+the time of each startup phase (index setup, content initialization) and of
+the first content request. The server's environment variables apply, so
+modes can be compared, e.g.
+
+    MATH_CONTENT_MODE=columnar python benchmarks/startup_profile.py
+
+Usage: python benchmarks/startup_profile.py [--top 15]
+"""
+
+import argparse
+import asyncio
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent / "backend"
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_profile():
+    """Self time per top-level module and cumulative time per direct import of server"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"],
+        cwd=BACKEND, capture_output=True, text=True, check=True,
+    )
+    by_package = defaultdict(int)
+    direct = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = int(match[1]), int(match[2]), len(match[3]), match[4]
+        by_package[name.split(".")[0]] += self_us
+        if name == "server":
+            total = cumulative_us
+        elif indent == 3:
+            # Imported directly by server (one level below it)
+            direct[name] = cumulative_us
+    return total, by_package, direct
+
+
+async def timed(label, coroutine, rows):
+    start = time.perf_counter()
+    result = await coroutine
+    rows.append((label, time.perf_counter() - start))
+    return result
+
+
+async def startup_phases(server):
+    rows = []
+    await timed("ensure_indexes", server.ensure_indexes(), rows)
+    await timed("initialize_data", server.initialize_data(), rows)
+    await timed("first GET /api/math/problems", server.get_math_problem(type=None, difficulty=None), rows)
+    return rows
+
+
+def main(args):
+    total, by_package, direct = import_profile()
+    print(f"import server: {total / 1000:.1f} ms")
+    print(f"\n{'top-level module':<32}{'self ms':>10}")
+    for name, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{name:<32}{self_us / 1000:>10.1f}")
+    print(f"\n{'imported by server':<32}{'cumulative ms':>16}")
+    for name, cumulative_us in sorted(direct.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{name:<32}{cumulative_us / 1000:>16.1f}")
+
+    sys.path.insert(0, str(BACKEND))
+    import server
+
+    print(f"\n{'startup phase':<32}{'ms':>10}")
+    for label, seconds in asyncio.run(startup_phases(server)):
+        print(f"{label:<32}{seconds * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=15)
+    main(parser.parse_args())
@@ -0,0 +1,41 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# The backend is run from its own directory (``uvicorn server:app``), so its
+# modules import each other as top-level modules.
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+
+@pytest.fixture
+def fresh_server(monkeypatch):
+    """Server module state as a newly started worker has it
+
+    Returns a function that starts over again, optionally with another
+    ``db``, to stand in for a second worker.
+    """
+    import server
+    from catalog import CatalogCache
+    from content_index import ContentIndex
+    from content_service import ContentService
+    from english_matcher import AnswerMatchers
+    from item_stats import ItemStats
+    from response_cache import ResponseCache
+
+    def reset(db=None):
+        monkeypatch.setattr(server, "db", db or server.MockDB("test"))
+        monkeypatch.setattr(server, "memory_storage", {
+            "math_problems": ContentIndex(), "english_exercises": ContentIndex(), "session_progress": {},
+        })
+        monkeypatch.setattr(server, "math_content", ContentService(ResponseCache(server.MathProblem)))
+        monkeypatch.setattr(server, "english_content", ContentService(ResponseCache(server.EnglishExercise)))
+        monkeypatch.setattr(server, "content_loading", None)
+        monkeypatch.setattr(server, "english_matchers", AnswerMatchers())
+        monkeypatch.setattr(server, "item_stats", {"math": ItemStats(), "english": ItemStats()})
+        monkeypatch.setattr(server, "catalogs", CatalogCache())
+
+    reset()
+    return reset
@@ -0,0 +1,97 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import server
+from bank_file import MAGIC, BankFileError, build, main, open_store, save_store
+from columnar_store import ColumnarMathStore
+from math_bank import generate_bank
+
+BACKEND = Path(server.__file__).resolve().parent
+
+
+def test_saved_bank_maps_back_identically(tmp_path):
+    store = ColumnarMathStore(generate_bank(30, seed=1))
+    opened = open_store(save_store(store, tmp_path / "bank.bin"))
+
+    assert opened.tag == store.tag and opened.ranges == store.ranges
+    assert all(np.array_equal(x, y) and x.dtype == y.dtype for x, y in zip(opened.bank.columns(), store.bank.columns()))
+    # Columns are read-only views over the mapping, not copies
+    assert not opened.bank.answer.flags.writeable
+    doc_id = store.row_id(123)
+    assert opened.get(doc_id) == store.get(doc_id)
+    assert len(opened.lookup({"type": "division", "difficulty": "hard"})) == 30
+
+
+def test_columns_are_aligned(tmp_path):
+    path = save_store(ColumnarMathStore(generate_bank(7, seed=2)), tmp_path / "bank.bin")
+    opened = open_store(path)
+    for column in opened.bank.columns():
+        assert column.__array_interface__["data"][0] % 64 == 0
+
+
+def test_ids_survive_a_restart(tmp_path):
+    path = tmp_path / "bank.bin"
+    built = build(path, 10, seed=3)
+    doc_id = built.row_id(77)
+
+    assert open_store(path).get(doc_id) == built.get(doc_id)
+    assert open_store(path).get(doc_id) == open_store(path).get(doc_id)
+
+
+def test_unreadable_files_are_rejected(tmp_path):
+    path = save_store(ColumnarMathStore(generate_bank(5, seed=4)), tmp_path / "bank.bin")
+    data = path.read_bytes()
+
+    for name, content in (
+        ("empty.bin", b""),
+        ("other.bin", b"NOTABANK" + data[8:]),
+        ("truncated.bin", data[:-10]),
+    ):
+        (tmp_path / name).write_bytes(content)
+        with pytest.raises(BankFileError):
+            open_store(tmp_path / name)
+
+    length = int.from_bytes(data[8:12], "little")
+    header = json.loads(data[12:12 + length])
+    header["difficulties"] = ["easy", "hard", "medium"]
+    encoded = json.dumps(header).encode()
+    (tmp_path / "reordered.bin").write_bytes(MAGIC + len(encoded).to_bytes(4, "little") + encoded)
+    with pytest.raises(BankFileError):
+        open_store(tmp_path / "reordered.bin")
+
+
+def test_server_builds_the_file_once_then_maps_it(tmp_path, monkeypatch):
+    path = tmp_path / "math_bank.bin"
+    monkeypatch.setattr(server, "MATH_BANK_PATH", str(path))
+    monkeypatch.setattr(server, "MATH_BANK_PER_COMBINATION", 20)
+
+    first = server.load_math_bank()
+    assert path.exists()
+    # Even the worker that built the file serves the mapped copy
+    assert not first.bank.a.flags.writeable
+    second = server.load_math_bank()
+    assert second.tag == first.tag and len(second) == len(first) == 240
+    assert not second.bank.a.flags.writeable
+
+
+def test_workers_starting_together_build_one_bank(tmp_path):
+    path = tmp_path / "math_bank.bin"
+    # No seed: each builder would generate a different bank
+    code = f"from bank_file import open_or_build; print(open_or_build({str(path)!r}, 500).tag)"
+    workers = [
+        subprocess.Popen([sys.executable, "-c", code], cwd=BACKEND, stdout=subprocess.PIPE, text=True)
+        for _ in range(3)
+    ]
+    tags = {worker.communicate()[0].strip() for worker in workers}
+    assert tags == {open_store(path).tag}
+
+
+def test_build_command(tmp_path, capsys):
+    main(["build", str(tmp_path / "bank.bin"), "--per-combination", "4", "--seed", "5"])
+    assert "Wrote 48 problems" in capsys.readouterr().out
+    assert len(open_store(tmp_path / "bank.bin")) == 48
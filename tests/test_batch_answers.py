@@ -0,0 +1,75 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+import server
+from content_service import ContentService
+from response_cache import ResponseCache
+
+NOW = datetime(2026, 1, 1)
+
+
+def test_progress_update_replays_streaks_in_order():
+    update = server.progress_update({"math": [True, False, True, True], "english": [True, True]}, NOW)
+
+    assert update["$inc"] == {
+        "problems_solved": 6,
+        "math_score": 3,
+        "english_score": 2,
+        "english_streak": 2,
+    }
+    assert update["$set"]["math_streak"] == 2
+    assert "english_streak" not in update["$set"]
+
+
+@pytest.fixture
+def loaded_content(fresh_server, monkeypatch):
+    math_content = ContentService(ResponseCache(server.MathProblem))
+    math_content.load([
+        {"_id": "m1", "question": "q", "display": "d", "answer": 4, "type": "addition", "difficulty": "easy"},
+    ])
+    english_content = ContentService(ResponseCache(server.EnglishExercise))
+    english_content.load([{
+        "_id": "e1", "type": "spelling", "question": "q", "display": "d",
+        "accepted_answers": ["cat"], "correct_answer": "C-A-T", "difficulty": "easy",
+    }])
+    monkeypatch.setattr(server, "math_content", math_content)
+    monkeypatch.setattr(server, "english_content", english_content)
+
+
+def test_batch_grades_items_and_updates_each_session_once(loaded_content, monkeypatch):
+    calls = []
+    update_one = server.db.session_progress.update_one
+
+    async def counting_update_one(query, update, upsert=False):
+        calls.append(query["session_id"])
+        return await update_one(query, update, upsert=upsert)
+
+    monkeypatch.setattr(server.db.session_progress, "update_one", counting_update_one)
+    request = server.BatchAnswerRequest(
+        math=[
+            {"problem_id": "m1", "user_answer": 4, "session_id": "s1"},
+            {"problem_id": "m1", "user_answer": 5, "session_id": "s1"},
+            {"problem_id": "missing", "user_answer": 4, "session_id": "s1"},
+            {"problem_id": "m1", "user_answer": 4, "session_id": "s2"},
+        ],
+        english=[{"exercise_id": "e1", "user_answer": "c a t cat", "session_id": "s1"}],
+    )
+    result = asyncio.run(server.submit_answer_batch(request))
+
+    assert [item["correct"] for item in result["math"]] == [True, False, None, True]
+    assert result["math"][2]["error"] == "Problem not found"
+    assert result["english"][0]["correct"] is True
+    assert result["sessions_updated"] == 2
+    assert sorted(calls) == ["s1", "s2"]
+
+    s1 = server.memory_storage["session_progress"]["s1"]
+    assert (s1["math_score"], s1["math_streak"], s1["english_score"], s1["problems_solved"]) == (1, 0, 1, 3)
+
+
+def test_batch_size_is_bounded():
+    with pytest.raises(ValueError):
+        server.BatchAnswerRequest(math=[
+            {"problem_id": "m1", "user_answer": 1, "session_id": "s"}
+        ] * (server.MAX_BATCH_ANSWERS + 1))
@@ -0,0 +1,133 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+
+import server
+from catalog import CatalogCache, CatalogTooLarge, CatalogUnavailable, etag_matches
+from content_service import ContentService
+from math_generator import GeneratedMathContent
+from response_cache import ResponseCache
+
+
+def make_problem(doc_id, a, type="addition"):
+    return {
+        "_id": doc_id, "question": f"What is {a} plus 1?", "display": f"{a} + 1 = ?", "answer": a + 1,
+        "type": type, "difficulty": "easy",
+    }
+
+
+def make_content(*documents):
+    content = ContentService(ResponseCache(server.MathProblem))
+    content.load(documents)
+    return content
+
+
+def build(catalogs, content, match=None):
+    return asyncio.run(catalogs.catalog("math", content, match or {}))
+
+
+def test_version_depends_only_on_content():
+    first = build(CatalogCache(), make_content(make_problem("a", 1), make_problem("b", 2)))
+    # Same items loaded in another order, into another service
+    second = build(CatalogCache(), make_content(make_problem("b", 2), make_problem("a", 1)))
+    changed = build(CatalogCache(), make_content(make_problem("a", 1), make_problem("b", 3)))
+
+    assert first.version == second.version != changed.version
+    assert first.body == second.body
+    body = json.loads(first.body)
+    assert body["version"] == first.version
+    assert [item["id"] for item in body["items"]] == ["a", "b"]
+
+
+def test_catalog_is_cached_until_content_changes():
+    content = make_content(make_problem("a", 1))
+    catalogs = CatalogCache()
+    first = build(catalogs, content)
+    assert build(catalogs, content) is first
+
+    content.load([make_problem("b", 2)])
+    assert build(catalogs, content).ids == {"a", "b"}
+
+
+def test_delta_lists_added_items_and_removed_ids():
+    content = make_content(make_problem("a", 1), make_problem("b", 2))
+    catalogs = CatalogCache()
+    old = build(catalogs, content)
+
+    content.index.remove("a")
+    content.load([make_problem("c", 3)])
+    catalog, body = asyncio.run(catalogs.delta("math", content, {}, old.version))
+    delta = json.loads(body)
+    assert delta["version"] == catalog.version != old.version
+    assert delta["since"] == old.version
+    assert delta["removed"] == ["a"]
+    assert [item["id"] for item in delta["added"]] == ["c"]
+
+    assert asyncio.run(catalogs.delta("math", content, {}, "unknown"))[1] is None
+
+
+def test_concurrent_requests_share_one_build(monkeypatch):
+    content = make_content(make_problem("a", 1), make_problem("b", 2))
+    catalogs = CatalogCache()
+    builds = []
+    original = CatalogCache._build
+    monkeypatch.setattr(CatalogCache, "_build", classmethod(
+        lambda cls, *args: builds.append(args) or original(*args)
+    ))
+
+    async def scenario():
+        return await asyncio.gather(*(catalogs.catalog("math", content, {}) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+    assert len(builds) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_filters_on_unknown_values_share_one_empty_catalog():
+    content = make_content(make_problem("a", 1))
+    catalogs = CatalogCache(size=2)
+    real = build(catalogs, content, {"type": "addition"})
+    junk = [build(catalogs, content, {"difficulty": value}) for value in ("3fa9", "b71c", "e0d2")]
+
+    assert all(catalog is junk[0] for catalog in junk)
+    assert json.loads(junk[0].body)["items"] == []
+    assert len(catalogs) == 2
+    assert build(catalogs, content, {"type": "addition"}) is real
+
+
+def test_generated_and_oversized_content_has_no_catalog():
+    with pytest.raises(CatalogUnavailable):
+        build(CatalogCache(), GeneratedMathContent(ResponseCache(server.MathProblem)))
+    with pytest.raises(CatalogTooLarge):
+        build(CatalogCache(max_items=1), make_content(make_problem("a", 1), make_problem("b", 2)))
+
+
+def test_etag_matching():
+    assert etag_matches('"v1"', '"v1"')
+    assert etag_matches('"v0", W/"v1"', '"v1"')
+    assert etag_matches("*", '"v1"')
+    assert not etag_matches('"v0"', '"v1"')
+    assert not etag_matches(None, '"v1"')
+
+
+def test_catalog_route_revalidates_with_etag(fresh_server, monkeypatch):
+    monkeypatch.setattr(server, "math_content", make_content(
+        make_problem("a", 1), make_problem("b", 2, type="subtraction"),
+    ))
+
+    response = asyncio.run(server.get_catalog("math", type="addition", difficulty=None, since=None, if_none_match=None))
+    body = json.loads(response.body)
+    assert [item["id"] for item in body["items"]] == ["a"]
+    assert response.headers["etag"] == f'"{body["version"]}"'
+
+    cached = asyncio.run(server.get_catalog(
+        "math", type="addition", difficulty=None, since=None, if_none_match=response.headers["etag"],
+    ))
+    assert cached.status_code == 304
+    assert not cached.body
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(server.get_catalog("history", type=None, difficulty=None, since=None, if_none_match=None))
+    assert error.value.status_code == 404
@@ -0,0 +1,119 @@
+import asyncio
+import json
+import random
+
+import numpy as np
+
+import server
+from columnar_store import ColumnarMathContent, ColumnarMathStore, compact_bank
+from math_bank import DIFFICULTY_CODES, TYPE_CODES, MathBank, generate_bank
+from response_cache import ResponseCache
+
+
+def shuffled_bank(per_combination, seed):
+    bank = generate_bank(per_combination, seed=seed)
+    order = np.random.default_rng(seed).permutation(len(bank))
+    return MathBank(*(column[order] for column in bank.columns()))
+
+
+def test_rows_are_grouped_so_filters_are_ranges():
+    store = ColumnarMathStore(shuffled_bank(50, seed=1))
+
+    view = store.lookup({"type": "division", "difficulty": "hard"})
+    assert len(view) == 50 and len(view.ranges) == 1
+    assert all(p["type"] == "division" and p["difficulty"] == "hard" for p in view)
+    assert len(store.lookup({"difficulty": "easy"})) == 200
+    assert len(store.lookup({})) == len(store) == 600
+    assert store.lookup({"question": "What is 1 plus 1?"}) is None
+
+
+def test_rows_view_indexes_across_ranges():
+    store = ColumnarMathStore(generate_bank(3, seed=2))
+    view = store.lookup({"difficulty": "medium"})
+
+    rows = [view.row(i) for i in range(len(view))]
+    assert rows == sorted(rows) and len(set(rows)) == 12
+    assert view[-1] == store.document(rows[-1])
+    assert [p["_id"] for p in view[2:4]] == [store.row_id(r) for r in rows[2:4]]
+
+
+def test_operand_columns_are_narrowed():
+    store = ColumnarMathStore(generate_bank(100, seed=3))
+    # int16 operands and answer plus two one-byte codes per problem
+    assert store.nbytes == len(store) * 8
+
+
+def test_narrowed_columns_keep_operands_at_the_type_limit():
+    # 128 / 8 = 16: int8 would hold -128 but turn 128 into it
+    codes = np.array([TYPE_CODES["division"]], dtype=np.uint8), np.array([DIFFICULTY_CODES["hard"]], dtype=np.uint8)
+    bank = compact_bank(MathBank(np.array([128]), np.array([8]), np.array([16]), *codes))
+
+    assert bank.a.dtype == np.int16
+    assert ColumnarMathStore(bank).document(0)["question"] == "What is 128 divided by 8?"
+    assert compact_bank(MathBank(np.array([127]), np.array([1]), np.array([127]), *codes)).a.dtype == np.int8
+
+
+def test_ids_only_resolve_in_their_own_bank():
+    store = ColumnarMathStore(generate_bank(10, seed=4))
+    other = ColumnarMathStore(generate_bank(10, seed=5))
+    doc_id = store.row_id(17)
+
+    assert store.get(doc_id)["_id"] == doc_id
+    assert other.get(doc_id) is None
+    assert store.tag != other.tag
+    for malformed in (f"{store.tag}-011", f"{store.tag}-", f"{store.tag}-zz", f"{store.tag}-{len(store):x}", "17"):
+        assert store.get(malformed) is None
+
+
+def test_scan_filters_on_the_answer_column():
+    store = ColumnarMathStore(generate_bank(40, seed=6))
+    found = store.find({"answer": 12, "type": "multiplication"})
+
+    assert found and all(p["answer"] == 12 and p["type"] == "multiplication" for p in found)
+    assert len(found) == int(((store.bank.answer == 12) & (store.bank.type_codes == 2)).sum())
+
+
+def test_mock_collection_reads_the_store(monkeypatch):
+    store = ColumnarMathStore(generate_bank(20, seed=7))
+    monkeypatch.setitem(server.memory_storage, "math_problems", store)
+    collection = server.MockDB("test").math_problems
+
+    sampled = asyncio.run(collection.aggregate([{"$match": {"type": "addition"}}, {"$sample": {"size": 5}}]))
+    assert len(sampled) == 5 and all(p["type"] == "addition" for p in sampled)
+    assert asyncio.run(collection.find_one({"_id": store.row_id(3)})) == store.document(3)
+    assert asyncio.run(collection.count_documents({"difficulty": "hard"})) == 80
+
+
+def test_pick_avoids_repeated_questions():
+    content = ColumnarMathContent(ResponseCache(server.MathProblem), rng=random.Random(8))
+    assert content.pick({}) == [] and not content.loaded
+    content.attach(ColumnarMathStore(generate_bank(500, seed=8)))
+
+    batch = content.pick({"type": "addition", "difficulty": "easy"}, 20)
+    assert len({p["question"] for p in batch}) == 20
+    assert content.pick({"difficulty": "impossible"}) == []
+
+
+def test_pick_avoids_questions_the_session_saw_recently():
+    content = ColumnarMathContent(ResponseCache(server.MathProblem), rng=random.Random(4))
+    content.attach(ColumnarMathStore(generate_bank(200, seed=4)))
+    match = {"type": "multiplication", "difficulty": "easy"}
+
+    questions = [content.pick(match, 1, session_id="kid")[0]["question"] for _ in range(20)]
+    assert len(set(questions)) == 20
+    # Another session is not affected by this one's history
+    assert len(content.pick(match, 5, session_id="other")) == 5
+    assert len(content.recent.seen("kid")) == 20
+
+
+def test_answers_are_graded_from_the_bank(fresh_server, monkeypatch):
+    content = ColumnarMathContent(ResponseCache(server.MathProblem))
+    content.attach(ColumnarMathStore(generate_bank(10, seed=9)))
+    monkeypatch.setattr(server, "math_content", content)
+
+    problem = content.store.document(42)
+    request = server.MathAnswerRequest(problem_id=problem["_id"], user_answer=problem["answer"], session_id="s1")
+    payload = json.loads(asyncio.run(server.submit_math_answer(request)).body)
+
+    assert payload["correct"] is True
+    assert payload["next_problem"]["id"].startswith(content.store.tag + "-")
@@ -0,0 +1,102 @@
+import asyncio
+
+from concurrency import AsyncRWLock, KeyedLock
+
+
+def test_readers_share_and_writer_excludes():
+    async def scenario():
+        lock = AsyncRWLock()
+        events = []
+
+        async def reader(name):
+            async with lock.read():
+                events.append(f"{name} in ({lock.readers} readers)")
+                await asyncio.sleep(0.01)
+
+        async def writer():
+            await asyncio.sleep(0.001)
+            async with lock.write():
+                assert lock.readers == 0
+                events.append("writer in")
+
+        await asyncio.gather(reader("r1"), reader("r2"), writer())
+        return events
+
+    events = asyncio.run(scenario())
+    assert events[:2] == ["r1 in (1 readers)", "r2 in (2 readers)"]
+    assert events[-1] == "writer in"
+
+
+def test_waiting_writer_blocks_new_readers():
+    async def scenario():
+        lock = AsyncRWLock()
+        order = []
+
+        async def first_reader():
+            async with lock.read():
+                await asyncio.sleep(0.01)
+                order.append("reader 1")
+
+        async def writer():
+            await asyncio.sleep(0.001)
+            async with lock.write():
+                order.append("writer")
+
+        async def late_reader():
+            await asyncio.sleep(0.002)
+            async with lock.read():
+                order.append("reader 2")
+
+        await asyncio.gather(first_reader(), writer(), late_reader())
+        return order
+
+    assert asyncio.run(scenario()) == ["reader 1", "writer", "reader 2"]
+
+
+def test_keyed_lock_serialises_per_key_and_cleans_up():
+    async def scenario():
+        locks = KeyedLock()
+        active = {"a": 0, "b": 0}
+        peak = {"a": 0, "b": 0}
+
+        async def worker(key):
+            async with locks.acquire(key):
+                active[key] += 1
+                peak[key] = max(peak[key], active[key])
+                await asyncio.sleep(0.001)
+                active[key] -= 1
+
+        await asyncio.gather(*(worker(key) for key in "abababab"))
+        return locks, peak
+
+    locks, peak = asyncio.run(scenario())
+    assert peak == {"a": 1, "b": 1}
+    assert len(locks) == 0
+
+
+def test_keys_are_held_inside_the_read_side_of_within():
+    async def scenario():
+        collection = AsyncRWLock()
+        locks = KeyedLock(within=collection)
+        order = []
+
+        async def session_write(key, delay):
+            await asyncio.sleep(delay)
+            # A waiting collection writer keeps even unheld keys from being free
+            assert locks.free(key) == (key != "c")
+            async with locks.acquire(key):
+                order.append(f"{key} in ({collection.readers} readers)")
+                await asyncio.sleep(0.01)
+
+        async def collection_write():
+            await asyncio.sleep(0.001)
+            async with collection.write():
+                order.append("collection")
+
+        assert locks.free("a")
+        await asyncio.gather(session_write("a", 0), session_write("b", 0), collection_write(), session_write("c", 0.002))
+        return locks, collection, order
+
+    locks, collection, order = asyncio.run(scenario())
+    assert order == ["a in (1 readers)", "b in (2 readers)", "collection", "c in (1 readers)"]
+    assert len(locks) == 0 and collection.readers == 0 and locks.free("a")
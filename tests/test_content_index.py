@@ -0,0 +1,68 @@
+import asyncio
+
+from content_index import ContentIndex
+
+
+def make_doc(doc_id, type_, difficulty):
+    return {"_id": doc_id, "type": type_, "difficulty": difficulty}
+
+
+def test_lookup_uses_type_and_difficulty_buckets():
+    index = ContentIndex()
+    index.add(make_doc("a", "addition", "easy"))
+    index.add(make_doc("b", "addition", "medium"))
+    index.add(make_doc("c", "division", "easy"))
+
+    assert len(index) == 3
+    assert {d["_id"] for d in index.lookup({})} == {"a", "b", "c"}
+    assert {d["_id"] for d in index.lookup({"type": "addition"})} == {"a", "b"}
+    assert {d["_id"] for d in index.lookup({"difficulty": "easy"})} == {"a", "c"}
+    assert [d["_id"] for d in index.lookup({"type": "addition", "difficulty": "easy"})] == ["a"]
+    assert index.lookup({"type": "addition", "difficulty": "hard"}) == []
+    assert index.lookup({"question": "x"}) is None
+
+
+def test_remove_and_readd_keep_buckets_consistent():
+    index = ContentIndex()
+    for i in range(5):
+        index.add(make_doc(str(i), "addition", "easy"))
+
+    index.remove("1")
+    index.add(make_doc("3", "subtraction", "easy"))
+
+    assert index.get("1") is None
+    assert {d["_id"] for d in index.lookup({"type": "addition"})} == {"0", "2", "4"}
+    assert [d["_id"] for d in index.lookup({"type": "subtraction"})] == ["3"]
+    assert len(index.lookup({"difficulty": "easy"})) == 4
+
+
+def test_unindexed_filter_falls_back_to_scan():
+    index = ContentIndex()
+    index.add(dict(make_doc("a", "addition", "easy"), answer=4))
+    index.add(dict(make_doc("b", "addition", "easy"), answer=5))
+
+    assert [d["_id"] for d in index.find({"answer": 5})] == ["b"]
+
+
+def test_mock_collection_reads_through_index(monkeypatch):
+    import server
+
+    monkeypatch.setitem(server.memory_storage, "math_problems", ContentIndex())
+    collection = server.MockDB("test").math_problems
+
+    async def scenario():
+        await collection.insert_many([
+            make_doc("a", "addition", "easy"),
+            make_doc("b", "division", "medium"),
+        ])
+        await collection.replace_one({"_id": "b"}, make_doc("b", "division", "easy"))
+        return (
+            await collection.find_one({"_id": "b"}),
+            await collection.aggregate([{"$match": {"difficulty": "easy"}}]),
+            await collection.count_documents({}),
+        )
+
+    found, easy, count = asyncio.run(scenario())
+    assert found["difficulty"] == "easy"
+    assert {d["_id"] for d in easy} == {"a", "b"}
+    assert count == 2
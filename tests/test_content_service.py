@@ -0,0 +1,114 @@
+import asyncio
+import json
+
+import pytest
+
+import server
+import content_service
+from columnar_store import ColumnarMathContent
+from content_service import ContentService
+from math_generator import GeneratedMathContent
+from response_cache import ResponseCache
+
+
+def problem(doc_id, type_="addition", difficulty="easy", answer=4):
+    return {
+        "_id": doc_id,
+        "question": f"Question {doc_id}",
+        "display": f"Display {doc_id}",
+        "answer": answer,
+        "type": type_,
+        "difficulty": difficulty,
+    }
+
+
+def test_next_item_returns_matching_document_and_cached_body():
+    service = ContentService(ResponseCache(server.MathProblem))
+    service.load([problem("a"), problem("b", difficulty="medium")])
+
+    document, body = service.next_item({"type": "addition", "difficulty": "medium"})
+    assert document["_id"] == "b"
+    assert json.loads(body)["id"] == "b"
+    assert service.next_item({"type": "division"}) is None
+
+
+@pytest.fixture
+def loaded_math(fresh_server, monkeypatch):
+    service = ContentService(ResponseCache(server.MathProblem))
+    service.load([problem("a"), problem("b")])
+    monkeypatch.setattr(server, "math_content", service)
+    return service
+
+
+def test_submit_answer_uses_loaded_content_without_storage_reads(loaded_math, monkeypatch):
+    async def no_storage_reads(query):
+        raise AssertionError("content should come from the service")
+
+    monkeypatch.setattr(server.db.math_problems, "find_one", no_storage_reads)
+    request = server.MathAnswerRequest(problem_id="a", user_answer=4, session_id="s1")
+    response = asyncio.run(server.submit_math_answer(request))
+
+    payload = json.loads(response.body)
+    assert payload["correct"] is True
+    assert payload["feedback"].startswith("Excellent! 4 is correct!")
+    assert payload["next_problem"]["id"] in {"a", "b"}
+    assert server.memory_storage["session_progress"]["s1"]["math_score"] == 1
+
+
+def test_submit_answer_falls_back_to_storage_for_unloaded_items(loaded_math):
+    async def scenario():
+        await server.db.math_problems.insert_one(problem("late", answer=9))
+        request = server.MathAnswerRequest(problem_id="late", user_answer=1, session_id="s1")
+        return await server.submit_math_answer(request)
+
+    payload = json.loads(asyncio.run(scenario()).body)
+    assert payload["correct"] is False
+    assert payload["next_problem"]["type"] == "addition"
+
+
+def test_empty_filters_are_cached_until_content_changes(monkeypatch):
+    service = ContentService(ResponseCache(server.MathProblem))
+    service.load([problem("a"), problem("s", type_="subtraction", difficulty="hard")])
+    samples = []
+    sample = service.sampler.sample
+    monkeypatch.setattr(service.sampler, "sample", lambda *args: samples.append(args) or sample(*args))
+
+    miss = {"type": "addition", "difficulty": "hard"}
+    assert service.pick(miss) == []
+    assert service.pick(miss) == []
+    assert len(samples) == 1
+
+    service.load([problem("h", difficulty="hard")])
+    assert [p["_id"] for p in service.pick(miss)] == ["h"]
+
+
+def test_only_known_values_are_cached_as_empty_and_the_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(content_service, "EMPTY_FILTERS_MAX", 1)
+    service = ContentService(ResponseCache(server.MathProblem))
+    service.load([
+        problem("a", difficulty="hard"), problem("s", type_="subtraction"),
+        problem("m", type_="multiplication", difficulty="medium"),
+    ])
+
+    # Values that never occur miss in O(1) and are not remembered
+    for value in ("3fa9", "b71c", "e0d2"):
+        assert service.pick({"difficulty": value}) == []
+        assert service.pick({"question": value}) == []
+    assert not service.empty_filters
+
+    assert service.pick({"type": "addition", "difficulty": "easy"}) == []
+    assert service.pick({"type": "subtraction", "difficulty": "hard"}) == []
+    assert list(service.empty_filters) == [frozenset({"type": "subtraction", "difficulty": "hard"}.items())]
+
+def test_math_content_services_agree_on_known_values():
+    service = ContentService(ResponseCache(server.MathProblem))
+    service.load([problem(f"{t}-{d}", type_=t, difficulty=d)
+                  for t in ("addition", "subtraction", "multiplication", "division")
+                  for d in ("easy", "medium", "hard")])
+    generated = GeneratedMathContent(ResponseCache(server.MathProblem))
+    columnar = ColumnarMathContent(ResponseCache(server.MathProblem))
+
+    for match in ({}, {"type": "division"}, {"type": "division", "difficulty": "hard"},
+                  {"type": "fractions"}, {"difficulty": "extreme"}, {"answer": 4}):
+        expected = service.known_values(match)
+        assert generated.known_values(match) == columnar.known_values(match) == expected, match
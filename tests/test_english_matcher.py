@@ -0,0 +1,139 @@
+import asyncio
+import json
+import random
+import re
+import string
+
+import pytest
+
+import server
+from content_service import ContentService
+from english_matcher import AnswerMatcher, AnswerMatchers, normalize, spelled_pattern, trie_pattern, within_distance
+from response_cache import ResponseCache
+
+SPELL_CAT = ["cat", "c a t", "c-a-t"]
+
+
+def test_normalize_folds_case_accents_punctuation_and_contractions():
+    assert normalize("  Café, CAT!  ") == ["cafe", "cat"]
+    assert normalize("I'm happy, she’s tall") == ["i", "am", "happy", "she", "is", "tall"]
+    assert normalize("they're") == ["they", "are"]
+
+
+@pytest.mark.parametrize("spoken", [
+    "a p p l e", "ay double pee el ee", "eh pea pee ell e", "A-P-P-L-E",
+])
+def test_spelled_words(spoken):
+    assert re.fullmatch(spelled_pattern("apple"), " ".join(normalize(spoken)))
+
+
+@pytest.mark.parametrize("transcript, expected", [
+    ("cat", True),
+    ("see a tee", True),
+    ("C - A - T", True),
+    ("I think it is c a t", True),
+    ("sea eh tea", True),
+    ("a c a t", False),
+    ("c a p", False),
+    ("c a t s", False),
+    ("cap", False),
+    ("catalogue", False),
+])
+def test_spelling(transcript, expected):
+    assert AnswerMatcher(SPELL_CAT).matches(transcript) is expected
+
+
+def test_whole_tokens_only():
+    matcher = AnswerMatcher(["is"])
+    assert matcher.matches("She is my friend")
+    assert not matcher.matches("this")
+    assert matcher.matches("she's my friend")
+
+
+@pytest.mark.parametrize("question, answer, transcript", [
+    ("I ___ a student", "am", "I'm not sure"),
+    ("She ___ my friend", "is", "that's too hard"),
+    ("We ___ happy", "are", "you're silly"),
+])
+def test_grammar_blanks_are_not_answered_by_contractions(question, answer, transcript):
+    exercise = {"_id": question, "type": "grammar", "question": question, "accepted_answers": [answer]}
+    assert not AnswerMatchers().matcher_for(exercise).matches(transcript)
+    assert AnswerMatchers().matcher_for(exercise).matches(question.replace("___", answer))
+
+
+def test_multi_token_answers():
+    matcher = AnswerMatcher(["ice cream"])
+    assert matcher.matches("I think it is ice cream")
+    assert not matcher.matches("ice is cream")
+
+
+def test_fuzzy_words_only_when_enabled_and_long_enough():
+    assert AnswerMatcher(["elephant"], fuzzy=True).matches("an elephent")
+    assert AnswerMatcher(["elephant"], fuzzy=True).matches("elephants")
+    assert not AnswerMatcher(["elephant"]).matches("an elephent")
+    assert not AnswerMatcher(["sun"], fuzzy=True).matches("son")
+    assert not AnswerMatcher(["banana"], fuzzy=True).matches("cabana")
+
+
+def test_fuzzy_words_reject_other_real_words():
+    assert not AnswerMatcher(["elephant"], fuzzy=True).matches("elegant")
+    assert not AnswerMatcher(["mountain"], fuzzy=True).matches("fountain")
+    assert not AnswerMatcher(["banana"], fuzzy=True).matches("bandana")
+    assert not AnswerMatcher(["elephant"], fuzzy=True).matches("an elefunt")
+    assert AnswerMatcher(["mountain"], fuzzy=True).matches("a mountin")
+
+
+def test_within_distance_agrees_with_full_levenshtein():
+    def levenshtein(a, b):
+        row = list(range(len(b) + 1))
+        for i, x in enumerate(a, 1):
+            previous, row[0] = row[0], i
+            for j, y in enumerate(b, 1):
+                previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, previous + (x != y))
+        return row[-1]
+
+    rng = random.Random(3)
+    for _ in range(2000):
+        a = "".join(rng.choices("abc", k=rng.randint(0, 7)))
+        b = "".join(rng.choices("abc", k=rng.randint(0, 7)))
+        for k in range(3):
+            assert within_distance(a, b, k) is (levenshtein(a, b) <= k), (a, b, k)
+
+
+def test_trie_pattern_matches_exactly_the_phrases():
+    rng = random.Random(4)
+    for _ in range(200):
+        phrases = {tuple(rng.choices(string.ascii_lowercase[:3], k=rng.randint(1, 3))) for _ in range(5)}
+        pattern = re.compile(trie_pattern(phrases))
+        for _ in range(20):
+            tokens = tuple(rng.choices(string.ascii_lowercase[:4], k=rng.randint(1, 3)))
+            assert bool(pattern.fullmatch(" ".join(tokens))) is (tokens in phrases)
+
+
+def test_every_generated_exercise_accepts_its_answers():
+    matchers = AnswerMatchers()
+    for exercise in server.generate_english_exercises():
+        document = dict(exercise.dict(), _id=exercise.id)
+        for accepted in exercise.accepted_answers:
+            assert matchers.matcher_for(document).matches(f"um I think {accepted}")
+    assert len(matchers) == len(server.generate_english_exercises())
+
+
+def test_answer_route_uses_matcher(monkeypatch):
+    content = ContentService(ResponseCache(server.EnglishExercise))
+    exercise = {
+        "_id": "e1", "type": "spelling", "question": "q", "display": "d",
+        "accepted_answers": SPELL_CAT, "correct_answer": "C-A-T", "difficulty": "easy",
+    }
+    content.load([exercise])
+    monkeypatch.setattr(server, "english_content", content)
+    monkeypatch.setattr(server, "english_matchers", AnswerMatchers())
+    monkeypatch.setitem(server.memory_storage, "session_progress", {})
+    monkeypatch.setattr(server, "db", server.MockDB("test"))
+
+    def answer(text):
+        request = server.EnglishAnswerRequest(exercise_id="e1", user_answer=text, session_id="s1")
+        return json.loads(asyncio.run(server.submit_english_answer(request)).body)["correct"]
+
+    assert answer("see a tee")
+    assert not answer("concatenate")
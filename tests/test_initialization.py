@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import server
+
+
+def test_concurrent_initialization_inserts_content_once(fresh_server):
+    async def scenario():
+        await asyncio.gather(*(server.initialize_data() for _ in range(10)))
+        return await server.db.math_problems.count_documents({})
+
+    count = asyncio.run(scenario())
+    assert count == len(server.generate_math_problems()) == len(server.math_content)
+    assert len(server.english_content) == len(server.generate_english_exercises())
+
+
+def test_concurrent_first_requests_share_one_initialization(fresh_server, monkeypatch):
+    runs = []
+    populate = server.populate_content
+
+    async def counted():
+        runs.append(1)
+        await asyncio.sleep(0)
+        await populate()
+
+    monkeypatch.setattr(server, "populate_content", counted)
+
+    async def scenario():
+        await asyncio.gather(*(server.get_math_problem(type=None, difficulty=None) for _ in range(20)))
+
+    asyncio.run(scenario())
+    assert runs == [1]
+
+
+def test_unmatched_filter_is_a_404_without_reinitializing(fresh_server, monkeypatch):
+    asyncio.run(server.initialize_data())
+
+    async def fail():
+        raise AssertionError("content is already loaded")
+
+    monkeypatch.setattr(server, "populate_content", fail)
+    for _ in range(3):
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(server.get_math_problem(type="addition", difficulty="hard"))
+        assert error.value.status_code == 404
+    # No generated problem is hard, so the miss is an O(1) bucket lookup
+    # and is not remembered
+    assert not server.math_content.empty_filters
@@ -0,0 +1,101 @@
+import asyncio
+import json
+
+import server
+from item_stats import ItemStats, question_key, summarize
+
+
+def problem(doc_id, type="division", difficulty="hard"):
+    return {"_id": doc_id, "type": type, "difficulty": difficulty}
+
+
+def test_counters_and_latency_per_item():
+    stats = ItemStats()
+    stats.served("s1", "p1", now=10.0)
+    assert stats.record(problem("p1"), True, "s1", now=12.5) == 2.5
+    # Served to another session, or never served: counted without a latency
+    stats.served("s2", "p2", now=10.0)
+    assert stats.record(problem("p1"), False, "s2", now=11.0) is None
+    assert stats.record(problem("p1"), False) is None
+
+    slot = stats.slots["p1"]
+    assert (stats.attempts[slot], stats.correct[slot], stats.timed[slot]) == (3, 1, 1)
+    assert stats.latency_total[slot] == 2.5
+    assert len(stats) == 1
+
+
+def test_summary_groups_by_type_and_difficulty_and_ranks_hardest():
+    stats = ItemStats()
+    for _ in range(5):
+        stats.record(problem("hard-one"), False)
+        stats.record(problem("easy-one", "addition", "easy"), True)
+    for correct in (True, True, False, True, False):
+        stats.record(problem("medium-one"), correct)
+    stats.record(problem("rare"), False)
+
+    summary = summarize(stats.snapshot(), top=2, min_attempts=5)
+    assert (summary["items"], summary["attempts"], summary["correct"]) == (4, 16, 8)
+    assert summary["by_type_difficulty"] == [
+        {"type": "addition", "difficulty": "easy", "items": 1, "attempts": 5, "correct": 5,
+         "accuracy": 1.0, "mean_latency_ms": None},
+        {"type": "division", "difficulty": "hard", "items": 3, "attempts": 11, "correct": 3,
+         "accuracy": 0.2727, "mean_latency_ms": None},
+    ]
+    assert [item["id"] for item in summary["hardest"]] == ["hard-one", "medium-one"]
+
+
+def test_items_beyond_capacity_are_counted_as_untracked():
+    stats = ItemStats(max_items=1)
+    stats.record(problem("p1"), True)
+    stats.record(problem("p2"), True)
+    stats.served("s1", "p3", now=1.0)
+    assert stats.record(problem("p3", "addition", "easy"), False, "s1", now=3.0) == 2.0
+    assert len(stats) == 1
+    assert stats.untracked == 2
+
+    # Their answers still count towards the totals and their groups
+    summary = summarize(stats.snapshot())
+    assert (summary["items"], summary["attempts"], summary["correct"]) == (1, 3, 2)
+    assert summary["by_type_difficulty"] == [
+        {"type": "addition", "difficulty": "easy", "items": 0, "attempts": 1, "correct": 0,
+         "accuracy": 0.0, "mean_latency_ms": 2000.0},
+        {"type": "division", "difficulty": "hard", "items": 1, "attempts": 2, "correct": 2,
+         "accuracy": 1.0, "mean_latency_ms": None},
+    ]
+
+
+def test_generated_problems_share_a_slot_per_question():
+    stats = ItemStats(key=question_key)
+    for seed in range(5):
+        stats.record(dict(problem(f"gen:division:hard:{seed}"), question="What is 144 divided by 12?"), False)
+    stats.record(dict(problem("gen:division:medium:9", difficulty="medium"), question="What is 144 divided by 12?"), True)
+
+    assert len(stats) == 2
+    summary = summarize(stats.snapshot(), min_attempts=5)
+    # Listed under the first id answered, which rebuilds the same question
+    assert [(item["id"], item["attempts"]) for item in summary["hardest"]] == [("gen:division:hard:0", 5)]
+
+
+def test_answer_route_records_stats(fresh_server):
+    async def scenario():
+        await server.initialize_data()
+        first = json.loads((await server.get_math_problem(type="division", difficulty="easy")).body)
+        response = await server.submit_math_answer(server.MathAnswerRequest(
+            problem_id=first["id"], user_answer=first["answer"], session_id="stats-session",
+        ))
+        second = json.loads(response.body)["next_problem"]
+        await server.submit_math_answer(server.MathAnswerRequest(
+            problem_id=second["id"], user_answer=second["answer"] + 1, session_id="stats-session",
+        ))
+        return second["id"], await server.get_item_stats(kind="math", top=5, min_attempts=1)
+
+    missed, stats = asyncio.run(scenario())
+    summary = stats["math"]
+    assert (summary["attempts"], summary["correct"]) == (2, 1)
+    division = [g for g in summary["by_type_difficulty"] if g["type"] == "division"]
+    assert division[0]["difficulty"] == "easy"
+    # The second problem was served with the first answer, so its latency is known
+    assert summary["mean_latency_ms"] is not None
+    # The next problem can be the first one again, so rank by id, not counts
+    assert summary["hardest"][0]["id"] == missed
+    assert summary["hardest"][0]["question"]
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from math_bank import DIFFICULTY_CODES, TYPE_CODES, MathBank, generate_bank
+from math_generator import DIFFICULTIES, MATH_TYPES, OPERAND_RANGES
+
+
+def test_bank_has_every_type_and_difficulty_including_hard():
+    bank = generate_bank(100, seed=1)
+
+    assert len(bank) == 100 * len(MATH_TYPES) * len(DIFFICULTIES)
+    pairs = set(zip(bank.type_codes.tolist(), bank.difficulty_codes.tolist()))
+    assert len(pairs) == len(MATH_TYPES) * len(DIFFICULTIES)
+    assert (bank.difficulty_codes == DIFFICULTY_CODES["hard"]).sum() == 400
+
+
+@pytest.mark.parametrize("type_", MATH_TYPES)
+def test_answers_satisfy_constraints(type_):
+    bank = generate_bank(5000, types=[type_], seed=2)
+
+    assert (bank.answer >= 0).all()
+    if type_ == "addition":
+        assert (bank.a + bank.b == bank.answer).all()
+    elif type_ == "subtraction":
+        assert (bank.a - bank.b == bank.answer).all()
+    elif type_ == "multiplication":
+        assert (bank.a * bank.b == bank.answer).all()
+    else:
+        assert (bank.b > 0).all()
+        assert (bank.a % bank.b == 0).all()
+        assert (bank.a // bank.b == bank.answer).all()
+
+
+def test_operands_stay_in_configured_ranges():
+    bank = generate_bank(2000, types=["addition", "multiplication"], seed=3)
+    for (type_, difficulty), ((a_low, a_high), (b_low, b_high)) in OPERAND_RANGES.items():
+        if type_ not in ("addition", "multiplication"):
+            continue
+        rows = (bank.type_codes == TYPE_CODES[type_]) & (bank.difficulty_codes == DIFFICULTY_CODES[difficulty])
+        assert a_low <= bank.a[rows].min() and bank.a[rows].max() <= a_high
+        assert b_low <= bank.b[rows].min() and bank.b[rows].max() <= b_high
+
+
+def test_seeded_generation_is_reproducible_and_compact():
+    first, second = generate_bank(50, seed=9), generate_bank(50, seed=9)
+    assert all(np.array_equal(x, y) for x, y in zip(first.columns(), second.columns()))
+    # Three int32 columns and two uint8 codes per problem
+    assert first.nbytes == len(first) * 14
+
+
+def test_rows_render_as_documents():
+    bank = generate_bank(1, types=["division"], difficulties=["easy"], seed=4)
+    document = bank.document(0, "row-0")
+
+    a, b = int(bank.a[0]), int(bank.b[0])
+    assert document == {
+        "_id": "row-0",
+        "question": f"What is {a} divided by {b}?",
+        "display": f"{a} ÷ {b} = ?",
+        "answer": a // b,
+        "type": "division",
+        "difficulty": "easy",
+    }
+    assert len(MathBank.concatenate([])) == 0
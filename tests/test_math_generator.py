@@ -0,0 +1,90 @@
+import asyncio
+import json
+import random
+
+import pytest
+
+import server
+from content_service import RecentItems
+from math_generator import (
+    DIFFICULTIES,
+    MATH_TYPES,
+    GeneratedMathContent,
+    generate_problem,
+    operands,
+    parse_problem_id,
+    problem_id,
+)
+from response_cache import ResponseCache
+
+
+def test_problem_is_rebuilt_identically_from_its_id():
+    problem = generate_problem("multiplication", "medium", 0x5F3A9C)
+    assert problem["_id"] == "gen:multiplication:medium:5f3a9c"
+    assert parse_problem_id(problem["_id"]) == ("multiplication", "medium", 0x5F3A9C)
+    assert generate_problem(*parse_problem_id(problem["_id"])) == problem
+
+
+@pytest.mark.parametrize("type_", MATH_TYPES)
+@pytest.mark.parametrize("difficulty", DIFFICULTIES)
+def test_operands_respect_constraints(type_, difficulty):
+    rng = random.Random(f"{type_}-{difficulty}")
+    for _ in range(500):
+        a, b, answer = operands(type_, difficulty, rng.getrandbits(48))
+        assert answer >= 0
+        if type_ == "subtraction":
+            assert a - b == answer
+        if type_ == "division":
+            assert b > 0 and a == b * answer
+
+
+@pytest.mark.parametrize("doc_id", [
+    "a1b2c3",
+    "gen:addition:easy",
+    "gen:addition:impossible:10",
+    "gen:modulo:easy:10",
+    "gen:addition:easy:xyz",
+    "gen:addition:easy:0x1f",
+    "gen:addition:easy:01f",
+    "gen:addition:easy:" + "f" * 20,
+])
+def test_malformed_ids_are_rejected(doc_id):
+    assert parse_problem_id(doc_id) is None
+
+
+def test_pick_honours_filters_and_avoids_repeated_questions():
+    content = GeneratedMathContent(ResponseCache(server.MathProblem), rng=random.Random(2))
+    batch = content.pick({"type": "addition", "difficulty": "easy"}, 20)
+
+    assert len({p["question"] for p in batch}) == 20
+    assert all(p["type"] == "addition" and p["difficulty"] == "easy" for p in batch)
+    assert content.pick({"difficulty": "impossible"}) == []
+    assert content.get(problem_id("division", "hard", 7)) == generate_problem("division", "hard", 7)
+
+
+def test_pick_avoids_questions_the_session_saw_recently():
+    content = GeneratedMathContent(ResponseCache(server.MathProblem), rng=random.Random(3))
+    match = {"type": "multiplication", "difficulty": "easy"}
+    questions = [content.pick(match, 1, session_id="kid")[0]["question"] for _ in range(20)]
+    assert len(set(questions)) == 20
+
+    # Once the session has seen every question, repeats are served
+    content.recent = RecentItems(per_session=100)
+    assert all(len(content.pick(match, 1, session_id="kid")) == 1 for _ in range(60))
+    assert len(content.recent.seen("kid")) == 50
+
+
+def test_answers_are_graded_without_storage(fresh_server, monkeypatch):
+    content = GeneratedMathContent(ResponseCache(server.MathProblem))
+    monkeypatch.setattr(server, "math_content", content)
+
+    async def no_storage_reads(query):
+        raise AssertionError("generated problems are never stored")
+
+    monkeypatch.setattr(server.db.math_problems, "find_one", no_storage_reads)
+    problem = generate_problem("subtraction", "hard", 1234)
+    request = server.MathAnswerRequest(problem_id=problem["_id"], user_answer=problem["answer"], session_id="s1")
+    payload = json.loads(asyncio.run(server.submit_math_answer(request)).body)
+
+    assert payload["correct"] is True
+    assert payload["next_problem"]["id"].startswith("gen:subtraction:hard:")
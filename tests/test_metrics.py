@@ -0,0 +1,103 @@
+import asyncio
+
+import httpx
+
+import metrics
+import server
+from concurrency import AsyncRWLock, KeyedLock
+from content_index import ContentIndex
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram("test_seconds", "Test histogram", ("route",), buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value, '/a"b')
+
+    lines = histogram.render()
+    assert lines[:2] == ["# HELP test_seconds Test histogram", "# TYPE test_seconds histogram"]
+    assert lines[2:] == [
+        'test_seconds_bucket{route="/a\\"b",le="0.1"} 2',
+        'test_seconds_bucket{route="/a\\"b",le="1"} 3',
+        'test_seconds_bucket{route="/a\\"b",le="+Inf"} 4',
+        'test_seconds_sum{route="/a\\"b"} 3.65',
+        'test_seconds_count{route="/a\\"b"} 4',
+    ]
+
+
+def test_labels_must_match_label_names():
+    gauge = metrics.Gauge("test_items", "Test gauge", ("kind",))
+    gauge.set(3, "math")
+    assert gauge.render()[-1] == 'test_items{kind="math"} 3'
+    try:
+        gauge.set(1)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("missing label accepted")
+
+
+def test_locks_report_wait_and_hold_times_of_acquisitions_that_waited():
+    observed = []
+
+    async def scenario():
+        lock = AsyncRWLock(lambda *args: observed.append(args))
+        keyed = KeyedLock(lambda *args: observed.append(args))
+
+        async def contend(first, second):
+            entered = asyncio.Event()
+
+            async def hold(acquire, after=None):
+                if after is not None:
+                    await after.wait()
+                async with acquire():
+                    entered.set()
+                    await asyncio.sleep(0.02)
+
+            await asyncio.gather(hold(first), hold(second, entered))
+
+        # Each first acquisition enters at once and is not reported
+        await contend(lock.write, lock.write)
+        await contend(lock.write, lock.read)
+        await contend(lambda: keyed.acquire("s1"), lambda: keyed.acquire("s1"))
+
+    asyncio.run(scenario())
+    assert [mode for mode, _, _ in observed] == ["write", "read", "key"]
+    for mode, waited, held in observed:
+        assert waited > 0 and held >= 0.015, mode
+
+
+def test_collection_queries_record_scan_lengths(monkeypatch):
+    index = ContentIndex()
+    for position in range(6):
+        index.add({"_id": str(position), "type": "addition" if position % 2 else "subtraction", "answer": position})
+    monkeypatch.setattr(server, "memory_storage", {"math_problems": index})
+    metrics.scan_length.clear()
+    collection = server.MockCollection("math_problems")
+
+    asyncio.run(collection.aggregate([{"$match": {"type": "addition"}}, {"$sample": {"size": 1}}]))
+    asyncio.run(collection.find_one({"answer": 4}))
+
+    assert metrics.scan_length.labels("math_problems", "index").sum == 3
+    assert metrics.scan_length.labels("math_problems", "scan").sum == 6
+
+
+def test_metrics_endpoint_reports_routes_sessions_and_content(fresh_server):
+    metrics.REGISTRY.clear()
+
+    async def scenario():
+        await server.initialize_data()
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.get("/api/progress/metrics-session")
+            await client.get("/api/no-such-route")
+            return await client.get("/api/metrics")
+
+    response = asyncio.run(scenario())
+    assert response.headers["content-type"] == metrics.CONTENT_TYPE
+    text = response.text
+    assert ('eduassist_request_duration_seconds_count'
+            '{method="GET",route="/api/progress/{session_id}",status="200"} 1') in text
+    assert 'route="unmatched",status="404"' in text
+    assert "eduassist_sessions 1" in text
+    assert f'eduassist_content_items{{kind="math"}} {len(server.math_content)}' in text
+    assert "# TYPE eduassist_lock_wait_seconds histogram" in text
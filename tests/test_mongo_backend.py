@@ -0,0 +1,53 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("mongomock_motor")
+
+import server  # noqa: E402
+from mongo_backend import MongoDB, connect  # noqa: E402
+
+
+@pytest.fixture
+def mongo_db(monkeypatch):
+    database = connect("mongomock://", "eduassist_test")
+    monkeypatch.setattr(server, "db", database)
+    return database
+
+
+def test_create_database_selects_mongo_from_environment(monkeypatch):
+    monkeypatch.setenv("STORAGE_BACKEND", "mongo")
+    monkeypatch.setenv("MONGO_URL", "mongomock://")
+    assert isinstance(server.create_database(), MongoDB)
+
+    monkeypatch.setenv("STORAGE_BACKEND", "memory")
+    assert isinstance(server.create_database(), server.MockDB)
+
+
+def test_content_and_progress_round_trip_through_mongo(mongo_db):
+    async def scenario():
+        await server.ensure_indexes()
+        await server.initialize_data()
+        problem = json.loads((await server.get_math_problem(type="addition", difficulty="easy")).body)
+        await server.update_session_progress("s1", "math", True)
+        await server.update_session_progress("s1", "math", True)
+        progress = await server.get_progress("s1")
+        indexes = await mongo_db.session_progress.collection.index_information()
+        return problem, progress, indexes
+
+    problem, progress, indexes = asyncio.run(scenario())
+    assert problem["type"] == "addition" and problem["difficulty"] == "easy"
+    assert progress.math_score == 2 and progress.problems_solved == 2
+    assert indexes["session_id_1"]["unique"]
+    assert indexes["expires_at_1"]["expireAfterSeconds"] == 0
+
+
+def test_pipelines_can_be_reused(mongo_db):
+    async def scenario():
+        await mongo_db.math_problems.insert_many([{"_id": "a", "type": "addition", "difficulty": "easy"}])
+        pipeline = [{"$match": {"type": "addition"}}, {"$sample": {"size": 1}}]
+        return await mongo_db.math_problems.aggregate(pipeline), await mongo_db.math_problems.aggregate(pipeline)
+
+    first, second = asyncio.run(scenario())
+    assert first == second == [{"_id": "a", "type": "addition", "difficulty": "easy"}]
@@ -0,0 +1,56 @@
+import asyncio
+import json
+import random
+
+import server
+from content_service import ContentService, RecentItems
+from response_cache import ResponseCache
+
+
+def make_service(count):
+    service = ContentService(ResponseCache(server.MathProblem))
+    service.load([
+        {"_id": str(i), "question": "q", "display": "d", "answer": i, "type": "addition", "difficulty": "easy"}
+        for i in range(count)
+    ])
+    service.sampler.rng = random.Random(11)
+    return service
+
+
+def test_recent_items_are_bounded_per_session_and_overall():
+    recent = RecentItems(per_session=3, max_sessions=2)
+    recent.record("a", ["1", "2", "3", "4"])
+    assert list(recent.seen("a")) == ["2", "3", "4"]
+
+    recent.record("b", ["x"])
+    recent.record("c", ["y"])
+    assert len(recent) == 2
+    assert list(recent.seen("a")) == []
+
+
+def test_pick_avoids_items_the_session_saw_recently():
+    service = make_service(40)
+    first = {d["_id"] for d in service.pick({"type": "addition"}, 10, "s1")}
+    second = {d["_id"] for d in service.pick({"type": "addition"}, 10, "s1")}
+
+    assert len(first) == len(second) == 10
+    assert not first & second
+    # Another session is not affected by s1's history
+    assert len(service.pick({"type": "addition"}, 10, "s2")) == 10
+
+
+def test_pick_tops_up_with_seen_items_when_bucket_is_small():
+    service = make_service(6)
+    service.pick({}, 4, "s1")
+    batch = service.pick({}, 5, "s1")
+
+    assert len({d["_id"] for d in batch}) == 5
+
+
+def test_batch_route_returns_json_array_of_distinct_items(fresh_server, monkeypatch):
+    service = make_service(20)
+    monkeypatch.setattr(server, "math_content", service)
+
+    response = asyncio.run(server.get_math_problem_batch(type="addition", difficulty="easy", count=7, session_id="s"))
+    items = json.loads(response.body)
+    assert len({item["id"] for item in items}) == 7
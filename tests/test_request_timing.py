@@ -0,0 +1,60 @@
+import asyncio
+import pstats
+
+import httpx
+from fastapi import FastAPI
+
+import server
+from profiling import SampledProfilerMiddleware
+from request_timing import ServerTimingMiddleware, header_value, span
+
+
+def test_span_outside_a_request_is_a_no_op():
+    with span("lookup") as timed:
+        pass
+    assert not hasattr(timed, "name")
+
+
+def test_header_value_formats_milliseconds():
+    assert header_value([("lookup", 0.0012), ("total", 0.5)]) == "lookup;dur=1.200, total;dur=500.000"
+
+
+def test_math_answer_reports_server_timing(fresh_server):
+    async def scenario():
+        await server.initialize_data()
+        app = FastAPI()
+        app.include_router(server.api_router)
+        app.add_middleware(ServerTimingMiddleware)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            problem = (await client.get("/api/math/problems")).json()
+            return await client.post("/api/math/answer", json={
+                "problem_id": problem["id"], "user_answer": problem["answer"], "session_id": "timed",
+            })
+
+    response = asyncio.run(scenario())
+    assert response.json()["correct"] is True
+    names = [entry.split(";")[0] for entry in response.headers["server-timing"].split(", ")]
+    assert names == ["lookup", "progress", "next", "serialize", "total"]
+
+
+def test_profiler_samples_every_nth_and_token_requests(tmp_path):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    profiler = SampledProfilerMiddleware(app, tmp_path, every=3, token="secret")
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=profiler)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            for _ in range(6):
+                await client.get("/api/math/problems")
+            await client.get("/api/", headers={"X-Profile": "secret"})
+            await client.get("/api/", headers={"X-Profile": "wrong"})
+
+    asyncio.run(scenario())
+    profiles = sorted(tmp_path.glob("*.prof"))
+    assert profiler.written == len(profiles) == 3
+    assert sum("api_math_problems" in path.name for path in profiles) == 2
+    assert pstats.Stats(str(profiles[0])).total_calls > 0
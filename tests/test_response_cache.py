@@ -0,0 +1,45 @@
+import json
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+
+from response_cache import ResponseCache
+from server import EnglishExercise, MathProblem
+
+PROBLEM = {
+    "_id": "p1",
+    "question": "What is 3 times 4?",
+    "display": "3 × 4 = ?",
+    "answer": 12,
+    "type": "multiplication",
+    "difficulty": "easy",
+    "created_at": datetime(2026, 1, 2, 3, 4, 5, 678),
+}
+
+
+def test_body_matches_response_model_serialization():
+    cache = ResponseCache(MathProblem)
+    cache.add_many([PROBLEM])
+
+    expected = jsonable_encoder(MathProblem(**{**PROBLEM, "id": "p1"}))
+    assert json.loads(cache.get("p1")) == expected
+    assert "×".encode() in cache.get("p1")
+
+
+def test_body_for_renders_once_and_leaves_document_untouched():
+    cache = ResponseCache(EnglishExercise)
+    document = {
+        "_id": "e1",
+        "type": "spelling",
+        "question": "How do you spell the word CAT?",
+        "display": "🐱 CAT",
+        "accepted_answers": ["cat"],
+        "correct_answer": "The correct spelling is C-A-T",
+        "difficulty": "easy",
+    }
+
+    first = cache.body_for(document)
+    assert cache.body_for(document) is first
+    assert "id" not in document
+    assert json.loads(first)["id"] == "e1"
+    assert len(cache) == 1
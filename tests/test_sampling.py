@@ -0,0 +1,57 @@
+import asyncio
+import random
+from collections import Counter
+
+from content_index import ContentIndex
+from sampling import BucketSampler, sample_positions
+
+
+def test_sample_without_replacement_is_distinct_and_capped():
+    rng = random.Random(7)
+    positions = sample_positions(10, 6, rng=rng)
+    assert len(positions) == 6
+    assert len(set(positions)) == 6
+    assert all(0 <= p < 10 for p in positions)
+
+    assert sorted(sample_positions(4, 10, rng=rng)) == [0, 1, 2, 3]
+    assert sample_positions(0, 3, rng=rng) == []
+
+
+def test_sample_with_replacement_returns_requested_size():
+    positions = sample_positions(2, 50, replace=True, rng=random.Random(1))
+    assert len(positions) == 50
+    assert set(positions) == {0, 1}
+
+
+def test_sample_without_replacement_is_roughly_uniform():
+    rng = random.Random(3)
+    counts = Counter()
+    for _ in range(4000):
+        counts.update(sample_positions(8, 3, rng=rng))
+    # Each position is expected 4000 * 3 / 8 = 1500 times
+    assert all(1300 < counts[p] < 1700 for p in range(8))
+
+
+def test_bucket_sampler_only_draws_from_matching_bucket():
+    index = ContentIndex()
+    for i in range(20):
+        index.add({"_id": str(i), "type": "addition" if i % 2 else "division", "difficulty": "easy"})
+    sampler = BucketSampler(index, rng=random.Random(5))
+
+    batch = sampler.sample({"type": "addition"}, size=5)
+    assert len({d["_id"] for d in batch}) == 5
+    assert all(d["type"] == "addition" for d in batch)
+    assert sampler.sample({"type": "addition", "difficulty": "hard"}, size=3) == []
+
+
+def test_aggregate_honors_sample_size(monkeypatch):
+    import server
+
+    index = ContentIndex()
+    for i in range(12):
+        index.add({"_id": str(i), "type": "addition", "difficulty": "easy"})
+    monkeypatch.setitem(server.memory_storage, "math_problems", index)
+    collection = server.MockDB("test").math_problems
+
+    batch = asyncio.run(collection.aggregate([{"$match": {"type": "addition"}}, {"$sample": {"size": 4}}]))
+    assert len({d["_id"] for d in batch}) == 4
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+import server
+
+
+@pytest.fixture
+def fresh_db(monkeypatch):
+    monkeypatch.setitem(server.memory_storage, "session_progress", {})
+    monkeypatch.setattr(server, "db", server.MockDB("test"))
+    return server.db
+
+
+def test_concurrent_answers_do_not_lose_increments(fresh_db):
+    async def scenario():
+        await asyncio.gather(*(
+            server.update_session_progress("s1", "math", True) for _ in range(50)
+        ))
+        return await fresh_db.session_progress.find_one({"session_id": "s1"})
+
+    progress = asyncio.run(scenario())
+    assert progress["math_score"] == 50
+    assert progress["math_streak"] == 50
+    assert progress["problems_solved"] == 50
+
+
+def test_wrong_answer_resets_only_that_subject_streak(fresh_db):
+    async def scenario():
+        await server.update_session_progress("s1", "math", True)
+        await server.update_session_progress("s1", "english", True)
+        await server.update_session_progress("s1", "math", False)
+        return await server.get_progress("s1")
+
+    progress = asyncio.run(scenario())
+    assert (progress.math_score, progress.math_streak) == (1, 0)
+    assert (progress.english_score, progress.english_streak) == (1, 1)
+    assert progress.problems_solved == 3
+
+
+def test_update_one_operators_and_upsert(fresh_db):
+    async def scenario():
+        collection = fresh_db.session_progress
+        missing = await collection.update_one({"session_id": "s2"}, {"$inc": {"math_score": 1}})
+        created = await collection.update_one(
+            {"session_id": "s2"},
+            {"$inc": {"math_score": 2}, "$set": {"math_streak": 7}, "$setOnInsert": {"english_score": 0}},
+            upsert=True,
+        )
+        updated = await collection.update_one(
+            {"session_id": "s2"},
+            {"$inc": {"math_score": 1}, "$setOnInsert": {"english_score": 99}},
+            upsert=True,
+        )
+        return missing, created, updated, await collection.find_one({"session_id": "s2"})
+
+    missing, created, updated, document = asyncio.run(scenario())
+    assert missing["matched_count"] == 0 and missing["upserted_id"] is None
+    assert created["upserted_id"] == document["_id"]
+    assert updated["matched_count"] == 1
+    assert document["math_score"] == 3
+    assert document["math_streak"] == 7
+    assert document["english_score"] == 0
+
+
+def test_get_progress_creates_new_session(fresh_db):
+    progress = asyncio.run(server.get_progress("new-session"))
+    assert progress.session_id == "new-session"
+    assert progress.problems_solved == 0
+    stored = asyncio.run(fresh_db.session_progress.find_one({"session_id": "new-session"}))
+    assert stored["_id"] == progress.id
@@ -0,0 +1,75 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+
+
+@pytest.fixture
+def client(fresh_server):
+    return TestClient(server.app)
+
+
+def test_answers_return_grade_next_item_and_progress(client):
+    with client.websocket_connect("/api/sessions/socket-session/ws") as socket:
+        assert socket.receive_json() == {"event": "progress", "progress": {
+            "math_score": 0, "english_score": 0, "math_streak": 0, "english_streak": 0, "problems_solved": 0,
+        }}
+
+        socket.send_json({"action": "next", "subject": "math", "type": "addition", "difficulty": "easy"})
+        item = socket.receive_json()
+        assert item["event"] == "item"
+        problem = item["item"]
+        assert problem["type"] == "addition"
+
+        socket.send_json({"action": "answer", "subject": "math", "id": problem["id"], "user_answer": problem["answer"]})
+        result = socket.receive_json()
+        assert result["correct"] is True
+        assert result["delta"] == {"problems_solved": 1, "math_score": 1, "math_streak": 1}
+        assert result["progress"]["math_score"] == 1
+        assert result["next"]["type"] == "addition"
+
+        next_problem = result["next"]
+        socket.send_json({
+            "action": "answer", "subject": "math", "id": next_problem["id"], "user_answer": next_problem["answer"] + 1,
+        })
+        result = socket.receive_json()
+        assert result["correct"] is False
+        assert result["delta"] == {"problems_solved": 1, "math_streak": 0}
+        assert result["progress"] == {
+            "math_score": 1, "english_score": 0, "math_streak": 0, "english_streak": 0, "problems_solved": 2,
+        }
+
+    # Every answer was written through to storage
+    stored = server.memory_storage["session_progress"]["socket-session"]
+    assert (stored["math_score"], stored["problems_solved"]) == (1, 2)
+
+
+def test_english_answers_and_errors(client):
+    with client.websocket_connect("/api/sessions/english-session/ws") as socket:
+        socket.receive_json()
+
+        socket.send_json({"action": "next", "subject": "english"})
+        exercise = socket.receive_json()["item"]
+        assert exercise["type"] == "spelling"
+
+        socket.send_json({
+            "action": "answer", "subject": "english", "id": exercise["id"],
+            "user_answer": exercise["accepted_answers"][0],
+        })
+        result = socket.receive_json()
+        assert result["correct"] is True
+        assert result["progress"]["english_score"] == 1
+
+        socket.send_json({"action": "answer", "subject": "math", "id": "missing", "user_answer": 3})
+        assert socket.receive_json() == {"event": "error", "detail": "Item not found"}
+        socket.send_json({"action": "answer", "subject": "math", "id": "missing", "user_answer": "three"})
+        assert socket.receive_json()["detail"].startswith("Invalid answer")
+        socket.send_json({"action": "dance"})
+        assert socket.receive_json() == {"event": "error", "detail": "Unknown action: dance"}
+        socket.send_text("not json")
+        assert socket.receive_json() == {"event": "error", "detail": "Invalid JSON"}
+        socket.send_bytes(b"\x00")
+        assert socket.receive_json() == {"event": "error", "detail": "Invalid JSON"}
+        # The connection is still usable
+        socket.send_json({"action": "next", "subject": "english"})
+        assert socket.receive_json()["event"] == "item"
@@ -0,0 +1,144 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import server
+from session_store import SessionStore, decode_document, encode_document
+
+
+def test_documents_round_trip_with_datetimes():
+    document = {"_id": "x", "session_id": "s1", "math_score": 3, "expires_at": datetime(2030, 1, 2, 3, 4, 5, 6)}
+    assert decode_document(encode_document(document)) == document
+
+
+def test_writes_are_coalesced_until_a_flush(tmp_path):
+    store = SessionStore(tmp_path / "sessions.db")
+    assert store.open() == {}
+    document = {"session_id": "s1", "math_score": 0}
+    for score in range(5):
+        document["math_score"] = score
+        store.put("s1", document)
+    store.put("s2", {"session_id": "s2"})
+    assert len(store) == 2
+
+    async def scenario():
+        assert await store.flush() == 2
+        store.delete("s2")
+        assert await store.flush() == 1
+        await store.close()
+
+    asyncio.run(scenario())
+    assert SessionStore(tmp_path / "sessions.db").open() == {"s1": {"session_id": "s1", "math_score": 4}}
+
+
+def test_flushed_batches_survive_a_crash(tmp_path):
+    store = SessionStore(tmp_path / "sessions.db")
+    store.open()
+    store.put("s1", {"session_id": "s1"})
+    asyncio.run(store.flush())
+    store.put("s2", {"session_id": "s2"})
+    # No close(): the process dies with s2 still pending
+
+    assert SessionStore(tmp_path / "sessions.db").open() == {"s1": {"session_id": "s1"}}
+
+
+def test_full_batch_flushes_before_the_interval(tmp_path):
+    store = SessionStore(tmp_path / "sessions.db", flush_interval=60, flush_size=3)
+    store.open()
+
+    async def scenario():
+        task = asyncio.create_task(store.run())
+        for i in range(3):
+            store.put(f"s{i}", {"session_id": f"s{i}"})
+        for _ in range(100):
+            if store.flushes:
+                break
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+    asyncio.run(scenario())
+    assert store.stats() == {"pending": 0, "flushes": 1, "rows_written": 3}
+
+
+def test_failed_flush_keeps_newer_writes(tmp_path, monkeypatch):
+    store = SessionStore(tmp_path / "sessions.db")
+    store.open()
+    store.put("s1", {"session_id": "s1", "v": 1})
+    newer = {"session_id": "s1", "v": 2}
+
+    def failing_write(upserts, deletes):
+        store.put("s1", newer)
+        raise OSError("disk full")
+
+    monkeypatch.setattr(store, "_write", failing_write)
+    with pytest.raises(OSError):
+        asyncio.run(store.flush())
+    assert store._pending == {"s1": newer}
+
+
+@pytest.fixture
+def persisted_sessions(tmp_path, monkeypatch):
+    monkeypatch.setitem(server.memory_storage, "session_progress", {})
+    monkeypatch.setattr(server, "db", server.MockDB("test"))
+    monkeypatch.setattr(server, "SESSION_STORE_PATH", str(tmp_path / "sessions.db"))
+    return server.open_session_store()
+
+
+def test_progress_updates_are_mirrored_without_waiting(persisted_sessions):
+    async def scenario():
+        await server.update_session_progress("kid", "math", True)
+        await server.update_session_progress("kid", "english", True)
+        # Nothing is written on the request path
+        assert persisted_sessions.flushes == 0 and len(persisted_sessions) == 1
+        await persisted_sessions.close()
+
+    asyncio.run(scenario())
+    restored = SessionStore(persisted_sessions.path).open()
+    assert restored["kid"]["math_score"] == 1 and restored["kid"]["english_score"] == 1
+    assert isinstance(restored["kid"]["expires_at"], datetime)
+
+
+def test_restart_restores_sessions_and_expiry_deletes_them(persisted_sessions, monkeypatch):
+    asyncio.run(server.update_session_progress("kid", "math", True))
+    asyncio.run(persisted_sessions.close())
+
+    monkeypatch.setitem(server.memory_storage, "session_progress", {})
+    monkeypatch.setattr(server, "db", server.MockDB("test"))
+    store = server.open_session_store()
+    assert server.memory_storage["session_progress"]["kid"]["math_score"] == 1
+
+    async def scenario():
+        await server.setup_session_expiry()
+        assert await server.db.session_progress.delete_expired(datetime.utcnow() + timedelta(days=2)) == 1
+        await store.close()
+
+    asyncio.run(scenario())
+    assert SessionStore(store.path).open() == {}
+
+
+def test_sessions_evicted_while_restoring_are_deleted_from_the_store(persisted_sessions, monkeypatch):
+    async def fill():
+        # Stored out of activity order; restoring tracks them by expires_at
+        for session_id in ("newest", "oldest", "middle"):
+            await server.update_session_progress(session_id, "math", True)
+        for days, session_id in enumerate(("oldest", "middle", "newest")):
+            server.memory_storage["session_progress"][session_id]["expires_at"] = datetime.utcnow() + timedelta(days=1 + days)
+        await persisted_sessions.close()
+
+    asyncio.run(fill())
+
+    monkeypatch.setattr(server, "SESSION_MAX_COUNT", 2)
+    monkeypatch.setitem(server.memory_storage, "session_progress", {})
+    monkeypatch.setattr(server, "db", server.MockDB("test"))
+    store = server.open_session_store()
+
+    async def restart():
+        await server.ensure_indexes()
+        # Restored sessions are only indexed, not written back
+        assert store._pending == {"oldest": None}
+        await store.close()
+
+    asyncio.run(restart())
+    assert set(server.memory_storage["session_progress"]) == {"middle", "newest"}
+    assert set(SessionStore(store.path).open()) == {"middle", "newest"}
@@ -0,0 +1,94 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta
+
+import server
+from shared_sessions import SharedSessionCollection
+
+NOW = datetime(2026, 1, 1)
+
+
+def test_concurrent_increments_from_separate_connections_are_not_lost(tmp_path):
+    path = tmp_path / "shared.db"
+    workers = [SharedSessionCollection(path) for _ in range(4)]
+
+    def work(collection):
+        async def increments():
+            for _ in range(50):
+                await collection.update_one({"session_id": "kid"}, {"$inc": {"math_score": 1}}, upsert=True)
+        asyncio.run(increments())
+
+    threads = [threading.Thread(target=work, args=(collection,)) for collection in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    document = asyncio.run(SharedSessionCollection(path).find_one({"session_id": "kid"}))
+    assert document["math_score"] == 200
+    for collection in workers:
+        collection.close()
+
+
+def test_update_results_match_the_in_memory_collection(tmp_path):
+    collection = SharedSessionCollection(tmp_path / "shared.db")
+
+    async def scenario():
+        missing = await collection.update_one({"session_id": "a"}, {"$inc": {"math_score": 1}})
+        created = await collection.update_one(
+            {"session_id": "a"}, {"$setOnInsert": {"english_score": 0}, "$inc": {"math_score": 1}}, upsert=True
+        )
+        updated = await collection.update_one({"session_id": "a"}, {"$set": {"last_activity": NOW}})
+        return missing, created, updated, await collection.find_one({"session_id": "a"})
+
+    missing, created, updated, document = asyncio.run(scenario())
+    assert missing == {"matched_count": 0, "modified_count": 0, "upserted_id": None}
+    assert created["upserted_id"] == document["_id"]
+    assert updated["matched_count"] == 1
+    assert document["math_score"] == 1 and document["last_activity"] == NOW
+
+
+def test_expiry_and_size_cap(tmp_path):
+    collection = SharedSessionCollection(tmp_path / "shared.db")
+
+    async def scenario():
+        await collection.create_index("expires_at", expireAfterSeconds=0)
+        collection.max_entries = 2
+        for day, session_id in enumerate(["old", "a", "b", "c"]):
+            await collection.insert_one({"session_id": session_id, "expires_at": NOW + timedelta(days=day)})
+        evicted = await collection.delete_expired(NOW + timedelta(hours=1))
+        return evicted, await collection.expiry_stats(), await collection.find_one({"session_id": "a"})
+
+    evicted, stats, dropped = asyncio.run(scenario())
+    assert evicted == 2 and dropped is None
+    assert stats["live"] == 2
+    assert stats["expired_evictions"] == 1 and stats["lru_evictions"] == 1
+
+
+def fresh_worker(reset, path):
+    """Module state as a newly started worker process would have it"""
+    reset(server.MockDB("test", {"session_progress": SharedSessionCollection(path)}))
+    asyncio.run(server.ensure_indexes())
+    asyncio.run(server.initialize_data())
+    return server.math_content, server.english_content
+
+
+def test_workers_agree_on_content_ids_and_progress(tmp_path, fresh_server, monkeypatch):
+    monkeypatch.setattr(server, "CONTENT_SEED", "")
+    path = tmp_path / "shared.db"
+    first_math, first_english = fresh_worker(fresh_server, path)
+    first_ids = set(first_math.index.by_id), set(first_english.index.by_id)
+
+    second_math, second_english = fresh_worker(fresh_server, path)
+    assert (set(second_math.index.by_id), set(second_english.index.by_id)) == first_ids
+
+    # A problem served by the first worker is answered on the second
+    problem_id = next(iter(first_ids[0]))
+    answer = first_math.get(problem_id)["answer"]
+    request = server.MathAnswerRequest(problem_id=problem_id, user_answer=answer, session_id="kid")
+    asyncio.run(server.submit_math_answer(request))
+    asyncio.run(server.submit_math_answer(request))
+
+    progress = asyncio.run(server.get_progress("kid"))
+    assert progress.math_score == 2 and progress.math_streak == 2
+    server.db.close()
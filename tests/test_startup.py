@@ -0,0 +1,38 @@
+import asyncio
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import server
+
+BACKEND = Path(server.__file__).resolve().parent
+
+
+def test_optional_backends_are_not_imported_by_default():
+    code = "import sys, server; print(sorted(m for m in ('motor', 'numpy', 'sqlite3') if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND, capture_output=True, text=True, check=True,
+        env={"PATH": "", "STORAGE_BACKEND": "memory", "MATH_CONTENT_MODE": "bank"},
+    )
+    assert result.stdout.strip() == "[]"
+
+
+def test_background_loading_serves_health_before_content(fresh_server, monkeypatch):
+    monkeypatch.setattr(server, "CONTENT_LOADING", "background")
+
+    async def scenario():
+        await server.startup_event()
+        try:
+            assert not server.content_loading.done()
+            assert "EduAssist" in (await server.root())["message"]
+            # Content routes wait for the load instead of starting another
+            problem = json.loads((await server.get_math_problem(type="addition", difficulty=None)).body)
+            assert server.content_loading.done()
+            assert problem["type"] == "addition"
+            return len(server.math_content)
+        finally:
+            await server.shutdown_event()
+
+    loaded = asyncio.run(scenario())
+    assert asyncio.run(server.db.math_problems.count_documents({})) == loaded
@@ -0,0 +1,102 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import server
+from ttl import ExpiryIndex
+
+T0 = datetime(2026, 1, 1)
+
+
+def test_pop_expired_returns_only_due_keys_in_deadline_order():
+    index = ExpiryIndex()
+    index.touch("late", T0 + timedelta(minutes=10))
+    index.touch("early", T0 + timedelta(minutes=1))
+    index.touch("middle", T0 + timedelta(minutes=5))
+
+    assert index.pop_expired(T0 + timedelta(minutes=6)) == ["early", "middle"]
+    assert len(index) == 1
+    assert index.stats()["expired_evictions"] == 2
+
+
+def test_refreshed_deadline_supersedes_old_heap_entry():
+    index = ExpiryIndex()
+    index.touch("s", T0 + timedelta(minutes=1))
+    index.touch("s", T0 + timedelta(minutes=30))
+
+    assert index.pop_expired(T0 + timedelta(minutes=2)) == []
+    assert index.pop_expired(T0 + timedelta(minutes=31)) == ["s"]
+
+
+def test_cap_evicts_least_recently_touched():
+    index = ExpiryIndex(max_entries=2)
+    index.touch("a", T0)
+    index.touch("b", T0)
+    index.touch("a", T0)
+
+    assert index.touch("c", T0) == ["b"]
+    assert "b" not in index and "a" in index
+    assert index.stats()["lru_evictions"] == 1
+    # The evicted key's deadline no longer fires
+    assert index.pop_expired(T0 + timedelta(days=1)) == ["a", "c"]
+
+
+def test_shortened_deadline_fires_at_the_new_time():
+    index = ExpiryIndex()
+    index.touch("s", T0 + timedelta(minutes=30))
+    index.touch("s", T0 + timedelta(minutes=1))
+
+    assert index.pop_expired(T0 + timedelta(minutes=2)) == ["s"]
+    assert index.pop_expired(T0 + timedelta(minutes=31)) == []
+
+
+def test_extending_a_deadline_does_not_grow_the_heap():
+    index = ExpiryIndex()
+    for minute in range(500):
+        index.touch("s", T0 + timedelta(minutes=minute))
+    assert len(index._heap) == 1
+    assert index.pop_expired(T0 + timedelta(minutes=498)) == []
+    assert index.pop_expired(T0 + timedelta(minutes=499)) == ["s"]
+
+
+def test_heap_is_compacted_when_mostly_stale():
+    index = ExpiryIndex()
+    for minute in reversed(range(500)):
+        index.touch("s", T0 + timedelta(minutes=minute))
+    assert len(index._heap) <= 2 * 64 + 1
+
+
+@pytest.fixture
+def fresh_db(monkeypatch):
+    monkeypatch.setitem(server.memory_storage, "session_progress", {})
+    monkeypatch.setattr(server, "db", server.MockDB("test"))
+    return server.db
+
+
+def test_delete_expired_evicts_stale_sessions(fresh_db):
+    async def scenario():
+        await server.setup_session_expiry()
+        await server.update_session_progress("stale", "math", True)
+        await server.update_session_progress("fresh", "math", True)
+        now = datetime.utcnow()
+        await fresh_db.session_progress.update_one(
+            {"session_id": "stale"}, {"$set": {"expires_at": now - timedelta(seconds=1)}}
+        )
+        return await fresh_db.session_progress.delete_expired(now)
+
+    assert asyncio.run(scenario()) == 1
+    assert set(server.memory_storage["session_progress"]) == {"fresh"}
+    assert asyncio.run(fresh_db.session_progress.expiry_stats())["live"] == 1
+
+
+def test_session_cap_evicts_lru_session(fresh_db, monkeypatch):
+    monkeypatch.setattr(server, "SESSION_MAX_COUNT", 2)
+
+    async def scenario():
+        await server.setup_session_expiry()
+        for session_id in ("a", "b", "a", "c"):
+            await server.update_session_progress(session_id, "english", False)
+
+    asyncio.run(scenario())
+    assert set(server.memory_storage["session_progress"]) == {"a", "c"}